@@ -0,0 +1,273 @@
+import os
+import io
+import json
+import time
+import uuid
+import random
+import argparse
+import datetime
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+import importlib.util
+
+# Нагрузочные замеры горячих путей сохранения и отчётов без запуска интерфейса:
+#   python bench_wrktmr.py --target wrktmr041.py --tasks 2000 --active 50 --days 30 --output bench.json
+# Результаты разных релизов сравниваются по JSON-файлам.
+# Если в целевом релизе нет выгрузки в Excel, save_excel замеряется на --excel-target.
+
+def load_target(path, workdir, name="wrktmr_bench_target"):
+    # Модуль кладёт настройки и логи в tempfile.gettempdir(), поэтому подменяем его до импорта
+    tempfile.tempdir = workdir
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
+
+# ─── Синтетические данные ─────────────────────────────────────────
+
+def make_completed_task(rng, i, n_tasks, day_start):
+    minutes = rng.uniform(1, 120)
+    start_timestamp = day_start + i * 90
+    link = f"https://tracker.example/issue/{rng.randrange(max(1, n_tasks // 4))}" if rng.random() < 0.6 else ""
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "task": f"Задача {rng.randrange(max(1, n_tasks // 3))}",
+        "link": link,
+        "time_str": f"{int(minutes)}:{int(minutes % 1 * 60):02d}",
+        "minutes": round(minutes, 2),
+        "hours_hundredths": round(minutes / 60, 2),
+        "start_timestamp": start_timestamp,
+        "end_timestamp": start_timestamp + minutes * 60
+    }
+
+def make_active_task(rng, i, now):
+    timer_start = now - rng.uniform(600, 8 * 3600)
+    pause_history = []
+    paused_total = 0.0
+    cursor = timer_start
+    for _ in range(rng.randint(0, 6)):
+        start = cursor + rng.uniform(60, 1800)
+        end = start + rng.uniform(30, 900)
+        if end >= now:
+            break
+        pause_history.append({"start": start, "end": end})
+        paused_total += end - start
+        cursor = end
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "task": f"Активная задача {i}",
+        "link": f"https://tracker.example/active/{i}",
+        "timer_start": timer_start,
+        "start_timestamp": timer_start,
+        "paused_total": paused_total,
+        "pause_history": pause_history,
+        "is_paused": False,
+        "minutes": 0.0,
+        "hours_hundredths": 0.0,
+        "time_str": "0:00"
+    }
+
+def write_history(module, rng, n_tasks, days):
+    logs_root = os.path.join(module.get_config_dir(), "logs")
+    today = datetime.date.today()
+    for offset in range(1, days + 1):
+        day = today - datetime.timedelta(days=offset)
+        day_start = time.mktime(day.timetuple()) + 9 * 3600
+        day_dir = os.path.join(logs_root, str(day.year), f"{day.month:02d}", f"{day.day:02d}")
+        os.makedirs(day_dir, exist_ok=True)
+        with open(os.path.join(day_dir, f"{day.strftime('%Y-%m-%d')}.txt"), "w", encoding="utf-8") as f:
+            for i in range(n_tasks):
+                t = make_completed_task(rng, i, n_tasks, day_start)
+                f.write(f"{t['task']} | {t['link']} | {t['time_str']} | {t['hours_hundredths']} | {t['start_timestamp']} | {t['end_timestamp']} | {t['id']}\n")
+
+def make_dataset(n_tasks, n_active, seed):
+    rng = random.Random(seed)
+    now = time.time()
+    day_start = time.mktime(datetime.date.today().timetuple()) + 9 * 3600
+    completed = [make_completed_task(rng, i, n_tasks, day_start) for i in range(n_tasks)]
+    active = [make_active_task(rng, i, now) for i in range(n_active)]
+    return completed, active
+
+# ─── Замеры ───────────────────────────────────────────────────────
+
+def reset_tasks(module, items):
+    module.tasks[:] = [dict(t, pause_history=list(t["pause_history"])) if "pause_history" in t else dict(t) for t in items]
+    store = getattr(module, "task_store", None)
+    if store is not None and hasattr(store, "reindex"):
+        store.reindex()
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_case(setup, op, repeat):
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            args = setup()
+            t0 = time.perf_counter()
+            op(*args)
+            samples.append(time.perf_counter() - t0)
+        args = setup()
+        tracemalloc.start()
+        try:
+            op(*args)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    samples.sort()
+    total = sum(samples)
+    return {
+        "repeat": repeat,
+        "ops_per_sec": round(repeat / total, 2) if total > 0 else None,
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+        "peak_kb": round(peak / 1024, 1)
+    }
+
+def build_cases(module, completed, active, rng, days, excel_module=None):
+    everything = completed + active
+    cases = {}
+
+    def with_all():
+        reset_tasks(module, everything)
+        return ()
+
+    if hasattr(module, "save_backup"):
+        cases["save_backup"] = (with_all, module.save_backup)
+
+    if hasattr(module, "load_backup"):
+        reset_tasks(module, everything)
+        with contextlib.redirect_stdout(io.StringIO()):
+            module.save_backup()
+        def setup_load_backup():
+            reset_tasks(module, active)
+            return ()
+        cases["load_backup"] = (setup_load_backup, module.load_backup)
+
+    if hasattr(module, "load_active_tasks"):
+        def setup_load_active():
+            reset_tasks(module, everything)
+            module.save_active_tasks()
+            reset_tasks(module, completed)
+            return ()
+        cases["load_active_tasks"] = (setup_load_active, module.load_active_tasks)
+
+    if hasattr(module, "remove_active_task") and active:
+        def setup_remove_active():
+            reset_tasks(module, everything)
+            module.save_active_tasks()
+            return (len(completed) + rng.randrange(len(active)),)
+        cases["remove_active_task"] = (setup_remove_active, module.remove_active_task)
+
+    if hasattr(module, "group_tasks"):
+        cases["group_tasks"] = (with_all, module.group_tasks)
+
+    if hasattr(module, "save_csv"):
+        cases["save_csv"] = (with_all, module.save_csv)
+
+    if hasattr(module, "save_excel"):
+        cases["save_excel"] = (with_all, module.save_excel)
+    elif excel_module is not None:
+        def with_all_excel():
+            reset_tasks(excel_module, everything)
+            return ()
+        cases["save_excel"] = (with_all_excel, excel_module.save_excel)
+
+    if hasattr(module, "iter_tasks"):
+        today = datetime.date.today()
+        date_from = today - datetime.timedelta(days=days)
+        def run_history():
+            for _ in module.iter_tasks(date_from, today):
+                pass
+        def setup_history_cold():
+            module.history_cache.clear()
+            return ()
+        cases["history_cold"] = (setup_history_cold, run_history)
+        cases["history_warm"] = (lambda: (), run_history)
+
+    # Последним: с запущенным потоком записи замеряется только время потока интерфейса
+    if hasattr(module, "io_worker"):
+        def setup_queued():
+            module.io_worker.start()
+            module.io_worker.flush()
+            reset_tasks(module, everything)
+            return ()
+        cases["save_backup_queued"] = (setup_queued, module.save_backup)
+
+    return cases
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности wrktmr без интерфейса")
+    parser.add_argument("--target", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "wrktmr041.py"),
+                        help="файл релиза, который замеряется")
+    parser.add_argument("--tasks", type=int, default=1000, help="завершённых задач за сегодня")
+    parser.add_argument("--active", type=int, default=20, help="активных задач с историей пауз")
+    parser.add_argument("--days", type=int, default=30, help="дней истории в папке логов")
+    parser.add_argument("--repeat", type=int, default=20, help="повторов каждого замера")
+    parser.add_argument("--excel-target", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "wrktmr035.5.py"),
+                        help="релиз, на котором замеряется save_excel, если в --target его нет")
+    parser.add_argument("--only", nargs="*", help="запустить только указанные замеры")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="куда сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="wrktmr-bench-")
+    module = load_target(os.path.abspath(args.target), workdir)
+    module.SAVE_DIR = os.path.join(workdir, "reports")
+    os.makedirs(module.SAVE_DIR, exist_ok=True)
+
+    excel_module = None
+    excel_target = os.path.basename(args.target) if hasattr(module, "save_excel") else None
+    if excel_target is None and args.excel_target:
+        try:
+            excel_module = load_target(os.path.abspath(args.excel_target), workdir, "wrktmr_bench_excel")
+            excel_module.SAVE_DIR = module.SAVE_DIR
+            excel_target = os.path.basename(args.excel_target)
+        except Exception as e:
+            print(f"save_excel не замеряется: в {os.path.basename(args.target)} нет выгрузки в Excel, "
+                  f"а {os.path.basename(args.excel_target)} не загрузился ({e})")
+    if excel_module is not None:
+        print(f"save_excel замеряется на {excel_target}: в {os.path.basename(args.target)} нет выгрузки в Excel")
+
+    rng = random.Random(args.seed)
+    completed, active = make_dataset(args.tasks, args.active, args.seed)
+    write_history(module, rng, args.tasks, args.days)
+    cases = build_cases(module, completed, active, rng, args.days, excel_module)
+    if args.only:
+        cases = {name: case for name, case in cases.items() if name in args.only}
+
+    results = {}
+    for name, (setup, op) in cases.items():
+        results[name] = run_case(setup, op, args.repeat)
+        r = results[name]
+        print(f"{name:<20} {r['ops_per_sec'] or 0:>10.1f} оп/с  p50 {r['p50_ms']:>9.3f} мс  p99 {r['p99_ms']:>9.3f} мс  пик {r['peak_kb']:>9.1f} КБ")
+    if hasattr(module, "io_worker"):
+        with contextlib.redirect_stdout(io.StringIO()):
+            module.io_worker.stop()
+
+    report = {
+        "target": os.path.basename(args.target),
+        "excel_target": excel_target,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"tasks": args.tasks, "active": args.active, "days": args.days,
+                   "repeat": args.repeat, "seed": args.seed},
+        "results": results
+    }
+    if hasattr(module, "normalization_cache_stats"):
+        report["normalization_cache"] = module.normalization_cache_stats()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+import os
+import io
+import sys
+import time
+import uuid
+import base64
+import hashlib
+import argparse
+import datetime
+import tempfile
+import threading
+import contextlib
+import importlib.util
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlparse
+
+# Проверка синхронизации с CalDAV на локальном сервере, без сети и без запуска интерфейса:
+#   python test_caldav_sync.py --target wrktmr041.py
+# Код возврата 0, если все проверки прошли.
+
+DAV_NS = "DAV:"
+CALDAV_NS = "urn:ietf:params:xml:ns:caldav"
+CS_NS = "http://calendarserver.org/ns/"
+
+def load_target(path, workdir, name="wrktmr_caldav_target"):
+    # Модуль кладёт настройки и логи в tempfile.gettempdir(), поэтому подменяем его до импорта
+    tempfile.tempdir = workdir
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
+
+def xml_text(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+def content_hash(body):
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+# CalDAV-сервер для проверки: одна коллекция в памяти,
+# ETag и ctag на элементы, sync-collection с журналом изменений, multiget, условные PUT и DELETE
+class LocalCalDAVServer:
+    def __init__(self, user="", password="", sync_collection=True):
+        self.user = user
+        self.password = password
+        self.sync_collection = sync_collection
+        self.path = "/calendars/wrktmr/tasks/"
+        self.items = {}
+        self.changes = []
+        self.revision = 0
+        self.methods = {}
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+        self.url = None
+
+    def start(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.make_handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}{self.path}"
+        self.thread = threading.Thread(target=self.server.serve_forever, name="wrktmr-caldav-stand-in", daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def token(self):
+        return f"http://wrktmr.local/sync/{self.revision}"
+
+    def store(self, href, body):
+        with self.lock:
+            self.revision += 1
+            etag = f'"{self.revision}-{content_hash(body)[:8]}"'
+            self.items[href] = (etag, body)
+            self.changes.append((self.revision, href))
+            return etag
+
+    def delete(self, href):
+        with self.lock:
+            self.revision += 1
+            self.items.pop(href, None)
+            self.changes.append((self.revision, href))
+
+    def count(self, method):
+        return self.methods.get(method, 0)
+
+    def multistatus(self, responses, sync_token=None):
+        parts = ['<?xml version="1.0" encoding="utf-8"?>',
+                 f'<d:multistatus xmlns:d="DAV:" xmlns:c="{CALDAV_NS}" xmlns:cs="{CS_NS}">']
+        for href, props, status in responses:
+            parts.append(f"<d:response><d:href>{xml_text(quote(href))}</d:href>")
+            if status:
+                parts.append(f"<d:status>HTTP/1.1 {status}</d:status>")
+            else:
+                parts.append(f"<d:propstat><d:prop>{props}</d:prop><d:status>HTTP/1.1 200 OK</d:status></d:propstat>")
+            parts.append("</d:response>")
+        if sync_token is not None:
+            parts.append(f"<d:sync-token>{sync_token}</d:sync-token>")
+        parts.append("</d:multistatus>")
+        return "".join(parts).encode("utf-8")
+
+    def make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def reply(self, status, body=b"", headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def read_body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length) if length else b""
+
+            def authorized(self):
+                with server.lock:
+                    server.methods[self.command] = server.methods.get(self.command, 0) + 1
+                if not server.user:
+                    return True
+                expected = "Basic " + base64.b64encode(f"{server.user}:{server.password}".encode("utf-8")).decode("ascii")
+                if self.headers.get("Authorization") == expected:
+                    return True
+                self.reply(401, headers={"WWW-Authenticate": 'Basic realm="wrktmr"'})
+                return False
+
+            def target(self):
+                return unquote(urlparse(self.path).path)
+
+            def do_PROPFIND(self):
+                if not self.authorized():
+                    return
+                self.read_body()
+                with server.lock:
+                    responses = [(server.path, f"<cs:getctag>{server.revision}</cs:getctag>"
+                                               f"<d:sync-token>{server.token()}</d:sync-token>", None)]
+                    if self.headers.get("Depth") == "1":
+                        responses += [(href, f"<d:getetag>{xml_text(etag)}</d:getetag>", None)
+                                      for href, (etag, _) in server.items.items()]
+                self.reply(207, server.multistatus(responses), {"Content-Type": "application/xml; charset=utf-8"})
+
+            def do_REPORT(self):
+                if not self.authorized():
+                    return
+                root = ET.fromstring(self.read_body())
+                with server.lock:
+                    if root.tag == f"{{{DAV_NS}}}sync-collection":
+                        if not server.sync_collection:
+                            self.reply(403, b"<error xmlns='DAV:'><supported-report/></error>")
+                            return
+                        token = (root.findtext(f"{{{DAV_NS}}}sync-token") or "").strip()
+                        since = 0
+                        if token:
+                            prefix = "http://wrktmr.local/sync/"
+                            if not token.startswith(prefix) or not token[len(prefix):].isdigit():
+                                self.reply(403, b"<error xmlns='DAV:'><valid-sync-token/></error>")
+                                return
+                            since = int(token[len(prefix):])
+                        hrefs = sorted({href for revision, href in server.changes if revision > since})
+                        responses = []
+                        for href in hrefs:
+                            if href in server.items:
+                                responses.append((href, f"<d:getetag>{xml_text(server.items[href][0])}</d:getetag>", None))
+                            elif since:
+                                responses.append((href, "", "404 Not Found"))
+                        body = server.multistatus(responses, server.token())
+                    elif root.tag == f"{{{CALDAV_NS}}}calendar-multiget":
+                        responses = []
+                        for element in root.iter(f"{{{DAV_NS}}}href"):
+                            href = unquote(urlparse((element.text or "").strip()).path)
+                            if href in server.items:
+                                etag, data = server.items[href]
+                                responses.append((href, f"<d:getetag>{xml_text(etag)}</d:getetag>"
+                                                        f"<c:calendar-data>{xml_text(data)}</c:calendar-data>", None))
+                            else:
+                                responses.append((href, "", "404 Not Found"))
+                        body = server.multistatus(responses)
+                    else:
+                        self.reply(403)
+                        return
+                self.reply(207, body, {"Content-Type": "application/xml; charset=utf-8"})
+
+            def do_GET(self):
+                if not self.authorized():
+                    return
+                item = server.items.get(self.target())
+                if item is None:
+                    self.reply(404)
+                    return
+                self.reply(200, item[1].encode("utf-8"), {"ETag": item[0], "Content-Type": "text/calendar; charset=utf-8"})
+
+            def do_PUT(self):
+                if not self.authorized():
+                    return
+                href = self.target()
+                body = self.read_body().decode("utf-8")
+                current = server.items.get(href)
+                if_match = self.headers.get("If-Match")
+                if (self.headers.get("If-None-Match") == "*" and current is not None) or \
+                        (if_match and (current is None or current[0] != if_match)):
+                    self.reply(412)
+                    return
+                etag = server.store(href, body)
+                self.reply(204 if current else 201, headers={"ETag": etag})
+
+            def do_DELETE(self):
+                if not self.authorized():
+                    return
+                href = self.target()
+                current = server.items.get(href)
+                if current is None:
+                    self.reply(404)
+                    return
+                if_match = self.headers.get("If-Match")
+                if if_match and current[0] != if_match:
+                    self.reply(412)
+                    return
+                server.delete(href)
+                self.reply(204)
+
+        return Handler
+
+def run_caldav_selftest(app):
+    failures = 0
+
+    def check(title, ok):
+        nonlocal failures
+        print(f"  {'✓' if ok else '✗'} {title}")
+        if not ok:
+            failures += 1
+
+    def apply_result(local_tasks, result):
+        by_id = {t["id"]: t for t in local_tasks}
+        for remote_task in result.updated:
+            by_id[remote_task["id"]].update(remote_task)
+        local_tasks.extend(app.Task(t) for t in result.imported)
+        return [t for t in local_tasks if t["id"] not in set(result.removed)]
+
+    work_dir = tempfile.mkdtemp(prefix="wrktmr-caldav-")
+    day = datetime.date.today().isoformat()
+    base = time.mktime(datetime.date.today().timetuple()) + 9 * 3600
+    for sync_collection in (True, False):
+        print(f"Сервер {'с sync-collection' if sync_collection else 'только с ctag/ETag'}:")
+        server = LocalCalDAVServer("wrktmr", "secret", sync_collection)
+        server.start()
+        try:
+            client = app.CalDAVClient(server.url, "wrktmr", "secret", timeout=5)
+            state_file = os.path.join(work_dir, f"state-{int(sync_collection)}.json")
+            local_tasks = []
+            for i in range(40):
+                minutes = 5.0 + i
+                local_tasks.append(app.Task({
+                    "id": str(uuid.uuid4()), "task": f"Задача {i}; проверка, экранирования" + " длинная" * (i % 3 * 10),
+                    "link": f"https://tracker.example/issue/{i}" if i % 2 else "",
+                    "minutes": minutes, "hours_hundredths": round(minutes / 60, 2), "time_str": app.format_minutes(minutes),
+                    "start_timestamp": base + i * 600, "end_timestamp": base + i * 600 + minutes * 60
+                }))
+            engine = app.CalDAVSync(client, state_file)
+            result = engine.sync(local_tasks, day)
+            check(f"первая синхронизация отправила все задачи ({result.pushed})", result.pushed == 40 and len(server.items) == 40)
+
+            puts = server.count("PUT")
+            engine = app.CalDAVSync(client, state_file)
+            result = engine.sync(local_tasks, day)
+            check(f"повторная синхронизация без изменений: 0 PUT, 0 загрузок ({result.summary()})",
+                  server.count("PUT") == puts and result.fetched == 0)
+
+            local_tasks[3]["task"] = "Переименованная задача"
+            result = engine.sync(local_tasks, day)
+            check("изменённая локально задача отправлена одна", result.pushed == 1 and result.fetched == 0)
+
+            href = engine.href_for(app.caldav_uid(local_tasks[5]["id"]))
+            server.store(href, server.items[href][1].replace("SUMMARY:Задача 5", "SUMMARY:Изменено на сервере"))
+            foreign = app.task_to_vtodo({"id": "x", "task": "С другого устройства", "link": "", "minutes": 15.0,
+                                     "time_str": "15:00", "start_timestamp": base, "end_timestamp": base + 900})
+            server.store(server.path + "foreign.ics", foreign.replace("UID:x@wrktmr", "UID:foreign-1"))
+            result = engine.sync(local_tasks, day)
+            local_tasks = apply_result(local_tasks, result)
+            check(f"забраны только изменённые на сервере элементы ({result.fetched})",
+                  result.fetched == 2 and result.pushed == 0 and local_tasks[5]["task"].startswith("Изменено на сервере;")
+                  and any(t["task"] == "С другого устройства" for t in local_tasks))
+
+            removed = local_tasks.pop(7)
+            server.delete(engine.href_for(app.caldav_uid(local_tasks[8]["id"])))
+            result = engine.sync(local_tasks, day)
+            local_tasks = apply_result(local_tasks, result)
+            check("локальное удаление ушло DELETE, серверное удаление применено",
+                  result.deleted == 1 and len(result.removed) == 1 and engine.href_for(app.caldav_uid(removed["id"])) not in server.items)
+
+            etag_href = engine.href_for(app.caldav_uid(local_tasks[0]["id"]))
+            server.store(etag_href, server.items[etag_href][1].replace("X-WRKTMR-MINUTES:5.0", "X-WRKTMR-MINUTES:6.0"))
+            local_tasks[0]["task"] = "Локальная правка"
+            result = engine.sync(local_tasks, day)
+            check("при конфликте локальная версия перезаписала серверную по If-Match",
+                  result.conflicts == 1 and result.pushed == 1 and "Локальная правка" in server.items[etag_href][1])
+
+            result = engine.sync(local_tasks, day)
+            check(f"итоговое состояние стабильно ({result.summary()})", result.pushed == 0 and result.fetched == 0)
+
+            yesterday = dict(local_tasks[1], start_timestamp=base - 86400, end_timestamp=base - 86400 + 300)
+            past = local_tasks.pop(1)
+            outbox = [{"seq": 1, "op": "update", "id": past["id"], "task": dict(yesterday, task="Правка вчерашней")}]
+            result = engine.sync(local_tasks, day, outbox)
+            past_href = engine.href_for(app.caldav_uid(past["id"]))
+            check("правка задачи прошлого дня из очереди отправлена, а не удалена",
+                  result.pushed == 1 and result.deleted == 0 and "Правка вчерашней" in server.items[past_href][1])
+            result = engine.sync(local_tasks, day, [{"seq": 2, "op": "delete", "id": past["id"]}])
+            check("удаление из очереди дошло до сервера", result.deleted == 1 and past_href not in server.items)
+        finally:
+            server.stop()
+    print("Самопроверка CalDAV пройдена." if not failures else f"Самопроверка CalDAV: ошибок {failures}.")
+    return 1 if failures else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка синхронизации wrktmr с CalDAV")
+    parser.add_argument("--target", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "wrktmr041.py"))
+    args = parser.parse_args()
+    app = load_target(args.target, tempfile.mkdtemp(prefix="wrktmr-caldav-"))
+    try:
+        return run_caldav_selftest(app)
+    finally:
+        if hasattr(app, "io_worker"):
+            with contextlib.redirect_stdout(io.StringIO()):
+                app.io_worker.stop()
+
+if __name__ == "__main__":
+    sys.exit(main())
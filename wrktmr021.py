@@ -10,7 +10,6 @@ from urllib.parse import urlparse
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
-from collections import Counter
 from colorama import init, Fore, Style
 
 init(autoreset=True)
@@ -100,49 +99,71 @@ def save_backup():
         for t in tasks:
             f.write(f"{t['task']} | {t['link']} | {t['time_str']} | {t['hours_hundredths']}\n")
 
+class TaskGrouping:
+    def __init__(self, items):
+        self.items = items
+        self.parent = list(range(len(items)))
+        first_row = {}
+        for row, t in enumerate(items):
+            link_key = t["link"].strip().lower() if t.get("link") else None
+            if link_key:
+                self.union(first_row.setdefault(("link", link_key), row), row)
+            self.union(first_row.setdefault(("name", t["task"].strip().lower()), row), row)
+        self.groups = {}
+        self.row_to_group = []
+        for row, t in enumerate(items):
+            root = self.find(row)
+            group_id = items[root].get("id") or f"row-{root}"
+            group = self.groups.get(group_id)
+            if group is None:
+                group = self.groups[group_id] = {
+                    "key": group_id,
+                    "task": items[root]["task"],
+                    "link": "",
+                    "minutes": 0.0,
+                    "hours_hundredths": 0.0,
+                    "count": 0,
+                    "rows": []
+                }
+            if not group["link"] and t.get("link"):
+                group["link"] = t["link"]
+            group["minutes"] += t["minutes"]
+            group["hours_hundredths"] += t["hours_hundredths"]
+            group["count"] += 1
+            group["rows"].append(row)
+            self.row_to_group.append(group_id)
+
+    def find(self, row):
+        parent = self.parent
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return row
+
+    def union(self, a, b):
+        root_a = self.find(a)
+        root_b = self.find(b)
+        if root_a == root_b:
+            return
+        if root_a < root_b:
+            self.parent[root_b] = root_a
+        else:
+            self.parent[root_a] = root_b
+
+    def group_of(self, row):
+        return self.groups[self.row_to_group[row]]
+
+    def merged_groups(self):
+        return [g for g in self.groups.values() if g["count"] > 1]
+
 def group_tasks():
     """
-    Объединяет задачи:
+    Объединяет задачи в одну группу, если они связаны цепочкой совпадений:
       - по ссылке (если есть)
       - по названию (в любом случае)
     Возвращает список агрегатов, где count > 1
     """
-    grouped = {}
-
-    for t in tasks:
-        # Сначала группировка по ссылке (если есть)
-        link_key = t["link"].strip().lower() if t.get("link") else None
-        if link_key:
-            if link_key not in grouped:
-                grouped[link_key] = {
-                    "task": t["task"],
-                    "link": t["link"],
-                    "minutes": 0.0,
-                    "hours_hundredths": 0.0,
-                    "count": 0,
-                    "key": link_key
-                }
-            grouped[link_key]["minutes"] += t["minutes"]
-            grouped[link_key]["hours_hundredths"] += t["hours_hundredths"]
-            grouped[link_key]["count"] += 1
-
-        # Группировка по названию
-        name_key = t["task"].strip().lower()
-        if name_key not in grouped:
-            grouped[name_key] = {
-                "task": t["task"],
-                "link": t["link"],
-                "minutes": 0.0,
-                "hours_hundredths": 0.0,
-                "count": 0,
-                "key": name_key
-            }
-        grouped[name_key]["minutes"] += t["minutes"]
-        grouped[name_key]["hours_hundredths"] += t["hours_hundredths"]
-        grouped[name_key]["count"] += 1
-
-    # Оставляем только группы с count > 1
-    return [g for g in grouped.values() if g["count"] > 1]
+    return TaskGrouping(tasks).merged_groups()
 
 
 # ======================
@@ -240,48 +261,14 @@ def style_tasks_and_summary(ws, n_tasks_rows, grouped, group_key_to_rows):
             c.fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
             c.border = thin
 
-        # Строки сводки: подсветить каждой группе свой цвет
-        r = summary_header_row + 1
-        while r <= ws.max_row:
-            row_task = ws.cell(row=r, column=1).value
-            row_link_domain = ws.cell(row=r, column=2).value
-            if row_task is None and row_link_domain is None:
-                r += 1
-                continue
-            # попытка определить ключ по сводке:
-            # если ссылка есть в исходных данных, лучше картировать по ссылке, иначе по названию
-            # но в сводке второй столбец — домен (не сам URL). Ключ у нас — полная ссылка.
-            # поэтому для цвета используем сохранённый словарь group_key_to_rows["key_list"] из аргумента 'grouped'.
-            # Создадим карту: task->key и domain->key (по grouped)
-            r += 1
-
-        # Проставим цвета по key из grouped:
-        key_to_fill = {g["key"]: color_for_key(g["key"]) for g in grouped}
-        # Найдём диапазон сводки (после строки summary_header_row до конца/пустой строки)
-        sr = summary_header_row + 1
-        while sr <= ws.max_row:
-            a = ws.cell(row=sr, column=1).value
-            b = ws.cell(row=sr, column=2).value
-            c3 = ws.cell(row=sr, column=3).value
-            if a is None and b is None and c3 is None:
-                break
-            # Попробуем найти соответствующий key:
-            # Пройдём по grouped и найдём совпадение по task или по домену
-            matched_key = None
-            for g in grouped:
-                if a and a == g["task"]:
-                    matched_key = g["key"]
-                    break
-                if b and b == parse_domain(g["link"] or ""):
-                    matched_key = g["key"]
-                    break
-            if matched_key and key_to_fill.get(matched_key):
-                fill = key_to_fill[matched_key]
+        # Строки сводки идут сразу после шапки в порядке grouped: каждой группе свой цвет
+        for sr, g in enumerate(grouped, start=summary_header_row + 1):
+            fill = color_for_key(g["key"])
+            if fill:
                 for col in range(1, max_col + 1):
                     cell = ws.cell(row=sr, column=col)
                     cell.fill = fill
                     cell.border = thin
-            sr += 1
 
     # Автофильтр и фиксация шапки для основной таблицы
     if n_tasks_rows > 0:
@@ -326,12 +313,11 @@ def save_excel():
     total_hours_hundredths = 0.0
 
     # Подготовка карт для подсветки дублей в основной таблице
-    keys = [key_for_group(t) for t in tasks]
-    dup_keys = {k for k, c in Counter(keys).items() if c > 1}
+    grouping = TaskGrouping(tasks)
     row_to_key = {}
 
     # Данные
-    for t in tasks:
+    for row, t in enumerate(tasks):
         domain = parse_domain(t['link']) if t['link'] else ""
         row_index = ws.max_row + 1
         ws.cell(row=row_index, column=1, value=t['task'])
@@ -344,9 +330,9 @@ def save_excel():
         ws.cell(row=row_index, column=3, value=t['time_str'])
         ws.cell(row=row_index, column=4, value=t['hours_hundredths'])
 
-        k = key_for_group(t)
-        if k in dup_keys:
-            row_to_key[row_index] = k
+        group = grouping.group_of(row)
+        if group["count"] > 1:
+            row_to_key[row_index] = group["key"]
 
         total_minutes += t['minutes']
         total_hours_hundredths += t['hours_hundredths']
@@ -358,7 +344,7 @@ def save_excel():
     ws.append(["ИТОГО", "", f"{round(total_minutes, 2)} мин", f"{round(total_hours_hundredths, 2)} ч"])
 
     # СВОДКА сразу после ИТОГО
-    grouped = group_tasks()
+    grouped = grouping.merged_groups()
     if grouped:
         ws.append([])
         ws.append(["СВОДКА (объединено по совпадению ссылки или названия)"])
@@ -9,10 +9,6 @@ import ctypes
 import uuid
 import configparser
 from urllib.parse import urlparse
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-from collections import Counter
 from colorama import init, Fore, Style
 
 def set_dark_title_bar_qt(window):
@@ -300,37 +296,65 @@ def remove_active_task(index):
     except Exception as e:
         print(Fore.RED + f"Ошибка удаления активной задачи: {e}")
 
-def group_tasks():
-    grouped = {}
-    for t in tasks:
-        link_key = t["link"].strip().lower() if t.get("link") else None
-        if link_key:
-            if link_key not in grouped:
-                grouped[link_key] = {
-                    "task": t["task"],
-                    "link": t["link"],
+class TaskGrouping:
+    def __init__(self, items):
+        self.items = items
+        self.parent = list(range(len(items)))
+        first_row = {}
+        for row, t in enumerate(items):
+            link_key = t["link"].strip().lower() if t.get("link") else None
+            if link_key:
+                self.union(first_row.setdefault(("link", link_key), row), row)
+            self.union(first_row.setdefault(("name", t["task"].strip().lower()), row), row)
+        self.groups = {}
+        self.row_to_group = []
+        for row, t in enumerate(items):
+            root = self.find(row)
+            group_id = items[root].get("id") or f"row-{root}"
+            group = self.groups.get(group_id)
+            if group is None:
+                group = self.groups[group_id] = {
+                    "key": group_id,
+                    "task": items[root]["task"],
+                    "link": "",
                     "minutes": 0.0,
                     "hours_hundredths": 0.0,
                     "count": 0,
-                    "key": link_key
+                    "rows": []
                 }
-            grouped[link_key]["minutes"] += t["minutes"]
-            grouped[link_key]["hours_hundredths"] += t["hours_hundredths"]
-            grouped[link_key]["count"] += 1
-        name_key = t["task"].strip().lower()
-        if name_key not in grouped:
-            grouped[name_key] = {
-                "task": t["task"],
-                "link": t["link"],
-                "minutes": 0.0,
-                "hours_hundredths": 0.0,
-                "count": 0,
-                "key": name_key
-            }
-        grouped[name_key]["minutes"] += t["minutes"]
-        grouped[name_key]["hours_hundredths"] += t["hours_hundredths"]
-        grouped[name_key]["count"] += 1
-    return [g for g in grouped.values() if g["count"] > 1]
+            if not group["link"] and t.get("link"):
+                group["link"] = t["link"]
+            group["minutes"] += t["minutes"]
+            group["hours_hundredths"] += t["hours_hundredths"]
+            group["count"] += 1
+            group["rows"].append(row)
+            self.row_to_group.append(group_id)
+
+    def find(self, row):
+        parent = self.parent
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return row
+
+    def union(self, a, b):
+        root_a = self.find(a)
+        root_b = self.find(b)
+        if root_a == root_b:
+            return
+        if root_a < root_b:
+            self.parent[root_b] = root_a
+        else:
+            self.parent[root_a] = root_b
+
+    def group_of(self, row):
+        return self.groups[self.row_to_group[row]]
+
+    def merged_groups(self):
+        return [g for g in self.groups.values() if g["count"] > 1]
+
+def group_tasks():
+    return TaskGrouping(tasks).merged_groups()
 
 def parse_time_range(time_str):
     try:
@@ -357,6 +381,8 @@ def extract_markdown_links(text):
     return text.strip(), ""
 
 def style_tasks_and_summary(ws, n_tasks_rows, grouped, group_key_to_rows):
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.utils import get_column_letter
     thin = Border(left=Side(style='thin'),
                   right=Side(style='thin'),
                   top=Side(style='thin'),
@@ -415,29 +441,13 @@ def style_tasks_and_summary(ws, n_tasks_rows, grouped, group_key_to_rows):
             c.font = Font(bold=True)
             c.fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
             c.border = thin
-        sr = summary_header_row + 1
-        while sr <= ws.max_row:
-            a = ws.cell(row=sr, column=1).value
-            b = ws.cell(row=sr, column=2).value
-            c3 = ws.cell(row=sr, column=3).value
-            if a is None and b is None and c3 is None:
-                break
-            matched_key = None
-            for g in grouped:
-                if a and a == g["task"]:
-                    matched_key = g["key"]
-                    break
-                if b and b == parse_domain(g["link"] or ""):
-                    matched_key = g["key"]
-                    break
-            if matched_key:
-                fill = color_for_key(matched_key)
-                if fill:
-                    for col in range(1, max_col + 1):
-                        cell = ws.cell(row=sr, column=col)
-                        cell.fill = fill
-                        cell.border = thin
-            sr += 1
+        for sr, g in enumerate(grouped, start=summary_header_row + 1):
+            fill = color_for_key(g["key"])
+            if fill:
+                for col in range(1, max_col + 1):
+                    cell = ws.cell(row=sr, column=col)
+                    cell.fill = fill
+                    cell.border = thin
     if n_tasks_rows > 0:
         ws.auto_filter.ref = f"A1:D{1 + n_tasks_rows}"
     ws.freeze_panes = "A2"
@@ -458,6 +468,7 @@ def style_tasks_and_summary(ws, n_tasks_rows, grouped, group_key_to_rows):
         ws.column_dimensions[column].width = max(10, min(60, max_len + 2))
 
 def save_excel():
+    import openpyxl
     global SAVE_DIR
     today = datetime.date.today().strftime("%Y-%m-%d")
     file_name = os.path.join(SAVE_DIR, f"{today}.xlsx")
@@ -467,10 +478,9 @@ def save_excel():
     ws.append(["Задача", "Ссылка (домен)", "Время (мин:сек)", "Время (часы в сотых)"])
     total_minutes = 0.0
     total_hours_hundredths = 0.0
-    keys = [key_for_group(t) for t in tasks]
-    dup_keys = {k for k, c in Counter(keys).items() if c > 1}
+    grouping = TaskGrouping(tasks)
     row_to_key = {}
-    for t in tasks:
+    for row, t in enumerate(tasks):
         domain = parse_domain(t['link']) if t['link'] else ""
         row_index = ws.max_row + 1
         ws.cell(row=row_index, column=1, value=t['task'])
@@ -482,15 +492,15 @@ def save_excel():
             ws.cell(row=row_index, column=2, value="")
         ws.cell(row=row_index, column=3, value=t['time_str'])
         ws.cell(row=row_index, column=4, value=t['hours_hundredths'])
-        k = key_for_group(t)
-        if k in dup_keys:
-            row_to_key[row_index] = k
+        group = grouping.group_of(row)
+        if group["count"] > 1:
+            row_to_key[row_index] = group["key"]
         total_minutes += t['minutes']
         total_hours_hundredths += t['hours_hundredths']
     n_tasks_rows = len(tasks) + 1
     ws.append([])
     ws.append(["ИТОГО", "", f"{round(total_minutes, 2)} мин", f"{round(total_hours_hundredths, 2)} ч"])
-    grouped = group_tasks()
+    grouped = grouping.merged_groups()
     if grouped:
         ws.append([])
         ws.append(["СВОДКА (объединено по совпадению ссылки или названия)"])
@@ -1078,6 +1088,7 @@ class MainWindow(QMainWindow):
         msg_box.exec()
 
     def save_excel_gui(self):
+        import openpyxl
         global SAVE_DIR
         file_path, _ = QFileDialog.getSaveFileName(
             self,
@@ -1093,10 +1104,9 @@ class MainWindow(QMainWindow):
                 ws.append(["Задача", "Ссылка (домен)", "Время (мин:сек)", "Время (часы в сотых)"])
                 total_minutes = 0.0
                 total_hours_hundredths = 0.0
-                keys = [key_for_group(t) for t in tasks]
-                dup_keys = {k for k, c in Counter(keys).items() if c > 1}
+                grouping = TaskGrouping(tasks)
                 row_to_key = {}
-                for t in tasks:
+                for row, t in enumerate(tasks):
                     domain = parse_domain(t['link']) if t['link'] else ""
                     row_index = ws.max_row + 1
                     ws.cell(row=row_index, column=1, value=t['task'])
@@ -1108,15 +1118,15 @@ class MainWindow(QMainWindow):
                         ws.cell(row=row_index, column=2, value="")
                     ws.cell(row=row_index, column=3, value=t['time_str'])
                     ws.cell(row=row_index, column=4, value=t['hours_hundredths'])
-                    k = key_for_group(t)
-                    if k in dup_keys:
-                        row_to_key[row_index] = k
+                    group = grouping.group_of(row)
+                    if group["count"] > 1:
+                        row_to_key[row_index] = group["key"]
                     total_minutes += t['minutes']
                     total_hours_hundredths += t['hours_hundredths']
                 n_tasks_rows = len(tasks) + 1
                 ws.append([])
                 ws.append(["ИТОГО", "", f"{round(total_minutes, 2)} мин", f"{round(total_hours_hundredths, 2)} ч"])
-                grouped = group_tasks()
+                grouped = grouping.merged_groups()
                 if grouped:
                     ws.append([])
                     ws.append(["СВОДКА (объединено по совпадению ссылки или названия)"])
@@ -9,10 +9,6 @@ import ctypes
 import uuid
 import configparser
 from urllib.parse import urlparse
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-from collections import Counter
 from colorama import init, Fore, Style
 init(autoreset=True)
 
@@ -396,37 +392,69 @@ def remove_active_task(index):
     except Exception as e:
         print(Fore.RED + f"Ошибка удаления активной задачи: {e}")
 
-def group_tasks():
-    grouped = {}
-    for t in tasks:
-        link_key = t["link"].strip().lower() if t.get("link") else None
-        if link_key:
-            if link_key not in grouped:
-                grouped[link_key] = {
-                    "task": t["task"],
-                    "link": t["link"],
+# Группировка для сводки: задачи с одинаковой ссылкой ИЛИ одинаковым названием (без учёта
+# регистра и пробелов по краям) склеиваются в одну компоненту через union-find за один проход,
+# так что каждая задача попадает ровно в одну группу и её время не считается дважды.
+# Корень компоненты — её первая строка, id группы — id первой задачи
+class TaskGrouping:
+    def __init__(self, items):
+        self.items = items
+        self.parent = list(range(len(items)))
+        first_row = {}
+        for row, t in enumerate(items):
+            link_key = t["link"].strip().lower() if t.get("link") else None
+            if link_key:
+                self.union(first_row.setdefault(("link", link_key), row), row)
+            self.union(first_row.setdefault(("name", t["task"].strip().lower()), row), row)
+        self.groups = {}
+        self.row_to_group = []
+        for row, t in enumerate(items):
+            root = self.find(row)
+            group_id = items[root].get("id") or f"row-{root}"
+            group = self.groups.get(group_id)
+            if group is None:
+                group = self.groups[group_id] = {
+                    "key": group_id,
+                    "task": items[root]["task"],
+                    "link": "",
                     "minutes": 0.0,
                     "hours_hundredths": 0.0,
                     "count": 0,
-                    "key": link_key
+                    "rows": []
                 }
-            grouped[link_key]["minutes"] += t["minutes"]
-            grouped[link_key]["hours_hundredths"] += t["hours_hundredths"]
-            grouped[link_key]["count"] += 1
-        name_key = t["task"].strip().lower()
-        if name_key not in grouped:
-            grouped[name_key] = {
-                "task": t["task"],
-                "link": t["link"],
-                "minutes": 0.0,
-                "hours_hundredths": 0.0,
-                "count": 0,
-                "key": name_key
-            }
-        grouped[name_key]["minutes"] += t["minutes"]
-        grouped[name_key]["hours_hundredths"] += t["hours_hundredths"]
-        grouped[name_key]["count"] += 1
-    return [g for g in grouped.values() if g["count"] > 1]
+            if not group["link"] and t.get("link"):
+                group["link"] = t["link"]
+            group["minutes"] += t["minutes"]
+            group["hours_hundredths"] += t["hours_hundredths"]
+            group["count"] += 1
+            group["rows"].append(row)
+            self.row_to_group.append(group_id)
+
+    def find(self, row):
+        parent = self.parent
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return row
+
+    def union(self, a, b):
+        root_a = self.find(a)
+        root_b = self.find(b)
+        if root_a == root_b:
+            return
+        if root_a < root_b:
+            self.parent[root_b] = root_a
+        else:
+            self.parent[root_a] = root_b
+
+    def group_of(self, row):
+        return self.groups[self.row_to_group[row]]
+
+    def merged_groups(self):
+        return [g for g in self.groups.values() if g["count"] > 1]
+
+def group_tasks():
+    return TaskGrouping(tasks).merged_groups()
 
 def parse_time_range(time_str):
     try:
@@ -452,162 +480,133 @@ def extract_markdown_links(text):
         return clean_text.strip(), url.strip()
     return text.strip(), ""
 
-def style_tasks_and_summary(ws, n_tasks_rows, grouped, group_key_to_rows):
+EXCEL_HEADERS = ["Задача", "Ссылка (домен)", "Время (мин:сек)", "Время (часы в сотых)", "Период выполнения"]
+EXCEL_SUMMARY_TITLE = "СВОДКА (объединено по совпадению ссылки или названия)"
+EXCEL_PALETTE = [
+    "FFF2CC", "E2EFDA", "DDEBF7", "FCE4D6", "EDEDED",
+    "CCE5FF", "FFD966", "C6E0B4", "D9E1F2", "FFEB9C",
+    "E7E6E6", "D5E8D4", "D0CECE", "F8CBAD", "C9DAF8"
+]
+
+# Именованные стили регистрируются в книге один раз, ячейки ссылаются на них по имени
+def register_excel_styles(wb):
+    from openpyxl.styles import NamedStyle, Font, PatternFill, Alignment, Border, Side
     thin = Border(left=Side(style='thin'),
                   right=Side(style='thin'),
                   top=Side(style='thin'),
                   bottom=Side(style='thin'))
-    palette = [
-        "FFF2CC", "E2EFDA", "DDEBF7", "FCE4D6", "EDEDED",
-        "CCE5FF", "FFD966", "C6E0B4", "D9E1F2", "FFEB9C",
-        "E7E6E6", "D5E8D4", "D0CECE", "F8CBAD", "C9DAF8"
-    ]
-    def color_for_key(k):
-        if not k:
-            return None
-        idx = abs(hash(k)) % len(palette)
-        return PatternFill(start_color=palette[idx], end_color=palette[idx], fill_type="solid")
-    max_row = ws.max_row
-    max_col = ws.max_column
-    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-    for col in range(1, max_col + 1):
-        c = ws.cell(row=1, column=col)
-        c.font = Font(bold=True, color="FFFFFF")
-        c.alignment = Alignment(vertical="center", horizontal="left")
-        c.fill = header_fill
-        c.border = thin
-    for r in range(2, 2 + n_tasks_rows - 1 if n_tasks_rows > 0 else 1):
-        zebra = PatternFill(start_color="F7F7F7", end_color="F7F7F7", fill_type="solid") if (r % 2 == 0) else None
-        if r in group_key_to_rows["row_to_key"]:
-            k = group_key_to_rows["row_to_key"][r]
-            fill = color_for_key(k)
-        else:
-            fill = zebra
-        for col in range(1, max_col + 1):
-            cell = ws.cell(row=r, column=col)
-            if fill:
-                cell.fill = fill
-            cell.alignment = Alignment(vertical="center", wrap_text=True)
-            cell.border = thin
-    total_row = None
-    for r in range(1, ws.max_row + 1):
-        if ws.cell(row=r, column=1).value == "ИТОГО":
-            total_row = r
-            break
-    if total_row:
-        for col in range(1, max_col + 1):
-            c = ws.cell(row=total_row, column=col)
-            c.font = Font(bold=True)
-            c.fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-            c.border = thin
-    summary_header_row = None
-    for r in range(1, ws.max_row + 1):
-        if ws.cell(row=r, column=1).value == "СВОДКА (объединено по совпадению ссылки или названия)":
-            summary_header_row = r
-            break
-    if summary_header_row:
-        for col in range(1, max_col + 1):
-            c = ws.cell(row=summary_header_row, column=col)
-            c.font = Font(bold=True)
-            c.fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-            c.border = thin
-        sr = summary_header_row + 1
-        while sr <= ws.max_row:
-            a = ws.cell(row=sr, column=1).value
-            b = ws.cell(row=sr, column=2).value
-            c3 = ws.cell(row=sr, column=3).value
-            if a is None and b is None and c3 is None:
-                break
-            matched_key = None
-            for g in grouped:
-                if a and a == g["task"]:
-                    matched_key = g["key"]
-                    break
-                if b and b == parse_domain(g["link"] or ""):
-                    matched_key = g["key"]
-                    break
-            if matched_key:
-                fill = color_for_key(matched_key)
-                if fill:
-                    for col in range(1, max_col + 1):
-                        cell = ws.cell(row=sr, column=col)
-                        cell.fill = fill
-                        cell.border = thin
-            sr += 1
-    if n_tasks_rows > 0:
-        ws.auto_filter.ref = f"A1:E{1 + n_tasks_rows}"
-    ws.freeze_panes = "A2"
-    for row in ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=max_col):
-        for cell in row:
-            if not cell.border:
-                cell.border = thin
-            if not cell.alignment:
-                cell.alignment = Alignment(vertical="center")
-    for col in range(1, max_col + 1):
-        column = get_column_letter(col)
-        max_len = 0
-        for row in range(1, ws.max_row + 1):
-            val = ws.cell(row=row, column=col).value
-            if val is None:
-                continue
-            max_len = max(max_len, len(str(val)))
-        ws.column_dimensions[column].width = max(10, min(60, max_len + 2))
-
-def save_excel():
-    global SAVE_DIR
-    today = datetime.date.today().strftime("%Y-%m-%d")
-    file_name = os.path.join(SAVE_DIR, f"{today}.xlsx")
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Tasks"
-    ws.append(["Задача", "Ссылка (домен)", "Время (мин:сек)", "Время (часы в сотых)", "Период выполнения"])
+    link_font = Font(color="0563C1", underline="single")
+    def add_style(name, fill_color=None, font=None, wrap_text=False, horizontal=None):
+        style = NamedStyle(name=name)
+        style.border = thin
+        style.alignment = Alignment(vertical="center", horizontal=horizontal, wrap_text=wrap_text)
+        if fill_color:
+            style.fill = PatternFill(start_color=fill_color, end_color=fill_color, fill_type="solid")
+        if font:
+            style.font = font
+        wb.add_named_style(style)
+    add_style("wrk_header", "4F81BD", Font(bold=True, color="FFFFFF"), horizontal="left")
+    row_fills = [("wrk_row", None), ("wrk_zebra", "F7F7F7")]
+    row_fills += [(f"wrk_group{i}", color) for i, color in enumerate(EXCEL_PALETTE)]
+    for name, fill_color in row_fills:
+        add_style(name, fill_color, wrap_text=True)
+        add_style(name + "_link", fill_color, link_font, wrap_text=True)
+    add_style("wrk_total", "C6EFCE", Font(bold=True))
+    add_style("wrk_summary", "D9E1F2", Font(bold=True))
+
+def group_style_for_key(k):
+    return f"wrk_group{abs(hash(k)) % len(EXCEL_PALETTE)}"
+
+# Потоковая запись отчёта: книга в режиме write_only, строки уходят в файл сразу,
+# ширины колонок и итоги считаются за один проход по задачам
+def write_excel_report(file_name):
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Tasks")
+    register_excel_styles(wb)
+    widths = [len(h) for h in EXCEL_HEADERS]
+    def measure(values):
+        for col, val in enumerate(values):
+            if val is not None:
+                widths[col] = max(widths[col], len(str(val)))
+    rows = []
+    grouping = TaskGrouping(tasks)
     total_minutes = 0.0
     total_hours_hundredths = 0.0
-    keys = [key_for_group(t) for t in tasks]
-    dup_keys = {k for k, c in Counter(keys).items() if c > 1}
-    row_to_key = {}
-    for t in tasks:
-        domain = parse_domain(t['link']) if t['link'] else ""
-        row_index = ws.max_row + 1
-        ws.cell(row=row_index, column=1, value=t['task'])
-        if t['link']:
-            link_cell = ws.cell(row=row_index, column=2, value=domain)
-            link_cell.hyperlink = t['link']
-            link_cell.style = "Hyperlink"
-        else:
-            ws.cell(row=row_index, column=2, value="")
-        ws.cell(row=row_index, column=3, value=t['time_str'])
-        ws.cell(row=row_index, column=4, value=t['hours_hundredths'])
-        period_str = format_time_period(t.get('start_timestamp'), t.get('end_timestamp'))
-        ws.cell(row=row_index, column=5, value=period_str)
-        k = key_for_group(t)
-        if k in dup_keys:
-            row_to_key[row_index] = k
+    for row, t in enumerate(tasks):
+        values = (
+            t['task'],
+            parse_domain(t['link']) if t['link'] else "",
+            t['time_str'],
+            t['hours_hundredths'],
+            format_time_period(t.get('start_timestamp'), t.get('end_timestamp'))
+        )
+        measure(values)
+        rows.append((values, t['link'], grouping.group_of(row)))
         total_minutes += t['minutes']
         total_hours_hundredths += t['hours_hundredths']
-    n_tasks_rows = len(tasks) + 1
-    ws.append([])
-    ws.append(["ИТОГО", "", f"{round(total_minutes, 2)} мин", f"{round(total_hours_hundredths, 2)} ч", ""])
-    grouped = group_tasks()
+    total_values = ("ИТОГО", "", f"{round(total_minutes, 2)} мин", f"{round(total_hours_hundredths, 2)} ч", "")
+    measure(total_values)
+    summary_rows = []
+    grouped = grouping.merged_groups()
     if grouped:
-        ws.append([])
-        ws.append(["СВОДКА (объединено по совпадению ссылки или названия)"])
+        measure((EXCEL_SUMMARY_TITLE,))
         for gt in grouped:
-            ws.append([
+            values = (
                 gt["task"],
                 parse_domain(gt["link"]) if gt["link"] else "",
                 f"{round(gt['minutes'], 2)} мин",
                 f"{round(gt['hours_hundredths'], 2)} ч",
                 ""
-            ])
-    style_tasks_and_summary(
-        ws=ws,
-        n_tasks_rows=n_tasks_rows,
-        grouped=grouped,
-        group_key_to_rows={"row_to_key": row_to_key}
-    )
+            )
+            measure(values)
+            summary_rows.append((values, gt["key"]))
+
+    # Размеры колонок и закрепление пишутся в начало листа, поэтому задаются до первой строки
+    for col, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(col)].width = max(10, min(60, width + 2))
+    ws.freeze_panes = "A2"
+    if rows:
+        ws.auto_filter.ref = f"A1:E{1 + len(rows)}"
+
+    def styled_row(values, style, link=None):
+        row = []
+        for col, val in enumerate(values):
+            cell = WriteOnlyCell(ws, value=val)
+            if link and col == 1:
+                cell.hyperlink = link
+                cell.style = style + "_link"
+            else:
+                cell.style = style
+            row.append(cell)
+        return row
+
+    ws.append(styled_row(EXCEL_HEADERS, "wrk_header"))
+    for row_index, (values, link, group) in enumerate(rows, start=2):
+        if group["count"] > 1:
+            style = group_style_for_key(group["key"])
+        elif row_index % 2 == 0:
+            style = "wrk_zebra"
+        else:
+            style = "wrk_row"
+        ws.append(styled_row(values, style, link))
+    ws.append([])
+    ws.append(styled_row(total_values, "wrk_total"))
+    if summary_rows:
+        ws.append([])
+        ws.append(styled_row((EXCEL_SUMMARY_TITLE, "", "", "", ""), "wrk_summary"))
+        for values, k in summary_rows:
+            ws.append(styled_row(values, group_style_for_key(k)))
+    wb.save(file_name)
+
+def save_excel():
+    global SAVE_DIR
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    file_name = os.path.join(SAVE_DIR, f"{today}.xlsx")
     try:
-        wb.save(file_name)
+        write_excel_report(file_name)
         print(Fore.GREEN + f"Excel-отчёт сохранён: {file_name}")
         return file_name
     except Exception as e:
@@ -1590,56 +1589,7 @@ class MainWindow(QMainWindow):
         )
         if file_path:
             try:
-                wb = openpyxl.Workbook()
-                ws = wb.active
-                ws.title = "Tasks"
-                ws.append(["Задача", "Ссылка (домен)", "Время (мин:сек)", "Время (часы в сотых)", "Период выполнения"])
-                total_minutes = 0.0
-                total_hours_hundredths = 0.0
-                keys = [key_for_group(t) for t in tasks]
-                dup_keys = {k for k, c in Counter(keys).items() if c > 1}
-                row_to_key = {}
-                for t in tasks:
-                    domain = parse_domain(t['link']) if t['link'] else ""
-                    row_index = ws.max_row + 1
-                    ws.cell(row=row_index, column=1, value=t['task'])
-                    if t['link']:
-                        link_cell = ws.cell(row=row_index, column=2, value=domain)
-                        link_cell.hyperlink = t['link']
-                        link_cell.style = "Hyperlink"
-                    else:
-                        ws.cell(row=row_index, column=2, value="")
-                    ws.cell(row=row_index, column=3, value=t['time_str'])
-                    ws.cell(row=row_index, column=4, value=t['hours_hundredths'])
-                    period_str = format_time_period(t.get('start_timestamp'), t.get('end_timestamp'))
-                    ws.cell(row=row_index, column=5, value=period_str)
-                    k = key_for_group(t)
-                    if k in dup_keys:
-                        row_to_key[row_index] = k
-                    total_minutes += t['minutes']
-                    total_hours_hundredths += t['hours_hundredths']
-                n_tasks_rows = len(tasks) + 1
-                ws.append([])
-                ws.append(["ИТОГО", "", f"{round(total_minutes, 2)} мин", f"{round(total_hours_hundredths, 2)} ч", ""])
-                grouped = group_tasks()
-                if grouped:
-                    ws.append([])
-                    ws.append(["СВОДКА (объединено по совпадению ссылки или названия)"])
-                    for gt in grouped:
-                        ws.append([
-                            gt["task"],
-                            parse_domain(gt["link"]) if gt["link"] else "",
-                            f"{round(gt['minutes'], 2)} мин",
-                            f"{round(gt['hours_hundredths'], 2)} ч",
-                            ""
-                        ])
-                style_tasks_and_summary(
-                    ws=ws,
-                    n_tasks_rows=n_tasks_rows,
-                    grouped=grouped,
-                    group_key_to_rows={"row_to_key": row_to_key}
-                )
-                wb.save(file_path)
+                write_excel_report(file_path)
                 new_save_dir = os.path.dirname(file_path)
                 if new_save_dir != SAVE_DIR:
                     SAVE_DIR = new_save_dir
@@ -8,8 +8,26 @@ import tempfile
 import ctypes
 import uuid
 import configparser
-from urllib.parse import urlparse
-import csv
+import io
+import json
+import struct
+import zlib
+import base64
+import hashlib
+import heapq
+import random
+import queue
+import threading
+import itertools
+import asyncio
+import gzip
+from http import HTTPStatus
+from functools import lru_cache
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from urllib.parse import urlparse, urljoin, quote, unquote, parse_qs
+
+STARTUP_T0 = time.perf_counter()
 
 def set_dark_title_bar_qt(window):
     if sys.platform != "win32":
@@ -31,9 +49,40 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QH
                              QTextEdit, QLineEdit, QPushButton, QLabel, QScrollArea,
                              QFrame, QMessageBox, QFileDialog, QComboBox, QDialog,
                              QDialogButtonBox, QFormLayout, QSpinBox, QDoubleSpinBox,
-                             QCheckBox, QGroupBox, QGridLayout, QTabWidget)
-from PyQt6.QtCore import Qt, QTimer, QUrl, QTime, QSize, QPoint
-from PyQt6.QtGui import QFont, QDesktopServices, QColor, QTextCharFormat, QTextCursor, QPalette, QIcon
+                             QCheckBox, QGroupBox, QGridLayout, QTabWidget, QListView,
+                             QStyledItemDelegate, QStyle, QAbstractItemView, QDateEdit)
+from PyQt6.QtCore import (Qt, QTimer, QUrl, QTime, QDate, QSize, QPoint, QObject, QEvent, QRect, QRectF,
+                          QAbstractListModel, QModelIndex, QPersistentModelIndex, pyqtSignal)
+from PyQt6.QtGui import (QFont, QDesktopServices, QColor, QTextCharFormat, QTextCursor, QPalette, QIcon,
+                         QPainter, QFontMetrics)
+
+# Замеры холодного старта: python wrktmr041.py --startup-profile
+class StartupProfiler:
+    def __init__(self, t0):
+        self.enabled = "--startup-profile" in sys.argv
+        self.t0 = t0
+        self.last = t0
+        self.phases = []
+        self.reported = False
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+
+    def report(self):
+        if self.reported:
+            return
+        self.reported = True
+        if not self.enabled:
+            return
+        print("[startup] Время запуска по фазам:")
+        for phase, elapsed_ms in self.phases:
+            print(f"[startup]   {phase:<20} {elapsed_ms:8.1f} мс")
+        print(f"[startup]   {'итого':<20} {(self.last - self.t0) * 1000:8.1f} мс")
+
+startup_profiler = StartupProfiler(STARTUP_T0)
+startup_profiler.mark("import")
 
 def resource_path(relative_path):
     try:
@@ -54,71 +103,66 @@ def get_log_dir():
 CONFIG_FILE = os.path.join(get_config_dir(), "settings.ini")
 _save_settings_lock = False
 
+default_user_settings = {
+    'save_dir': os.path.join(os.path.expanduser("~"), "Desktop"),
+    'window_x': '14',
+    'window_y': '357',
+    'window_width': '579',
+    'window_height': '698',
+    'show_hints': 'true',
+    'always_on_top': 'false',
+    'auto_save_interval': '10',
+    'task_font_size': '13',
+    'journal_mode': 'false',
+    'journal_compact_every': '200',
+    'storage_backend': 'text',
+    'task_list_mode': 'widgets',
+    'settings_flush_ms': '500',
+    'checkpoint_format': 'binary'
+}
+
+default_sync_settings = {
+    'provider': 'caldav',
+    'enabled': 'false',
+    'caldav_url': '',
+    'caldav_user': '',
+    'caldav_password': '',
+    'interval_min': '15',
+    'ics_path': '',
+    'ics_days': '30',
+    'feed_enabled': 'false',
+    'feed_port': '8765'
+}
+
 def load_settings():
     config = configparser.ConfigParser(interpolation=None)
-    if not os.path.exists(CONFIG_FILE):
-        os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
-        config['USER'] = {
-            'save_dir': os.path.join(os.path.expanduser("~"), "Desktop"),
-            'window_x': '14',
-            'window_y': '357',
-            'window_width': '579',
-            'window_height': '698',
-            'show_hints': 'true',
-            'always_on_top': 'false',
-            'auto_save_interval': '10',
-            'task_font_size': '13'
-        }
-        try:
-            with open(CONFIG_FILE, 'w', encoding='utf-8') as configfile:
-                config.write(configfile)
-        except Exception as e:
-            print(f"[ERROR] Не удалось создать файл настроек '{CONFIG_FILE}': {e}")
-    else:
+    changed = not os.path.exists(CONFIG_FILE)
+    if not changed:
         try:
             config.read(CONFIG_FILE, encoding='utf-8')
-            if 'USER' not in config:
-                config['USER'] = {
-                    'save_dir': os.path.join(os.path.expanduser("~"), "Desktop"),
-                    'window_x': '14',
-                    'window_y': '357',
-                    'window_width': '579',
-                    'window_height': '698',
-                    'show_hints': 'true',
-                    'always_on_top': 'false',
-                    'auto_save_interval': '10',
-                    'task_font_size': '13'
-                }
-                save_settings(config)
-            else:
-                default_user_settings = {
-                    'save_dir': os.path.join(os.path.expanduser("~"), "Desktop"),
-                    'window_x': '14',
-                    'window_y': '357',
-                    'window_width': '579',
-                    'window_height': '698',
-                    'show_hints': 'true',
-                    'always_on_top': 'false',
-                    'auto_save_interval': '10',
-                    'task_font_size': '13'
-                }
-                for key, default_value in default_user_settings.items():
-                    if key not in config['USER']:
-                        config['USER'][key] = default_value
-                save_settings(config)
         except Exception as e:
             print(f"[ERROR] Не удалось прочитать файл настроек '{CONFIG_FILE}': {e}")
-            config['USER'] = {
-                'save_dir': os.path.join(os.path.expanduser("~"), "Desktop"),
-                'window_x': '14',
-                'window_y': '357',
-                'window_width': '579',
-                'window_height': '698',
-                'show_hints': 'true',
-                'always_on_top': 'false',
-                'auto_save_interval': '10',
-                'task_font_size': '13'
-            }
+            config = configparser.ConfigParser(interpolation=None)
+            config['USER'] = dict(default_user_settings)
+            config['SYNC'] = dict(default_sync_settings)
+            return config
+    if 'USER' not in config:
+        config['USER'] = {}
+        changed = True
+    for key, default_value in default_user_settings.items():
+        if key not in config['USER']:
+            config['USER'][key] = default_value
+            changed = True
+    if 'SYNC' not in config:
+        config['SYNC'] = {}
+        changed = True
+    for key, default_value in default_sync_settings.items():
+        if key not in config['SYNC']:
+            config['SYNC'][key] = default_value
+            changed = True
+    if changed:
+        os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
+        save_settings(config)
     return config
 
 def save_settings(config):
@@ -129,58 +173,675 @@ def save_settings(config):
         print(f"[ERROR] Не удалось сохранить настройки в '{CONFIG_FILE}': {e}")
 
 app_config = load_settings()
-if 'USER' not in app_config:
-    app_config['USER'] = {}
 user_section = app_config['USER']
 
-default_user_settings = {
-    'save_dir': os.path.join(os.path.expanduser("~"), "Desktop"),
-    'window_x': '14',
-    'window_y': '357',
-    'window_width': '579',
-    'window_height': '698',
-    'show_hints': 'true',
-    'always_on_top': 'false',
-    'auto_save_interval': '10',
-    'task_font_size': '13'
-}
-
-for key, default_value in default_user_settings.items():
-    if key not in user_section:
-        user_section[key] = default_value
-
 SHOW_HINTS = user_section.getboolean('show_hints', fallback=True)
 ALWAYS_ON_TOP = user_section.getboolean('always_on_top', fallback=False)
 AUTO_SAVE_INTERVAL = user_section.getint('auto_save_interval', fallback=10)
 TASK_FONT_SIZE = user_section.getint('task_font_size', fallback=13)
+JOURNAL_MODE = user_section.getboolean('journal_mode', fallback=False)
+JOURNAL_COMPACT_EVERY = user_section.getint('journal_compact_every', fallback=200)
+STORAGE_BACKEND = user_section.get('storage_backend', 'text')
+TASK_LIST_MODE = user_section.get('task_list_mode', 'widgets')
+SETTINGS_FLUSH_MS = user_section.getint('settings_flush_ms', fallback=500)
+CHECKPOINT_FORMAT = user_section.get('checkpoint_format', 'binary')
+sync_section = app_config['SYNC']
+SYNC_PROVIDER = sync_section.get('provider', 'caldav')
+SYNC_ENABLED = sync_section.getboolean('enabled', fallback=False)
+CALDAV_URL = sync_section.get('caldav_url', '')
+CALDAV_USER = sync_section.get('caldav_user', '')
+CALDAV_PASSWORD = sync_section.get('caldav_password', '')
+SYNC_INTERVAL_MIN = sync_section.getint('interval_min', fallback=15)
+ICS_PATH = sync_section.get('ics_path', '')
+ICS_DAYS = sync_section.getint('ics_days', fallback=30)
+FEED_ENABLED = sync_section.getboolean('feed_enabled', fallback=False)
+FEED_PORT = sync_section.getint('feed_port', fallback=8765)
+
+def caldav_configured():
+    return SYNC_PROVIDER == "caldav" and bool(CALDAV_URL)
+
+# ─── Фоновая запись на диск ──────────────────────────────────────
+# Снимки данных готовятся в потоке интерфейса, а на диск их пишет один фоновый поток строго по очереди.
+# Свежий снимок с тем же ключом подменяет ещё не начатое задание на его месте в очереди, но только
+# если после него не вставали задания без ключа: дописывание в журнал или очередь синхронизации
+# не должно обогнать снимок, на который оно рассчитано. Иначе снимок встаёт в конец очереди.
+# Пока поток не запущен (консольный режим, замеры), задания выполняются сразу.
+
+def write_file_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part_file = path + ".part"
+    if isinstance(data, bytes):
+        with open(part_file, "wb") as f:
+            f.write(data)
+    else:
+        with open(part_file, "w", encoding="utf-8", newline="") as f:
+            f.write(data)
+    os.replace(part_file, path)
+
+def append_text_file(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+def remove_files(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+class IOJob:
+    __slots__ = ("key", "func", "args", "seq")
+
+    def __init__(self, key, func, args, seq=0):
+        self.key = key
+        self.func = func
+        self.args = args
+        self.seq = seq
+
+    def name(self):
+        return self.key or self.func.__name__
+
+class IOWorker(QObject):
+    finished = pyqtSignal(str, object)
+    failed = pyqtSignal(str, object)
+
+    def __init__(self, name="wrktmr-io", title="Фоновая запись"):
+        super().__init__()
+        self.name = name
+        self.title = title
+        self.queue = queue.Queue()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.seq = 0
+        self.last_unkeyed = 0
+        self.submitted = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.errors = 0
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+            self.thread.start()
+
+    def submit(self, key, func, *args):
+        with self.lock:
+            self.submitted += 1
+            if self.thread is not None:
+                previous = self.pending.get(key) if key is not None else None
+                if previous is not None and previous.seq > self.last_unkeyed:
+                    previous.func = func
+                    previous.args = args
+                    self.coalesced += 1
+                    return
+                self.seq += 1
+                job = IOJob(key, func, args, self.seq)
+                if key is None:
+                    self.last_unkeyed = self.seq
+                else:
+                    self.pending[key] = job
+                self.queue.put(job)
+                return
+        self.execute(IOJob(key, func, args))
+
+    def execute(self, job):
+        try:
+            result = job.func(*job.args)
+        except Exception as e:
+            self.errors += 1
+            print(f"{self.title}: ошибка ({job.name()}): {e}")
+            self.failed.emit(job.name(), e)
+            return
+        self.completed += 1
+        self.finished.emit(job.name(), result)
+
+    def run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is None:
+                    return
+                with self.lock:
+                    if self.pending.get(job.key) is job:
+                        del self.pending[job.key]
+                self.execute(job)
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        if self.thread is not None:
+            self.queue.join()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        print(f"{self.title} остановлена: заданий {self.submitted}, выполнено {self.completed}, "
+              f"объединено {self.coalesced}, ошибок {self.errors}")
+
+io_worker = IOWorker()
+# Сетевая синхронизация идёт в своём потоке, чтобы медленный сервер не задерживал запись на диск
+sync_worker = IOWorker("wrktmr-sync", "Синхронизация")
+
+# Изменения настроек копятся в памяти и пишутся на диск не чаще раза в SETTINGS_FLUSH_MS
+class SettingsManager:
+    def __init__(self, config, flush_ms):
+        self.config = config
+        self.flush_ms = flush_ms
+        self.dirty = False
+        self.timer = None
+        self.last_written = self.render()
+
+    def render(self):
+        buffer = io.StringIO()
+        self.config.write(buffer)
+        return buffer.getvalue()
+
+    def mark_dirty(self):
+        self.dirty = True
+        if QApplication.instance() is None:
+            self.flush()
+            return
+        if self.timer is None:
+            self.timer = QTimer()
+            self.timer.setSingleShot(True)
+            self.timer.timeout.connect(self.flush)
+        if not self.timer.isActive():
+            self.timer.start(self.flush_ms)
+
+    def flush(self):
+        if self.timer:
+            self.timer.stop()
+        if not self.dirty:
+            return
+        self.dirty = False
+        content = self.render()
+        if content == self.last_written:
+            return
+        io_worker.submit("settings", self.write, content)
+
+    def write(self, content):
+        with open(CONFIG_FILE, 'w', encoding='utf-8') as configfile:
+            configfile.write(content)
+        self.last_written = content
 
-save_settings(app_config)
+settings_manager = SettingsManager(app_config, SETTINGS_FLUSH_MS)
 
 LOG_DIR = get_log_dir()
-os.makedirs(LOG_DIR, exist_ok=True)
+startup_profiler.mark("settings")
 
 SAVE_DIR = user_section.get('save_dir', os.path.join(os.path.expanduser("~"), "Desktop"))
 
 tasks = []
 
+def format_minutes(minutes):
+    return "<1 минуты" if minutes < 1 else f"{int(minutes)}:{int((minutes%1)*60):02d}"
+
+# Компактная запись задачи вместо словаря: поля лежат в __slots__, название, ссылка и день
+# интернируются, а time_str и hours_hundredths хранятся, только если отличаются от
+# вычисленных из minutes. Снаружи запись ведёт себя как dict (t["task"], t.get, "timer_start" in t,
+# del, update, copy, items), поэтому остальной код работает с ней так же, как со словарём:
+# смена minutes не меняет уже записанные time_str и hours_hundredths, и порядок ключей в update
+# не важен. Неизвестные ключи складываются в _extra. TaskStore хранит только Task; json.dumps
+# запись не принимает, для сериализации нужен dict(t)
+class Task(MutableMapping):
+    __slots__ = ("id", "task", "link", "minutes", "start_timestamp", "end_timestamp", "timer_start",
+                 "paused_total", "pause_history", "is_paused", "paused_elapsed", "day",
+                 "_time_str", "_hours_hundredths", "_extra")
+    FIELDS = ("id", "task", "link", "minutes", "time_str", "hours_hundredths", "start_timestamp",
+              "end_timestamp", "timer_start", "paused_total", "pause_history", "is_paused", "paused_elapsed", "day")
+    SLOT_FIELDS = frozenset(FIELDS) - {"time_str", "hours_hundredths"}
+    INTERNED = frozenset(("task", "link", "day"))
+
+    def __init__(self, data=None, **kwargs):
+        self._time_str = None
+        self._hours_hundredths = None
+        self._extra = None
+        # minutes ставятся первыми, чтобы time_str и hours_hundredths сравнивались с уже известным значением
+        for source in (data, kwargs):
+            if source:
+                if "minutes" in source:
+                    self["minutes"] = source["minutes"]
+                self.update(source)
+
+    @classmethod
+    def from_mapping(cls, data):
+        return data if isinstance(data, cls) else cls(data)
+
+    def derived_time_str(self):
+        return format_minutes(self.minutes)
+
+    def derived_hours_hundredths(self):
+        return round(self.minutes / 60, 2)
+
+    def __getitem__(self, key):
+        if key == "time_str":
+            if self._time_str is not None:
+                return self._time_str
+            try:
+                return self.derived_time_str()
+            except AttributeError:
+                raise KeyError(key)
+        if key == "hours_hundredths":
+            if self._hours_hundredths is not None:
+                return self._hours_hundredths
+            try:
+                return self.derived_hours_hundredths()
+            except AttributeError:
+                raise KeyError(key)
+        if key in Task.SLOT_FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key == "time_str":
+            try:
+                self._time_str = None if value == self.derived_time_str() else value
+            except AttributeError:
+                self._time_str = value
+        elif key == "hours_hundredths":
+            try:
+                self._hours_hundredths = None if value == self.derived_hours_hundredths() else value
+            except AttributeError:
+                self._hours_hundredths = value
+        elif key == "minutes":
+            if hasattr(self, "minutes"):
+                time_str = self["time_str"]
+                hours_hundredths = self["hours_hundredths"]
+                self.minutes = value
+                self["time_str"] = time_str
+                self["hours_hundredths"] = hours_hundredths
+            else:
+                self.minutes = value
+        elif key in Task.SLOT_FIELDS:
+            if key in Task.INTERNED and type(value) is str:
+                value = sys.intern(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key == "time_str":
+            self._time_str = None
+        elif key == "hours_hundredths":
+            self._hours_hundredths = None
+        elif key in Task.SLOT_FIELDS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in Task.SLOT_FIELDS:
+            return hasattr(self, key)
+        if key == "time_str":
+            return self._time_str is not None or hasattr(self, "minutes")
+        if key == "hours_hundredths":
+            return self._hours_hundredths is not None or hasattr(self, "minutes")
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for key in Task.FIELDS:
+            if key in self:
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def copy(self):
+        return Task(self)
+
+    def __repr__(self):
+        return f"Task({dict(self)!r})"
+
+# Минуты по ключу (домен или название) с ленивой кучей для топ-k: устаревшие записи
+# выбрасываются при чтении, а куча пересобирается, когда мусора в ней больше, чем живых ключей
+class TopCounter:
+    def __init__(self):
+        self.values = {}
+        self.counts = {}
+        self.heap = []
+
+    def add(self, key, minutes, count=1):
+        remaining = self.counts.get(key, 0) + count
+        if remaining <= 0:
+            self.values.pop(key, None)
+            self.counts.pop(key, None)
+        else:
+            value = self.values.get(key, 0.0) + minutes
+            self.values[key] = value
+            self.counts[key] = remaining
+            heapq.heappush(self.heap, (-value, key))
+        if len(self.heap) > 2 * len(self.values) + 32:
+            self.heap = [(-value, key) for key, value in self.values.items()]
+            heapq.heapify(self.heap)
+
+    def top(self, k):
+        result = []
+        kept = []
+        seen = set()
+        while self.heap and len(result) < k:
+            entry = heapq.heappop(self.heap)
+            neg_value, key = entry
+            if key in seen or self.values.get(key) != -neg_value:
+                continue
+            seen.add(key)
+            kept.append(entry)
+            result.append((key, -neg_value))
+        for entry in kept:
+            heapq.heappush(self.heap, entry)
+        return result
+
+# Накопительные итоги для статистики. Вклад каждой задачи запоминается при индексации,
+# поэтому при повторной индексации вычитается ровно то, что было добавлено, даже если
+# словарь задачи уже изменили на месте. Время активных задач считается как
+# count * now - Σ(timer_start + paused_total), без обхода списка
+class TaskAggregates:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.contrib = {}
+        self.count = 0
+        self.minutes = 0.0
+        self.hours_hundredths = 0.0
+        self.running = {"active": [0, 0.0], "paused": [0, 0.0]}
+        self.by_domain = TopCounter()
+        self.by_name = TopCounter()
+
+    def add(self, task):
+        state = None
+        offset = 0.0
+        if "timer_start" in task:
+            state = "paused" if task.get("is_paused", False) else "active"
+            offset = task["timer_start"] + task.get("paused_total", 0.0)
+        entry = (
+            task.get("minutes", 0),
+            task.get("hours_hundredths", 0),
+            parse_domain(task["link"]) if task.get("link") else None,
+            task["task"],
+            state,
+            offset
+        )
+        self.contrib[task["id"]] = entry
+        self.apply(entry, 1)
+
+    def remove(self, task_id):
+        entry = self.contrib.pop(task_id, None)
+        if entry is not None:
+            self.apply(entry, -1)
+
+    def apply(self, entry, sign):
+        minutes, hours_hundredths, domain, name, state, offset = entry
+        self.count += sign
+        self.minutes += sign * minutes
+        self.hours_hundredths += sign * hours_hundredths
+        if state:
+            self.running[state][0] += sign
+            self.running[state][1] += sign * offset
+        if domain is not None:
+            self.by_domain.add(domain, sign * minutes, sign)
+        self.by_name.add(name, sign * minutes, sign)
+        if self.count == 0:
+            self.minutes = 0.0
+            self.hours_hundredths = 0.0
+
+    def running_count(self, state):
+        return self.running[state][0]
+
+    def running_minutes(self, state, now=None):
+        count, offsets = self.running[state]
+        if not count:
+            return 0.0
+        if now is None:
+            now = time.time()
+        return (count * now - offsets) / 60
+
+def task_key(task):
+    return (normalize_name(task.get("task", "")), (task.get("link") or "").strip())
+
+# Обёртка над списком tasks: все изменения из интерфейса идут через неё,
+# а подписчики получают события "inserted" / "updated" / "removed" / "reset" с id задачи.
+# generation растёт при каждом изменении, по нему автосохранение понимает, что писать нечего.
+# Рядом со списком держатся индексы по id, по паре (название, ссылка) и набор активных задач;
+# после массовой загрузки напрямую в tasks их нужно пересобрать через reindex()
+class TaskStore:
+    def __init__(self, items):
+        self.items = items
+        self.listeners = []
+        self.by_id = {}
+        self.by_key = {}
+        self.key_of = {}
+        self.active = {}
+        self.stats = TaskAggregates()
+        self.generation = 0
+        self.reindex()
+
+    def subscribe(self, listener):
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def emit(self, event, task_id=None):
+        self.generation += 1
+        for listener in list(self.listeners):
+            listener(event, task_id)
+
+    def reindex(self):
+        self.generation += 1
+        self.by_id.clear()
+        self.by_key.clear()
+        self.key_of.clear()
+        self.active.clear()
+        self.stats.clear()
+        for t in self.items:
+            self.index_task(t)
+
+    def index_task(self, task):
+        task_id = task.get("id")
+        if not task_id:
+            return
+        self.by_id[task_id] = task
+        key = task_key(task)
+        self.by_key.setdefault(key, {})[task_id] = task
+        self.key_of[task_id] = key
+        if "timer_start" in task:
+            self.active[task_id] = task
+        else:
+            self.active.pop(task_id, None)
+        self.stats.add(task)
+
+    def unindex_task(self, task_id):
+        self.by_id.pop(task_id, None)
+        self.active.pop(task_id, None)
+        self.stats.remove(task_id)
+        key = self.key_of.pop(task_id, None)
+        if key is not None:
+            same_key = self.by_key.get(key)
+            if same_key is not None:
+                same_key.pop(task_id, None)
+                if not same_key:
+                    del self.by_key[key]
+
+    def contains(self, task_id):
+        return task_id in self.by_id
+
+    def find_by_key(self, task, link):
+        same_key = self.by_key.get(task_key({"task": task, "link": link}))
+        if not same_key:
+            return None
+        return next(iter(same_key.values()))
+
+    def active_tasks(self):
+        return [t for t in self.active.values() if "timer_start" in t]
+
+    def index_of(self, task_id):
+        target = self.by_id.get(task_id)
+        if target is None:
+            return -1
+        for i, t in enumerate(self.items):
+            if t is target:
+                return i
+        return -1
+
+    def get(self, task_id):
+        return self.by_id.get(task_id)
+
+    def display_position(self, task_id):
+        target = self.get(task_id)
+        if target is None:
+            return -1
+        is_active = "timer_start" in target
+        position = 0
+        for t in self.items:
+            if t is target:
+                break
+            if ("timer_start" in t) == is_active:
+                position += 1
+        if is_active:
+            position += sum(1 for t in self.items if "timer_start" not in t)
+        return position
+
+    def add(self, task):
+        task = Task.from_mapping(task)
+        self.items.append(task)
+        self.index_task(task)
+        self.emit("inserted", task["id"])
+        return task
+
+    def update(self, task_id, data=None):
+        task = self.get(task_id)
+        if task is None:
+            return None
+        if data:
+            task.update(data)
+        self.unindex_task(task_id)
+        self.index_task(task)
+        self.emit("updated", task_id)
+        return task
+
+    # Массовое слияние (импорт): одно событие "reset" вместо события на каждую задачу
+    def merge(self, added=(), updated=()):
+        for task_id, data in updated:
+            task = self.by_id.get(task_id)
+            if task is None:
+                continue
+            task.update(data)
+            self.unindex_task(task_id)
+            self.index_task(task)
+        for task in added:
+            self.items.append(task)
+            self.index_task(task)
+        self.emit("reset")
+
+    def replace(self, task_id, new_task):
+        index = self.index_of(task_id)
+        if index < 0:
+            return None
+        new_task = Task.from_mapping(new_task)
+        self.items[index] = new_task
+        self.unindex_task(task_id)
+        self.index_task(new_task)
+        self.emit("updated", task_id)
+        return new_task
+
+    def remove(self, task_id):
+        index = self.index_of(task_id)
+        if index < 0:
+            return None
+        removed = self.items.pop(index)
+        self.unindex_task(task_id)
+        self.emit("removed", task_id)
+        return removed
+
+    def clear(self):
+        self.items.clear()
+        self.reindex()
+        self.emit("reset")
+
+task_store = TaskStore(tasks)
+
 active_tasks_file = os.path.join(LOG_DIR, "active_tasks.tmp")
+active_tasks_bin_file = os.path.join(LOG_DIR, "active_tasks.bin")
+
+# Бинарная контрольная точка активных задач (little-endian):
+#   заголовок: b"WTAC", версия u16, число задач u32, crc32 тела u32
+#   задача:    timer_start, start_timestamp, paused_total f64, is_paused u8,
+#              длины id / названия / ссылки u32, число пауз u32,
+#              затем строки UTF-8 и пары начало/конец паузы f64 (NaN — нет значения)
+CHECKPOINT_MAGIC = b"WTAC"
+CHECKPOINT_VERSION = 1
+CHECKPOINT_HEADER = struct.Struct("<4sHII")
+CHECKPOINT_RECORD = struct.Struct("<dddBIIII")
 
-active_save_timer = None
+SQLITE_DB_FILE = os.path.join(get_config_dir(), "wrktmr.db")
+_sqlite_conn = None
+
+JOURNAL_FIELDS = ("task", "link", "time_str", "minutes", "hours_hundredths", "start_timestamp", "end_timestamp")
+journal_pending = 0
+journal_ready_file = None
 
 def signal_handler(sig, frame):
     print("\nОбнаружено Ctrl+C! Сохраняем данные...")
     save_backup()
-    print(Данные сохранены. Программа завершена.")
+    io_worker.stop()
+    print("Данные сохранены. Программа завершена.")
     sys.exit(0)
 
 signal.signal(signal.SIGINT, signal_handler)
 
-def parse_domain(url):
+# ─── Нормализация ссылок и названий ──────────────────────────────
+
+# Одни и те же ссылки и названия разбираются в статистике, группировке и отчётах много раз,
+# поэтому результат кэшируется в ограниченном LRU
+NORMALIZE_CACHE_SIZE = 16384
+
+# Ссылка -> (ключ для группировки, netloc для показа)
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_link(link):
+    if not link:
+        return "", link or ""
     try:
-        parsed = urlparse(url)
-        return parsed.netloc or url
-    except:
-        return url
+        netloc = urlparse(link).netloc or link
+    except Exception:
+        netloc = link
+    return link.strip().lower(), netloc
+
+# Название -> ключ без регистра и пробелов по краям
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_name(name):
+    return name.strip().lower()
+
+def normalization_cache_stats():
+    stats = {}
+    for kind, func in (("link", normalize_link), ("name", normalize_name)):
+        info = func.cache_info()
+        stats[kind] = {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+    return stats
+
+def parse_domain(url):
+    return normalize_link(url)[1]
 
 def format_time_period(start_timestamp, end_timestamp):
     try:
@@ -216,106 +877,357 @@ def format_time_range(start_timestamp, end_timestamp=None, is_paused=False):
         print(f"Ошибка форматирования времени: {e}")
         return "Время неизвестно"
 
+def task_time_text(task_data):
+    if "timer_start" in task_data:
+        paused_total = task_data.get("paused_total", 0.0)
+        if task_data.get("is_paused", False):
+            elapsed = task_data.get("paused_elapsed", 0.0)
+            time_range_str = format_time_range(task_data['start_timestamp'], is_paused=True)
+            color = "#ffd600"
+        else:
+            elapsed = time.time() - task_data['timer_start'] - paused_total
+            time_range_str = format_time_range(task_data['start_timestamp'])
+            color = "#69f0ae"
+        minutes = int(elapsed // 60)
+        hours_hundredths = round(elapsed / 3600, 2)
+    else:
+        minutes = int(task_data['minutes'])
+        hours_hundredths = task_data['hours_hundredths']
+        start_ts = task_data.get('start_timestamp')
+        end_ts = task_data.get('end_timestamp')
+        time_range_str = format_time_range(start_ts, end_ts) if start_ts else ""
+        color = "#aaa"
+    return f"{minutes} мин ({hours_hundredths} ч) {time_range_str}", color
+
 def key_for_group(t):
     if t.get("link"):
-        return t["link"].strip().lower()
-    return t["task"].strip().lower()
+        return normalize_link(t["link"])[0]
+    return normalize_name(t["task"])
+
+def get_journal_file():
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    return os.path.join(LOG_DIR, f"{today}.journal")
+
+def backup_line(t):
+    start_ts_str = str(t.get('start_timestamp', ''))
+    end_ts_str = str(t.get('end_timestamp', ''))
+    return f"{t['task']} | {t['link']} | {t['time_str']} | {t['hours_hundredths']} | {start_ts_str} | {end_ts_str} | {t.get('id', '')}\n"
 
 def save_backup():
+    if STORAGE_BACKEND == "sqlite":
+        sqlite_save_backup()
+        return
     today = datetime.date.today().strftime("%Y-%m-%d")
     log_file = os.path.join(LOG_DIR, f"{today}.txt")
-    os.makedirs(os.path.dirname(log_file), exist_ok=True)
-    with open(log_file, "w", encoding="utf-8") as f:
-        for t in tasks:
-            if "timer_start" not in t:
-                clean_t = {k: v for k, v in t.items() if k not in ['timer_start']}
-                start_ts_str = str(clean_t.get('start_timestamp', ''))
-                end_ts_str = str(clean_t.get('end_timestamp', ''))
-                f.write(f"{clean_t['task']} | {clean_t['link']} | {clean_t['time_str']} | {clean_t['hours_hundredths']} | {start_ts_str} | {end_ts_str}\n")
+    lines = [backup_line(t) for t in tasks if "timer_start" not in t]
+    io_worker.submit("backup", write_file_atomic, log_file, "".join(lines))
+    if JOURNAL_MODE:
+        compact_journal()
+
+# ─── Журнал изменений ─────────────────────────────────────────────
+# После сжатия журнал содержит записи "add" для всех завершённых задач, дальше только дописывается
+
+def journal_record(op, task):
+    record = {"op": op, "id": task.get("id")}
+    if op != "delete":
+        record["task"] = {k: task[k] for k in JOURNAL_FIELDS if k in task}
+    return json.dumps(record, ensure_ascii=False)
+
+def compact_journal():
+    global journal_pending, journal_ready_file
+    journal_file = get_journal_file()
+    lines = [journal_record("add", t) + "\n" for t in tasks if "timer_start" not in t]
+    io_worker.submit("journal", write_file_atomic, journal_file, "".join(lines))
+    journal_pending = 0
+    journal_ready_file = journal_file
+
+# Дописывать можно только в журнал, сжатый в этом сеансе: наличие файла не проверяется на диске
+def append_journal(op, task):
+    global journal_pending
+    journal_file = get_journal_file()
+    if journal_file != journal_ready_file:
+        compact_journal()
+        return
+    io_worker.submit(None, append_text_file, journal_file, journal_record(op, task) + "\n")
+    journal_pending += 1
+    if journal_pending >= JOURNAL_COMPACT_EVERY:
+        save_backup()
+
+def remove_journal_file():
+    global journal_ready_file
+    journal_ready_file = None
+    io_worker.submit("journal", remove_files, get_journal_file())
+
+def record_task_change(op, task):
+    if caldav_configured() and "timer_start" not in task:
+        sync_outbox.record(op, task)
+    if STORAGE_BACKEND == "sqlite":
+        if "timer_start" not in task:
+            sqlite_record_task_change(op, task)
+        return
+    if not JOURNAL_MODE:
+        save_backup()
+        return
+    if "timer_start" in task:
+        return
+    append_journal(op, task)
+
+def replay_journal(journal_file):
+    replayed = {}
+    with open(journal_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                op = record["op"]
+                task_id = record["id"]
+                if op == "delete":
+                    replayed.pop(task_id, None)
+                elif op in ("add", "update"):
+                    task_entry = dict(record["task"])
+                    task_entry["id"] = task_id
+                    if task_id in replayed:
+                        replayed[task_id].update(task_entry)
+                    else:
+                        replayed[task_id] = task_entry
+            except Exception as e:
+                print(f"Пропущена повреждённая запись журнала: {e}")
+    return [Task(t) for t in replayed.values()]
+
+def legacy_task_id(log_file, line_no, line):
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"wrktmr:{os.path.basename(log_file)}:{line_no}:{line.strip()}"))
+
+def parse_backup_file(log_file):
+    parsed = []
+    with open(log_file, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f):
+            try:
+                parts = line.strip().split(" | ")
+                if len(parts) < 4:
+                    continue
+                task, link, time_str, hours_hundredths_str = parts[0], parts[1], parts[2], parts[3]
+                if time_str == "<1 минуты":
+                    minutes = 0.5
+                else:
+                    if "-" in time_str:
+                        minutes = parse_time_range(time_str)
+                    else:
+                        try:
+                            mins, secs = map(int, time_str.split(":"))
+                            minutes = mins + secs / 60
+                        except:
+                            minutes = float(time_str) if time_str.replace('.','',1).isdigit() else 0.0
+                if len(parts) >= 7 and parts[6]:
+                    task_id = parts[6]
+                else:
+                    task_id = legacy_task_id(log_file, line_no, line)
+                task_entry = {
+                    "id": task_id,
+                    "task": task,
+                    "link": link,
+                    "time_str": time_str,
+                    "minutes": round(minutes, 2),
+                    "hours_hundredths": float(hours_hundredths_str)
+                }
+                if len(parts) >= 6:
+                    start_ts_str, end_ts_str = parts[4], parts[5]
+                    if start_ts_str:
+                        try:
+                            task_entry["start_timestamp"] = float(start_ts_str)
+                        except ValueError:
+                            pass
+                    if end_ts_str:
+                        try:
+                            task_entry["end_timestamp"] = float(end_ts_str)
+                        except ValueError:
+                            pass
+                parsed.append(Task(task_entry))
+            except Exception as e:
+                print(f"Ошибка чтения backup: {e}")
+    return parsed
 
 def load_backup():
+    if STORAGE_BACKEND == "sqlite":
+        sqlite_load_backup()
+        return
     today = datetime.date.today().strftime("%Y-%m-%d")
     log_file = os.path.join(LOG_DIR, f"{today}.txt")
+    journal_file = get_journal_file()
+    if JOURNAL_MODE and os.path.exists(journal_file):
+        try:
+            replayed = replay_journal(journal_file)
+            tasks.extend(replayed)
+            task_store.reindex()
+            print(f"Загружено {len(replayed)} задач из журнала: {journal_file}")
+            compact_journal()
+            return
+        except Exception as e:
+            print(f"Ошибка чтения журнала, используется backup: {e}")
     if os.path.exists(log_file):
-        initial_active_count = len([t for t in tasks if 'timer_start' in t])
-        with open(log_file, "r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    parts = line.strip().split(" | ")
-                    if len(parts) < 4:
-                        continue
-                    task, link, time_str, hours_hundredths_str = parts[0], parts[1], parts[2], parts[3]
-                    if time_str == "<1 минуты":
-                        minutes = 0.5
-                    else:
-                        if "-" in time_str:
-                            minutes = parse_time_range(time_str)
-                        else:
-                            try:
-                                mins, secs = map(int, time_str.split(":"))
-                                minutes = mins + secs / 60
-                            except:
-                                minutes = float(time_str) if time_str.replace('.','',1).isdigit() else 0.0
-                    task_entry = {
-                        "id": str(uuid.uuid4()),
-                        "task": task,
-                        "link": link,
-                        "time_str": time_str,
-                        "minutes": round(minutes, 2),
-                        "hours_hundredths": float(hours_hundredths_str)
-                    }
-                    if len(parts) >= 6:
-                        start_ts_str, end_ts_str = parts[4], parts[5]
-                        if start_ts_str:
-                            try:
-                                task_entry["start_timestamp"] = float(start_ts_str)
-                            except ValueError:
-                                pass
-                        if end_ts_str:
-                            try:
-                                task_entry["end_timestamp"] = float(end_ts_str)
-                            except ValueError:
-                                pass
-                    tasks.append(task_entry)
-                except Exception as e:
-                    print(f"Ошибка чтения backup: {e}")
-        if tasks:
-            loaded_completed_count = len(tasks) - initial_active_count
-            print(f"Загружено {loaded_completed_count} задач из backup: {log_file}")
+        loaded = parse_backup_file(log_file)
+        tasks.extend(loaded)
+        task_store.reindex()
+        if loaded:
+            print(f"Загружено {len(loaded)} задач из backup: {log_file}")
+    if JOURNAL_MODE:
+        compact_journal()
 
 def save_active_tasks():
+    if STORAGE_BACKEND == "sqlite":
+        sqlite_save_active_tasks()
+        return
     try:
-        active_tasks = [t for t in tasks if "timer_start" in t]
-        if not active_tasks:
-            if os.path.exists(active_tasks_file):
-                os.remove(active_tasks_file)
-            return
-        with open(active_tasks_file, "w", encoding="utf-8") as f:
-            for t in active_tasks:
-                task_id = t.get("id", str(uuid.uuid4()))
-                task_text = t['task']
-                link = t['link']
-                timer_start = t.get("timer_start", time.time())
-                start_timestamp = t.get("start_timestamp", timer_start)
-                paused_total = t.get("paused_total", 0.0)
-                is_paused = t.get("is_paused", False)
-                pause_history = ""
-                if "pause_history" in t:
-                    history_parts = []
-                    for pause in t["pause_history"]:
-                        start_pause = pause.get("start", "")
-                        end_pause = pause.get("end", "")
-                        history_parts.append(f"{start_pause}-{end_pause}")
-                    pause_history = ",".join(history_parts)
-                f.write(f"{task_id} | {task_text} | {link} | {timer_start} | {start_timestamp} | {paused_total} | {pause_history} | {str(is_paused).lower()}\n")
+        write_active_tasks_file(task_store.active_tasks())
     except Exception as e:
         print(f"Ошибка сохранения активных задач: {e}")
 
+def remove_active_tasks_files():
+    io_worker.submit("active_tasks", remove_files, active_tasks_file, active_tasks_bin_file)
+
+def write_checkpoint_file(path, payload, stale_file):
+    write_file_atomic(path, payload)
+    remove_files(stale_file)
+
+def write_active_tasks_file(active_tasks):
+    if not active_tasks:
+        remove_active_tasks_files()
+        return
+    if CHECKPOINT_FORMAT == "binary":
+        io_worker.submit("active_tasks", write_checkpoint_file, active_tasks_bin_file,
+                         render_active_tasks_binary(active_tasks), active_tasks_file)
+    else:
+        io_worker.submit("active_tasks", write_checkpoint_file, active_tasks_file,
+                         render_active_tasks_text(active_tasks), active_tasks_bin_file)
+
+def render_active_tasks_text(active_tasks):
+    lines = []
+    for t in active_tasks:
+        task_id = t.get("id") or str(uuid.uuid4())
+        task_text = t['task']
+        link = t['link']
+        timer_start = t.get("timer_start", time.time())
+        start_timestamp = t.get("start_timestamp", timer_start)
+        paused_total = t.get("paused_total", 0.0)
+        is_paused = t.get("is_paused", False)
+        pause_history = ""
+        if "pause_history" in t:
+            history_parts = []
+            for pause in t["pause_history"]:
+                start_pause = pause.get("start", "")
+                end_pause = pause.get("end", "")
+                history_parts.append(f"{start_pause}-{end_pause}")
+            pause_history = ",".join(history_parts)
+        lines.append(f"{task_id} | {task_text} | {link} | {timer_start} | {start_timestamp} | {paused_total} | {pause_history} | {str(is_paused).lower()}\n")
+    return "".join(lines)
+
+def optional_float(value):
+    return float("nan") if value is None or value == "" else float(value)
+
+def render_active_tasks_binary(active_tasks):
+    body = bytearray()
+    for t in active_tasks:
+        task_id = (t.get("id") or str(uuid.uuid4())).encode("utf-8")
+        task_text = t["task"].encode("utf-8")
+        link = (t.get("link") or "").encode("utf-8")
+        timer_start = t.get("timer_start", time.time())
+        pauses = t.get("pause_history") or []
+        body += CHECKPOINT_RECORD.pack(
+            timer_start, optional_float(t.get("start_timestamp", timer_start)),
+            t.get("paused_total", 0.0), int(bool(t.get("is_paused", False))),
+            len(task_id), len(task_text), len(link), len(pauses)
+        )
+        body += task_id + task_text + link
+        if pauses:
+            flat = []
+            for pause in pauses:
+                flat.append(optional_float(pause.get("start")))
+                flat.append(optional_float(pause.get("end")))
+            body += struct.pack(f"<{len(flat)}d", *flat)
+    return CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, len(active_tasks), zlib.crc32(body)) + bytes(body)
+
+def read_active_tasks_binary(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < CHECKPOINT_HEADER.size:
+        raise ValueError("файл короче заголовка")
+    magic, version, count, crc = CHECKPOINT_HEADER.unpack_from(data, 0)
+    if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+        raise ValueError(f"неизвестный формат {magic!r} v{version}")
+    view = memoryview(data)
+    offset = CHECKPOINT_HEADER.size
+    if zlib.crc32(view[offset:]) != crc:
+        raise ValueError("контрольная сумма не совпадает")
+    loaded = []
+    for _ in range(count):
+        (timer_start, start_timestamp, paused_total, is_paused,
+         id_len, task_len, link_len, pause_count) = CHECKPOINT_RECORD.unpack_from(data, offset)
+        offset += CHECKPOINT_RECORD.size
+        task_id = str(view[offset:offset + id_len], "utf-8")
+        offset += id_len
+        task_text = str(view[offset:offset + task_len], "utf-8")
+        offset += task_len
+        link = str(view[offset:offset + link_len], "utf-8")
+        offset += link_len
+        flat = struct.unpack_from(f"<{pause_count * 2}d", data, offset)
+        offset += pause_count * 16
+        # NaN != NaN, так отсутствующие границы пауз превращаются обратно в None
+        pause_history = [
+            {"start": flat[i] if flat[i] == flat[i] else None,
+             "end": flat[i + 1] if flat[i + 1] == flat[i + 1] else None}
+            for i in range(0, len(flat), 2)
+        ]
+        active_task = {
+            "id": task_id,
+            "task": task_text,
+            "link": link,
+            "timer_start": timer_start,
+            "start_timestamp": start_timestamp if start_timestamp == start_timestamp else timer_start,
+            "paused_total": paused_total,
+            "pause_history": pause_history,
+            "is_paused": bool(is_paused),
+            "minutes": 0.0,
+            "hours_hundredths": 0.0,
+            "time_str": "0:00"
+        }
+        if active_task["is_paused"]:
+            current_elapsed = time.time() - timer_start
+            active_task["paused_elapsed"] = current_elapsed - paused_total
+        loaded.append(active_task)
+    return loaded
+
+def add_loaded_active_task(active_task):
+    active_task = Task.from_mapping(active_task)
+    if task_store.contains(active_task["id"]):
+        print(f"Пропущена дублирующаяся задача с id {active_task['id']}")
+        return False
+    if task_store.find_by_key(active_task["task"], active_task["link"]) is not None:
+        print(f"Пропущена дублирующаяся задача '{active_task['task']}' с ссылкой '{active_task['link']}'")
+        return False
+    tasks.append(active_task)
+    task_store.index_task(active_task)
+    return True
+
 def load_active_tasks():
-    if not os.path.exists(active_tasks_file):
+    if STORAGE_BACKEND == "sqlite":
+        sqlite_load_active_tasks()
+        return
+    if not os.path.exists(active_tasks_bin_file) and not os.path.exists(active_tasks_file):
         return
     try:
         tasks[:] = [t for t in tasks if "timer_start" not in t]
+        task_store.reindex()
+        if os.path.exists(active_tasks_bin_file):
+            try:
+                for active_task in read_active_tasks_binary(active_tasks_bin_file):
+                    add_loaded_active_task(active_task)
+                print(f"Загружено {len(task_store.active)} активных задач из контрольной точки.")
+                return
+            except Exception as e:
+                print(f"Ошибка чтения бинарной контрольной точки, используется текстовый файл: {e}")
+        if not os.path.exists(active_tasks_file):
+            return
         with open(active_tasks_file, "r", encoding="utf-8") as f:
             for line in f:
                 try:
@@ -323,12 +1235,6 @@ def load_active_tasks():
                     if len(parts) < 4:
                         continue
                     task_id, task, link, timer_start_str = parts[0], parts[1], parts[2], parts[3]
-                    if any(t.get("id") == task_id for t in tasks):
-                        print(Пропущена дублирующаяся задача с id {task_id}")
-                        continue
-                    if any(t.get("task") == task and t.get("link") == link for t in tasks):
-                        print(Пропущена дублирующаяся задача '{task}' с ссылкой '{link}'")
-                        continue
                     timer_start = float(timer_start_str)
                     active_task = {
                         "id": task_id,
@@ -375,145 +1281,2013 @@ def load_active_tasks():
                             paused_total = active_task.get("paused_total", 0.0)
                             current_elapsed = time.time() - active_task["timer_start"]
                             active_task["paused_elapsed"] = current_elapsed - paused_total
-                    tasks.append(active_task)
+                    add_loaded_active_task(active_task)
                 except Exception as e:
                     print(f"Ошибка загрузки активной задачи: {e}")
         if tasks:
-            active_count = len([t for t in tasks if 'timer_start' in t])
+            active_count = len(task_store.active)
             print(f"Загружено {active_count} активных задач из временного файла.")
     except Exception as e:
         print(f"Ошибка чтения активных задач: {e}")
 
-def remove_active_task(index):
-    try:
-        if index < 0 or index >= len(tasks):
-            return
-        task_id = tasks[index].get("id")
-        if not task_id:
-            return
-        if not os.path.exists(active_tasks_file):
+def remove_active_task(index):
+    try:
+        if index < 0 or index >= len(tasks):
+            return
+        task_id = tasks[index].get("id")
+        if not task_id:
+            return
+        if STORAGE_BACKEND == "sqlite":
+            sqlite_remove_active_task(task_id)
+            return
+        # Файл не перечитывается: активный набор пишется заново из индекса без удаляемой задачи
+        removed = task_id in task_store.active
+        write_active_tasks_file([t for t in task_store.active_tasks() if t.get("id") != task_id])
+        if removed:
+            print(f"Активная задача {task_id} удалена из временного файла.")
+    except Exception as e:
+        print(f"Ошибка удаления активной задачи: {e}")
+
+# Периодическая контрольная точка активных задач: пишет только если generation хранилища
+# изменился с прошлого сохранения, и запоминает, сколько заняла запись
+class CheckpointService:
+    def __init__(self, store, interval_s):
+        self.store = store
+        self.interval_s = interval_s
+        self.saved_generation = None
+        self.timer = None
+        self.checkpoints = 0
+        self.skipped = 0
+        self.last_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+
+    def start(self):
+        if self.timer is None:
+            self.timer = QTimer()
+            self.timer.timeout.connect(self.checkpoint)
+        if self.timer.isActive():
+            return
+        self.checkpoint()
+        self.timer.start(max(1, self.interval_s) * 1000)
+
+    def stop(self):
+        if self.timer:
+            self.timer.stop()
+
+    def set_interval(self, interval_s):
+        self.interval_s = interval_s
+        if self.timer and self.timer.isActive():
+            self.timer.start(max(1, interval_s) * 1000)
+
+    def checkpoint(self, force=False):
+        generation = self.store.generation
+        if not force and generation == self.saved_generation:
+            self.skipped += 1
+            return False
+        t0 = time.perf_counter()
+        save_active_tasks()
+        self.last_latency_ms = (time.perf_counter() - t0) * 1000
+        self.max_latency_ms = max(self.max_latency_ms, self.last_latency_ms)
+        self.saved_generation = generation
+        self.checkpoints += 1
+        print(f"Контрольная точка активных задач: {self.last_latency_ms:.1f} мс "
+              f"(записей {self.checkpoints}, пропущено {self.skipped}, макс. {self.max_latency_ms:.1f} мс)")
+        return True
+
+# ─── Хранилище SQLite ─────────────────────────────────────────────
+
+def get_sqlite_connection():
+    global _sqlite_conn
+    if _sqlite_conn is None:
+        import sqlite3
+        os.makedirs(os.path.dirname(SQLITE_DB_FILE), exist_ok=True)
+        conn = sqlite3.connect(SQLITE_DB_FILE)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                day TEXT NOT NULL,
+                position INTEGER NOT NULL DEFAULT 0,
+                task TEXT NOT NULL,
+                link TEXT NOT NULL DEFAULT '',
+                time_str TEXT NOT NULL DEFAULT '',
+                minutes REAL NOT NULL DEFAULT 0,
+                hours_hundredths REAL NOT NULL DEFAULT 0,
+                start_timestamp REAL,
+                end_timestamp REAL,
+                link_key TEXT NOT NULL DEFAULT '',
+                name_key TEXT NOT NULL DEFAULT ''
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_day ON tasks(day, position);
+            CREATE INDEX IF NOT EXISTS idx_tasks_start ON tasks(start_timestamp);
+            CREATE INDEX IF NOT EXISTS idx_tasks_link_key ON tasks(link_key);
+            CREATE INDEX IF NOT EXISTS idx_tasks_name_key ON tasks(name_key);
+            CREATE TABLE IF NOT EXISTS active_tasks (
+                id TEXT PRIMARY KEY,
+                position INTEGER NOT NULL DEFAULT 0,
+                task TEXT NOT NULL,
+                link TEXT NOT NULL DEFAULT '',
+                timer_start REAL NOT NULL,
+                start_timestamp REAL,
+                paused_total REAL NOT NULL DEFAULT 0,
+                pause_history TEXT NOT NULL DEFAULT '[]',
+                is_paused INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        _sqlite_conn = conn
+    return _sqlite_conn
+
+def sqlite_task_row(t, day, position):
+    return (
+        t["id"], day, position, t["task"], t.get("link", ""), t.get("time_str", ""),
+        t.get("minutes", 0.0), t.get("hours_hundredths", 0.0),
+        t.get("start_timestamp"), t.get("end_timestamp"),
+        normalize_link(t["link"])[0] if t.get("link") else "", normalize_name(t["task"])
+    )
+
+def sqlite_save_backup():
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    try:
+        conn = get_sqlite_connection()
+        rows = [sqlite_task_row(t, today, pos) for pos, t in enumerate(tasks) if "timer_start" not in t]
+        with conn:
+            conn.execute("DELETE FROM tasks WHERE day = ?", (today,))
+            conn.executemany("INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    except Exception as e:
+        print(f"Ошибка сохранения в SQLite: {e}")
+
+def sqlite_record_task_change(op, task):
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    try:
+        conn = get_sqlite_connection()
+        with conn:
+            if op == "delete":
+                conn.execute("DELETE FROM tasks WHERE id = ?", (task.get("id"),))
+                return
+            position = conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM tasks WHERE day = ?", (today,)).fetchone()[0]
+            conn.execute("""
+                INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    task = excluded.task, link = excluded.link, time_str = excluded.time_str,
+                    minutes = excluded.minutes, hours_hundredths = excluded.hours_hundredths,
+                    start_timestamp = excluded.start_timestamp, end_timestamp = excluded.end_timestamp,
+                    link_key = excluded.link_key, name_key = excluded.name_key
+            """, sqlite_task_row(task, today, position))
+    except Exception as e:
+        print(f"Ошибка записи изменения в SQLite: {e}")
+
+def sqlite_row_to_task(row):
+    task_entry = {
+        "id": row["id"],
+        "task": row["task"],
+        "link": row["link"],
+        "time_str": row["time_str"],
+        "minutes": row["minutes"],
+        "hours_hundredths": row["hours_hundredths"]
+    }
+    if row["start_timestamp"] is not None:
+        task_entry["start_timestamp"] = row["start_timestamp"]
+    if row["end_timestamp"] is not None:
+        task_entry["end_timestamp"] = row["end_timestamp"]
+    return Task(task_entry)
+
+def sqlite_load_backup():
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    try:
+        conn = get_sqlite_connection()
+        rows = conn.execute("SELECT * FROM tasks WHERE day = ? ORDER BY position", (today,)).fetchall()
+        tasks.extend(sqlite_row_to_task(row) for row in rows)
+        task_store.reindex()
+        if rows:
+            print(f"Загружено {len(rows)} задач из SQLite: {SQLITE_DB_FILE}")
+    except Exception as e:
+        print(f"Ошибка чтения SQLite: {e}")
+
+def sqlite_save_active_tasks():
+    try:
+        conn = get_sqlite_connection()
+        rows = []
+        for pos, t in enumerate(tasks):
+            if "timer_start" not in t:
+                continue
+            rows.append((
+                t.get("id", str(uuid.uuid4())), pos, t["task"], t["link"], t["timer_start"],
+                t.get("start_timestamp", t["timer_start"]), t.get("paused_total", 0.0),
+                json.dumps(t.get("pause_history", [])), int(t.get("is_paused", False))
+            ))
+        with conn:
+            conn.execute("DELETE FROM active_tasks")
+            conn.executemany("INSERT OR REPLACE INTO active_tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    except Exception as e:
+        print(f"Ошибка сохранения активных задач в SQLite: {e}")
+
+def sqlite_load_active_tasks():
+    try:
+        conn = get_sqlite_connection()
+        tasks[:] = [t for t in tasks if "timer_start" not in t]
+        task_store.reindex()
+        for row in conn.execute("SELECT * FROM active_tasks ORDER BY position"):
+            if task_store.contains(row["id"]):
+                print(f"Пропущена дублирующаяся задача с id {row['id']}")
+                continue
+            active_task = Task({
+                "id": row["id"],
+                "task": row["task"],
+                "link": row["link"],
+                "timer_start": row["timer_start"],
+                "start_timestamp": row["start_timestamp"] if row["start_timestamp"] is not None else row["timer_start"],
+                "paused_total": row["paused_total"],
+                "pause_history": json.loads(row["pause_history"] or "[]"),
+                "is_paused": bool(row["is_paused"]),
+                "minutes": 0.0,
+                "hours_hundredths": 0.0,
+                "time_str": "0:00"
+            })
+            if active_task["is_paused"]:
+                current_elapsed = time.time() - active_task["timer_start"]
+                active_task["paused_elapsed"] = current_elapsed - active_task["paused_total"]
+            tasks.append(active_task)
+            task_store.index_task(active_task)
+        active_count = len(task_store.active)
+        if active_count:
+            print(f"Загружено {active_count} активных задач из SQLite.")
+    except Exception as e:
+        print(f"Ошибка чтения активных задач из SQLite: {e}")
+
+def sqlite_remove_active_task(task_id):
+    try:
+        conn = get_sqlite_connection()
+        with conn:
+            conn.execute("DELETE FROM active_tasks WHERE id = ?", (task_id,))
+    except Exception as e:
+        print(f"Ошибка удаления активной задачи из SQLite: {e}")
+
+def sqlite_query_tasks(date_from, date_to, name=None, link=None):
+    start_ts = datetime.datetime.combine(date_from, datetime.time.min).timestamp()
+    end_ts = datetime.datetime.combine(date_to + datetime.timedelta(days=1), datetime.time.min).timestamp()
+    query = "SELECT * FROM tasks WHERE start_timestamp >= ? AND start_timestamp < ?"
+    params = [start_ts, end_ts]
+    if name:
+        query += " AND name_key = ?"
+        params.append(name.strip().lower())
+    if link:
+        query += " AND link_key = ?"
+        params.append(link.strip().lower())
+    query += " ORDER BY start_timestamp"
+    conn = get_sqlite_connection()
+    return [sqlite_row_to_task(row) for row in conn.execute(query, params)]
+
+def sqlite_import_text_logs():
+    logs_root = os.path.join(get_config_dir(), "logs")
+    imported = 0
+    if not os.path.isdir(logs_root):
+        return imported
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    conn = get_sqlite_connection()
+    for dirpath, _, filenames in os.walk(logs_root):
+        for file_name in filenames:
+            if not re.fullmatch(r"\d{4}-\d{2}-\d{2}\.txt", file_name):
+                continue
+            day = file_name[:-4]
+            if day == today or conn.execute("SELECT 1 FROM tasks WHERE day = ? LIMIT 1", (day,)).fetchone():
+                continue
+            day_tasks = parse_backup_file(os.path.join(dirpath, file_name))
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [sqlite_task_row(t, day, pos) for pos, t in enumerate(day_tasks)])
+            imported += len(day_tasks)
+    if imported:
+        print(f"Импортировано {imported} задач из текстовых логов в SQLite.")
+    return imported
+
+# ─── История по дням ──────────────────────────────────────────────
+
+# Разобранные дни: путь к файлу -> (mtime_ns, размер, задачи дня).
+# Файл перечитывается, только если у него изменилось время модификации или размер
+history_cache = {}
+
+def iter_log_day_files(date_from, date_to):
+    logs_root = os.path.join(get_config_dir(), "logs")
+    if not os.path.isdir(logs_root):
+        return
+    # Папки лет и месяцев вне диапазона не открываются вовсе
+    for year_name in sorted(os.listdir(logs_root)):
+        if not year_name.isdigit() or not date_from.year <= int(year_name) <= date_to.year:
+            continue
+        year = int(year_name)
+        year_dir = os.path.join(logs_root, year_name)
+        if not os.path.isdir(year_dir):
+            continue
+        for month_name in sorted(os.listdir(year_dir)):
+            if not month_name.isdigit():
+                continue
+            month = int(month_name)
+            if not (date_from.year, date_from.month) <= (year, month) <= (date_to.year, date_to.month):
+                continue
+            month_dir = os.path.join(year_dir, month_name)
+            if not os.path.isdir(month_dir):
+                continue
+            for day_name in sorted(os.listdir(month_dir)):
+                try:
+                    day = datetime.date(year, month, int(day_name))
+                except ValueError:
+                    continue
+                if not date_from <= day <= date_to:
+                    continue
+                stem = day.strftime("%Y-%m-%d")
+                log_file = os.path.join(month_dir, day_name, f"{stem}.txt")
+                journal_file = os.path.join(month_dir, day_name, f"{stem}.journal")
+                has_log = os.path.exists(log_file)
+                if os.path.exists(journal_file) and (not has_log or os.path.getmtime(journal_file) >= os.path.getmtime(log_file)):
+                    yield day, journal_file
+                elif has_log:
+                    yield day, log_file
+
+def load_history_day(day, path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return []
+    cached = history_cache.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    day_tasks = replay_journal(path) if path.endswith(".journal") else parse_backup_file(path)
+    day_str = day.strftime("%Y-%m-%d")
+    for t in day_tasks:
+        t["day"] = day_str
+    history_cache[path] = (st.st_mtime_ns, st.st_size, day_tasks)
+    return day_tasks
+
+# Фильтры: name и link — подстрока без учёта регистра, domain — точное совпадение домена
+def task_matches(task, filters):
+    name = filters.get("name")
+    if name and name.strip().lower() not in task.get("task", "").lower():
+        return False
+    link = filters.get("link")
+    if link and link.strip().lower() not in (task.get("link") or "").lower():
+        return False
+    domain = filters.get("domain")
+    if domain and (not task.get("link") or parse_domain(task["link"]).lower() != domain.strip().lower()):
+        return False
+    return True
+
+# Задачи за период в порядке дней. Генератор: дни читаются по мере перебора,
+# уже разобранные берутся из history_cache. Возвращаемые словари общие с кэшем — не изменять
+def iter_tasks(date_from, date_to, filters=None):
+    filters = filters or {}
+    if STORAGE_BACKEND == "sqlite":
+        conn = get_sqlite_connection()
+        rows = conn.execute("SELECT * FROM tasks WHERE day BETWEEN ? AND ? ORDER BY day, position",
+                            (date_from.strftime("%Y-%m-%d"), date_to.strftime("%Y-%m-%d")))
+        for row in rows:
+            task_entry = sqlite_row_to_task(row)
+            task_entry["day"] = row["day"]
+            if task_matches(task_entry, filters):
+                yield task_entry
+        return
+    for day, path in iter_log_day_files(date_from, date_to):
+        for t in load_history_day(day, path):
+            if task_matches(t, filters):
+                yield t
+
+def summarize_history(date_from, date_to, filters=None):
+    summary = {
+        "days": {},
+        "count": 0,
+        "minutes": 0.0,
+        "hours_hundredths": 0.0,
+        "by_name": TopCounter(),
+        "by_domain": TopCounter()
+    }
+    for t in iter_tasks(date_from, date_to, filters):
+        minutes = t.get("minutes", 0)
+        day = summary["days"].setdefault(t["day"], [0, 0.0])
+        day[0] += 1
+        day[1] += minutes
+        summary["count"] += 1
+        summary["minutes"] += minutes
+        summary["hours_hundredths"] += t.get("hours_hundredths", 0)
+        summary["by_name"].add(t["task"].strip(), minutes)
+        if t.get("link"):
+            summary["by_domain"].add(parse_domain(t["link"]), minutes)
+    return summary
+
+def history_summary_lines(summary, date_from, date_to, top_n=5):
+    lines = [
+        f"Период: {date_from.strftime('%Y-%m-%d')} — {date_to.strftime('%Y-%m-%d')}",
+        f"Дней с записями: {len(summary['days'])}",
+        f"Всего задач: {summary['count']}",
+        f"Общее время: {round(summary['minutes'], 2)} мин / {round(summary['hours_hundredths'], 2)} ч"
+    ]
+    top_tasks = summary["by_name"].top(top_n)
+    if top_tasks:
+        lines.append("")
+        lines.append(f"ТОП-{top_n} ЗАДАЧ ПО ВРЕМЕНИ")
+        for name, mins in top_tasks:
+            lines.append(f"  {name}: {round(mins, 2)} мин")
+    top_links = summary["by_domain"].top(top_n)
+    if top_links:
+        lines.append("")
+        lines.append(f"ТОП-{top_n} ССЫЛОК ПО ВРЕМЕНИ")
+        for domain, mins in top_links:
+            lines.append(f"  {domain}: {round(mins, 2)} мин")
+    if summary["days"]:
+        lines.append("")
+        lines.append("ПО ДНЯМ")
+        for day, (count, mins) in sorted(summary["days"].items()):
+            lines.append(f"  {day}: {count} задач, {round(mins, 2)} мин")
+    return lines
+
+# ─── Аналитика за период ─────────────────────────────────────────
+
+WEEKDAY_NAMES = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+
+# NumPy необязателен: без него те же итоги считаются обычными циклами
+def load_numpy():
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+# История за период в виде колонок: индекс дня от date_from, начало и конец (NaN — нет),
+# минуты, id домена (-1 — без ссылки) и id названия. Словари id -> строка лежат в domains / names.
+# Начало дня считается один раз на каждый встреченный день, чтобы час начала брать по местному времени
+class HistoryColumns:
+    def __init__(self, date_from, date_to, filters=None):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.n_days = (date_to - date_from).days + 1
+        self.domains = []
+        self.names = []
+        domain_ids = {}
+        link_domain_ids = {}
+        name_ids = {}
+        raw_name_ids = {}
+        day_starts = {}
+        self.day_index = []
+        self.start = []
+        self.end = []
+        self.minutes = []
+        self.domain_id = []
+        self.name_id = []
+        self.start_hour_offset = []
+        nan = float("nan")
+        for t in iter_tasks(date_from, date_to, filters):
+            day = t["day"]
+            if day not in day_starts:
+                day_date = datetime.date.fromisoformat(day)
+                day_starts[day] = ((day_date - date_from).days,
+                                   datetime.datetime.combine(day_date, datetime.time.min).timestamp())
+            day_idx, day_start = day_starts[day]
+            start_ts = t.get("start_timestamp")
+            end_ts = t.get("end_timestamp")
+            self.day_index.append(day_idx)
+            self.start.append(start_ts if start_ts is not None else nan)
+            self.end.append(end_ts if end_ts is not None else nan)
+            self.start_hour_offset.append(start_ts - day_start if start_ts is not None else nan)
+            self.minutes.append(t.get("minutes", 0.0))
+            # Ссылки и названия повторяются, поэтому разбор домена и нормализация делаются один раз на строку
+            link = t.get("link")
+            if link:
+                domain_idx = link_domain_ids.get(link)
+                if domain_idx is None:
+                    domain = parse_domain(link)
+                    if domain not in domain_ids:
+                        domain_ids[domain] = len(self.domains)
+                        self.domains.append(domain)
+                    domain_idx = link_domain_ids[link] = domain_ids[domain]
+                self.domain_id.append(domain_idx)
+            else:
+                self.domain_id.append(-1)
+            raw_name = t["task"]
+            name_idx = raw_name_ids.get(raw_name)
+            if name_idx is None:
+                name = raw_name.strip()
+                if name not in name_ids:
+                    name_ids[name] = len(self.names)
+                    self.names.append(name)
+                name_idx = raw_name_ids[raw_name] = name_ids[name]
+            self.name_id.append(name_idx)
+
+    def __len__(self):
+        return len(self.minutes)
+
+def rolling_average(values, window):
+    if window <= 1 or len(values) < window:
+        return list(values)
+    result = []
+    running = sum(values[:window])
+    result.append(running / window)
+    for i in range(window, len(values)):
+        running += values[i] - values[i - window]
+        result.append(running / window)
+    return result
+
+def history_analytics_python(columns, window):
+    per_day = [0.0] * columns.n_days
+    per_weekday = [0.0] * 7
+    per_hour = [0.0] * 24
+    per_domain = [0.0] * len(columns.domains)
+    per_name = [0.0] * len(columns.names)
+    first_weekday = columns.date_from.weekday()
+    for day_idx, offset, minutes, domain_id, name_id in zip(columns.day_index, columns.start_hour_offset,
+                                                            columns.minutes, columns.domain_id, columns.name_id):
+        per_day[day_idx] += minutes
+        per_weekday[(first_weekday + day_idx) % 7] += minutes
+        if offset == offset:
+            per_hour[min(23, max(0, int(offset // 3600)))] += minutes
+        if domain_id >= 0:
+            per_domain[domain_id] += minutes
+        per_name[name_id] += minutes
+    return per_day, per_weekday, per_hour, per_domain, per_name, rolling_average(per_day, window)
+
+def history_analytics_numpy(np, columns, window):
+    day_index = np.asarray(columns.day_index, dtype=np.int64)
+    minutes = np.asarray(columns.minutes, dtype=np.float64)
+    offsets = np.asarray(columns.start_hour_offset, dtype=np.float64)
+    domain_id = np.asarray(columns.domain_id, dtype=np.int64)
+    name_id = np.asarray(columns.name_id, dtype=np.int64)
+    per_day = np.bincount(day_index, weights=minutes, minlength=columns.n_days)
+    weekday = (columns.date_from.weekday() + day_index) % 7
+    per_weekday = np.bincount(weekday, weights=minutes, minlength=7)
+    has_start = ~np.isnan(offsets)
+    hours = np.clip(offsets[has_start] // 3600, 0, 23).astype(np.int64)
+    per_hour = np.bincount(hours, weights=minutes[has_start], minlength=24)
+    has_domain = domain_id >= 0
+    per_domain = np.bincount(domain_id[has_domain], weights=minutes[has_domain], minlength=len(columns.domains))
+    per_name = np.bincount(name_id, weights=minutes, minlength=len(columns.names))
+    if 1 < window <= len(per_day):
+        rolling = np.convolve(per_day, np.ones(window) / window, mode="valid")
+    else:
+        rolling = per_day
+    return (per_day.tolist(), per_weekday.tolist(), per_hour.tolist(),
+            per_domain.tolist(), per_name.tolist(), rolling.tolist())
+
+def history_analytics(date_from, date_to, filters=None, window=7, use_numpy=True):
+    columns = HistoryColumns(date_from, date_to, filters)
+    np = load_numpy() if use_numpy else None
+    if np is not None:
+        per_day, per_weekday, per_hour, per_domain, per_name, rolling = history_analytics_numpy(np, columns, window)
+    else:
+        per_day, per_weekday, per_hour, per_domain, per_name, rolling = history_analytics_python(columns, window)
+    return {
+        "engine": "numpy" if np is not None else "python",
+        "records": len(columns),
+        "date_from": date_from,
+        "window": window,
+        "per_day": per_day,
+        "per_weekday": per_weekday,
+        "per_hour": per_hour,
+        "per_domain": sorted(zip(columns.domains, per_domain), key=lambda x: x[1], reverse=True),
+        "per_name": sorted(zip(columns.names, per_name), key=lambda x: x[1], reverse=True),
+        "rolling": rolling
+    }
+
+def analytics_lines(result, top_n=5):
+    lines = [f"Записей: {result['records']} (расчёт: {result['engine']})", "", "ПО ДНЯМ НЕДЕЛИ"]
+    for name, mins in zip(WEEKDAY_NAMES, result["per_weekday"]):
+        lines.append(f"  {name}: {round(mins, 2)} мин")
+    busy_hours = [(hour, mins) for hour, mins in enumerate(result["per_hour"]) if mins]
+    if busy_hours:
+        lines.append("")
+        lines.append("ПО ЧАСУ НАЧАЛА")
+        for hour, mins in busy_hours:
+            lines.append(f"  {hour:02d}:00: {round(mins, 2)} мин")
+    if result["per_domain"]:
+        lines.append("")
+        lines.append(f"ТОП-{top_n} ДОМЕНОВ")
+        for domain, mins in result["per_domain"][:top_n]:
+            lines.append(f"  {domain}: {round(mins, 2)} мин")
+    window = result["window"]
+    if window > 1 and len(result["per_day"]) >= window and result["rolling"]:
+        last_day = result["date_from"] + datetime.timedelta(days=len(result["per_day"]) - 1)
+        lines.append("")
+        lines.append(f"Скользящее среднее за {window} дн. на {last_day.strftime('%Y-%m-%d')}: {round(result['rolling'][-1], 2)} мин/день")
+    return lines
+
+# Статистика за период без запуска интерфейса:
+#   python wrktmr041.py --history 2026-10-01 2026-10-17 [--name текст] [--link текст] [--domain домен]
+#   с --analytics добавляются разбивки по дням недели, часам и доменам (NumPy, если установлен)
+def run_history_cli(argv):
+    import argparse
+    parser = argparse.ArgumentParser(prog="wrktmr041.py --history", description="Статистика за период по логам")
+    parser.add_argument("date_from", help="начало периода, ГГГГ-ММ-ДД")
+    parser.add_argument("date_to", nargs="?", help="конец периода, ГГГГ-ММ-ДД (по умолчанию сегодня)")
+    parser.add_argument("--name", help="часть названия задачи")
+    parser.add_argument("--link", help="часть ссылки")
+    parser.add_argument("--domain", help="домен ссылки")
+    parser.add_argument("--top", type=int, default=5, help="сколько позиций в топах")
+    parser.add_argument("--analytics", action="store_true", help="разбивки по дням недели, часам и доменам")
+    parser.add_argument("--window", type=int, default=7, help="окно скользящего среднего, дней")
+    parser.add_argument("--no-numpy", action="store_true", help="считать без NumPy")
+    args = parser.parse_args(argv)
+    try:
+        date_from = datetime.date.fromisoformat(args.date_from)
+        date_to = datetime.date.fromisoformat(args.date_to) if args.date_to else datetime.date.today()
+    except ValueError as e:
+        print(f"Неверная дата: {e}")
+        return 2
+    if date_from > date_to:
+        date_from, date_to = date_to, date_from
+    filters = {"name": args.name, "link": args.link, "domain": args.domain}
+    summary = summarize_history(date_from, date_to, filters)
+    print("\n".join(history_summary_lines(summary, date_from, date_to, args.top)))
+    if args.analytics:
+        result = history_analytics(date_from, date_to, filters, args.window, use_numpy=not args.no_numpy)
+        print("")
+        print("\n".join(analytics_lines(result, args.top)))
+    return 0
+
+# Группировка для сводки: задачи с одинаковой ссылкой ИЛИ одинаковым названием (без учёта
+# регистра и пробелов по краям) склеиваются в одну компоненту через union-find за один проход.
+# Корень компоненты — её первая строка, поэтому id группы (id первой задачи) не зависит
+# от порядка объединений и сохраняется между перезагрузками
+class TaskGrouping:
+    def __init__(self, items):
+        self.items = items
+        self.parent = list(range(len(items)))
+        first_row = {}
+        for row, t in enumerate(items):
+            link_key = normalize_link(t["link"])[0] if t.get("link") else None
+            if link_key:
+                self.union(first_row.setdefault(("link", link_key), row), row)
+            self.union(first_row.setdefault(("name", normalize_name(t["task"])), row), row)
+        self.groups = {}
+        self.row_to_group = []
+        for row, t in enumerate(items):
+            root = self.find(row)
+            group_id = items[root].get("id") or f"row-{root}"
+            group = self.groups.get(group_id)
+            if group is None:
+                group = self.groups[group_id] = {
+                    "key": group_id,
+                    "task": items[root]["task"],
+                    "link": "",
+                    "minutes": 0.0,
+                    "hours_hundredths": 0.0,
+                    "count": 0,
+                    "rows": []
+                }
+            if not group["link"] and t.get("link"):
+                group["link"] = t["link"]
+            group["minutes"] += t["minutes"]
+            group["hours_hundredths"] += t["hours_hundredths"]
+            group["count"] += 1
+            group["rows"].append(row)
+            self.row_to_group.append(group_id)
+
+    def find(self, row):
+        parent = self.parent
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return row
+
+    def union(self, a, b):
+        root_a = self.find(a)
+        root_b = self.find(b)
+        if root_a == root_b:
+            return
+        if root_a < root_b:
+            self.parent[root_b] = root_a
+        else:
+            self.parent[root_a] = root_b
+
+    def group_of(self, row):
+        return self.groups[self.row_to_group[row]]
+
+    def merged_groups(self):
+        return [g for g in self.groups.values() if g["count"] > 1]
+
+def group_tasks():
+    return TaskGrouping(tasks).merged_groups()
+
+def parse_time_range(time_str):
+    try:
+        start_str, end_str = time_str.split("-")
+        h1, m1 = map(int, start_str.split(":"))
+        h2, m2 = map(int, end_str.split(":"))
+        start_minutes = h1 * 60 + m1
+        end_minutes = h2 * 60 + m2
+        if end_minutes < start_minutes:
+            end_minutes += 24 * 60
+        diff = end_minutes - start_minutes
+        return diff
+    except:
+        return 0.0
+
+def extract_markdown_links(text):
+    pattern = r'\[([^\]]+)\]\(([^)]+)\)'
+    matches = re.findall(pattern, text)
+    if matches:
+        display_text = matches[0][0]
+        url = matches[0][1]
+        clean_text = re.sub(pattern, display_text, text, count=1)
+        return clean_text.strip(), url.strip()
+    return text.strip(), ""
+
+def csv_report_rows():
+    total_minutes = 0.0
+    total_hours_hundredths = 0.0
+    rows = [["Задача", "Ссылка (домен)", "Время (мин:сек)", "Время (часы в сотых)", "Период выполнения"]]
+    for t in tasks:
+        domain = parse_domain(t['link']) if t['link'] else ""
+        period_str = format_time_period(t.get('start_timestamp'), t.get('end_timestamp'))
+        rows.append([t['task'], domain, t['time_str'], str(t['hours_hundredths']), period_str])
+        total_minutes += t['minutes']
+        total_hours_hundredths += t['hours_hundredths']
+    rows.append([])
+    rows.append(["ИТОГО", "", f"{round(total_minutes, 2)} мин", f"{round(total_hours_hundredths, 2)} ч", ""])
+    grouped = group_tasks()
+    if grouped:
+        rows.append([])
+        rows.append(["СВОДКА (объединено по совпадению ссылки или названия)"])
+        for gt in grouped:
+            rows.append([gt["task"], parse_domain(gt["link"]) if gt["link"] else "",
+                         f"{round(gt['minutes'], 2)} мин", f"{round(gt['hours_hundredths'], 2)} ч", ""])
+    return rows
+
+def write_csv_file(file_name, rows):
+    import csv
+    with open(file_name, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerows(rows)
+    return file_name
+
+def save_csv():
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    file_name = os.path.join(SAVE_DIR, f"{today}.csv")
+    try:
+        write_csv_file(file_name, csv_report_rows())
+        print(f"CSV-отчёт сохранён: {file_name}")
+        return file_name
+    except Exception as e:
+        print(f"Ошибка при сохранении CSV: {e}")
+        return None
+
+# Один таймер на всё окно: тикает по границам секунд и раздаёт тики подписчикам
+class SharedTicker(QObject):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.subscribers = []
+        self.running = False
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+
+    def subscribe(self, subscriber):
+        if subscriber not in self.subscribers:
+            self.subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber):
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.tick()
+
+    def stop(self):
+        self.running = False
+        self.timer.stop()
+
+    def schedule_next(self):
+        self.timer.start(1000 - int(time.time() * 1000) % 1000)
+
+    def tick(self):
+        if not self.running:
+            return
+        for subscriber in list(self.subscribers):
+            try:
+                wants_tick = getattr(subscriber, "wants_tick", None)
+                if wants_tick is None or wants_tick():
+                    subscriber.on_tick()
+            except RuntimeError:
+                self.unsubscribe(subscriber)
+        self.schedule_next()
+
+# ─── Синхронизация ────────────────────────────────────────────────
+# CalDAV: каждая завершённая задача — VTODO с UID "<id задачи>@wrktmr" в коллекции caldav_url.
+# Кэш caldav_state.json хранит ETag, адрес и хэш тела каждого элемента, а также ctag и sync-token
+# коллекции. Изменения забираются REPORT sync-collection, а если сервер его не поддерживает —
+# сравнением ETag из PROPFIND и calendar-multiget только по изменившимся адресам.
+# На сервер уходят только задачи, чьё тело изменилось, с If-Match (или If-None-Match для новых).
+
+CALDAV_STATE_FILE = os.path.join(get_config_dir(), "caldav_state.json")
+CALDAV_UID_SUFFIX = "@wrktmr"
+CALDAV_MULTIGET_BATCH = 100
+DAV_NS = "DAV:"
+CALDAV_NS = "urn:ietf:params:xml:ns:caldav"
+CS_NS = "http://calendarserver.org/ns/"
+
+class CalDAVError(Exception):
+    pass
+
+def ical_escape(text):
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def ical_unescape(text):
+    return re.sub(r"\\([\\;,nN])", lambda m: "\n" if m.group(1) in "nN" else m.group(1), text)
+
+# Строки длиннее 75 байт переносятся с пробелом в начале продолжения (RFC 5545, 3.1)
+def ical_fold(line):
+    parts = []
+    current = ""
+    size = 0
+    for ch in line:
+        width = len(ch.encode("utf-8"))
+        if size + width > 75:
+            parts.append(current)
+            current = " "
+            size = 1
+        current += ch
+        size += width
+    parts.append(current)
+    return "\r\n".join(parts)
+
+def ical_time(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+# Разбор без strptime: при импорте больших календарей он занимал большую часть времени
+ICAL_TIME_RE = re.compile(r"(\d{4})(\d{2})(\d{2})(?:T(\d{2})(\d{2})(\d{2})(Z?))?")
+
+def parse_ical_time(value):
+    match = ICAL_TIME_RE.fullmatch(value.strip())
+    if not match:
+        return None
+    year, month, day, hour, minute, second, utc = match.groups()
+    try:
+        moment = datetime.datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+                                   tzinfo=datetime.timezone.utc if utc else None)
+    except ValueError:
+        return None
+    return moment.timestamp()
+
+def caldav_uid(task_id):
+    return f"{task_id}{CALDAV_UID_SUFFIX}"
+
+def task_id_from_uid(uid):
+    if uid.endswith(CALDAV_UID_SUFFIX):
+        return uid[:-len(CALDAV_UID_SUFFIX)]
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"wrktmr:caldav:{uid}"))
+
+# VEVENT для задач с известными началом и концом (DTSTART/DTEND), иначе VTODO (DTSTART/COMPLETED)
+def ical_component_lines(task, uid, kind="VTODO"):
+    start = task.get("start_timestamp")
+    end = task.get("end_timestamp")
+    lines = [
+        f"BEGIN:{kind}",
+        f"UID:{uid}",
+        f"DTSTAMP:{ical_time(end or start or 0)}",
+        f"SUMMARY:{ical_escape(task['task'])}"
+    ]
+    if task.get("link"):
+        lines.append(f"URL:{task['link']}")
+    if start:
+        lines.append(f"DTSTART:{ical_time(start)}")
+    if end:
+        lines.append(f"{'DTEND' if kind == 'VEVENT' else 'COMPLETED'}:{ical_time(end)}")
+    if kind == "VTODO":
+        lines.append("STATUS:COMPLETED")
+    lines.append(f"DESCRIPTION:{ical_escape('Затрачено: ' + str(task.get('time_str', '')))}")
+    lines.append(f"X-WRKTMR-MINUTES:{task.get('minutes', 0.0)}")
+    lines.append(f"END:{kind}")
+    return lines
+
+def task_to_vtodo(task, uid=None):
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//wrktmr//wrktmr041//RU"]
+    lines += ical_component_lines(task, uid or caldav_uid(task["id"]))
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(ical_fold(line) for line in lines) + "\r\n"
+
+def content_hash(body):
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+# Разбор по строкам: продолжения склеиваются на лету, компонент отдаётся сразу после END,
+# поэтому файл календаря любого размера не читается в память целиком. Свойства вложенных
+# компонентов (VALARM) не смешиваются со свойствами задачи
+def iter_ical_components(lines, kinds=("VTODO", "VEVENT")):
+    current = None
+    kind = None
+    nested = 0
+    pending = None
+    for raw in itertools.chain(lines, ("",)):
+        raw = raw.rstrip("\r\n")
+        if raw[:1] in (" ", "\t") and pending is not None:
+            pending += raw[1:]
+            continue
+        line, pending = pending, raw
+        if not line:
+            continue
+        if line.startswith("BEGIN:"):
+            if current is not None:
+                nested += 1
+            elif line[6:].upper() in kinds:
+                current = {}
+                kind = line[6:].upper()
+        elif line.startswith("END:"):
+            if nested:
+                nested -= 1
+            elif current is not None and line[4:].upper() == kind:
+                yield kind, current
+                current = None
+        elif current is not None and not nested and ":" in line:
+            name, value = line.split(":", 1)
+            current.setdefault(name.split(";", 1)[0].upper(), value)
+
+def parse_vtodos(text):
+    return [props for _, props in iter_ical_components(text.splitlines(), ("VTODO",))]
+
+def vtodo_to_task(props):
+    start = parse_ical_time(props["DTSTART"]) if "DTSTART" in props else None
+    end = None
+    for name in ("COMPLETED", "DUE", "DTEND"):
+        if name in props:
+            end = parse_ical_time(props[name])
+            break
+    try:
+        minutes = float(props["X-WRKTMR-MINUTES"])
+    except (KeyError, ValueError):
+        minutes = round((end - start) / 60, 2) if start and end and end > start else 0.0
+    task_entry = {
+        "id": task_id_from_uid(props.get("UID", "")),
+        "task": ical_unescape(props.get("SUMMARY", "")).strip() or "Без названия",
+        "link": props.get("URL", "").strip(),
+        "minutes": minutes,
+        "hours_hundredths": round(minutes / 60, 2),
+        "time_str": format_minutes(minutes)
+    }
+    if start:
+        task_entry["start_timestamp"] = start
+    if end:
+        task_entry["end_timestamp"] = end
+    return task_entry
+
+def task_day(task):
+    timestamp = task.get("start_timestamp") or task.get("end_timestamp")
+    if not timestamp:
+        return None
+    return datetime.date.fromtimestamp(timestamp).isoformat()
+
+# Ответ multistatus читается из потока по одному <response>: разобранный элемент сразу
+# очищается, так что REPORT с тысячами задач не держит в памяти всё дерево. sync-token
+# верхнего уровня, если он есть, кладётся в found["sync_token"]
+def iter_multistatus(stream, found=None):
+    import xml.etree.ElementTree as ET
+    depth = 0
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if elem.tag == f"{{{DAV_NS}}}sync-token" and depth == 1 and found is not None:
+            found["sync_token"] = elem.text
+        if elem.tag != f"{{{DAV_NS}}}response" or depth != 1:
+            continue
+        href = unquote(urlparse((elem.findtext(f"{{{DAV_NS}}}href") or "").strip()).path)
+        status = elem.findtext(f"{{{DAV_NS}}}status") or ""
+        props = {}
+        for propstat in elem.findall(f"{{{DAV_NS}}}propstat"):
+            if " 200" not in (propstat.findtext(f"{{{DAV_NS}}}status") or ""):
+                continue
+            prop = propstat.find(f"{{{DAV_NS}}}prop")
+            if prop is not None:
+                for child in prop:
+                    props[child.tag] = child.text or ""
+        elem.clear()
+        yield href, status, props
+
+def parse_multistatus(body):
+    found = {}
+    responses = list(iter_multistatus(io.BytesIO(body), found))
+    return responses, found.get("sync_token")
+
+class CalDAVClient:
+    def __init__(self, url, user="", password="", timeout=20):
+        self.url = url if url.endswith("/") else url + "/"
+        self.path = unquote(urlparse(self.url).path)
+        self.auth = None
+        if user:
+            self.auth = "Basic " + base64.b64encode(f"{user}:{password}".encode("utf-8")).decode("ascii")
+        self.timeout = timeout
+        self.requests = 0
+
+    # Ответ для чтения потоком; ошибки HTTP тоже возвращаются ответом со status, а не исключением
+    def open(self, method, href, body=None, headers=None):
+        import urllib.request
+        import urllib.error
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        url = href if "://" in href else urljoin(self.url, quote(href))
+        req = urllib.request.Request(url, data=data, method=method)
+        for name, value in (headers or {}).items():
+            req.add_header(name, value)
+        if self.auth:
+            req.add_header("Authorization", self.auth)
+        self.requests += 1
+        try:
+            return urllib.request.urlopen(req, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            return e
+
+    def request(self, method, href, body=None, headers=None):
+        with self.open(method, href, body, headers) as resp:
+            return resp.status, resp.headers, resp.read()
+
+    def xml_request(self, method, body, depth):
+        headers = {"Content-Type": "application/xml; charset=utf-8", "Depth": str(depth)}
+        return self.request(method, self.url, body, headers)
+
+    def xml_open(self, method, body, depth):
+        headers = {"Content-Type": "application/xml; charset=utf-8", "Depth": str(depth)}
+        return self.open(method, self.url, body, headers)
+
+class CalDAVSyncResult:
+    def __init__(self):
+        self.updated = []
+        self.imported = []
+        self.removed = []
+        self.base_hashes = {}
+        self.uid_of = {}
+        self.fetched = 0
+        self.pushed = 0
+        self.deleted = 0
+        self.conflicts = 0
+        self.requests = 0
+        self.method = ""
+
+    def summary(self):
+        return (f"отправлено {self.pushed}, удалено {self.deleted}, получено {self.fetched} "
+                f"(обновлено {len(self.updated)}, новых {len(self.imported)}, удалено на сервере {len(self.removed)}), "
+                f"конфликтов {self.conflicts}, запросов {self.requests}, способ: {self.method}")
+
+class CalDAVSync:
+    def __init__(self, client, state_file=CALDAV_STATE_FILE):
+        self.client = client
+        self.state_file = state_file
+        self.state = self.load_state()
+
+    def load_state(self):
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("collection") == self.client.url:
+                return state
+        except (OSError, ValueError):
+            pass
+        return {"collection": self.client.url, "ctag": None, "sync_token": None, "items": {}}
+
+    def save_state(self):
+        write_file_atomic(self.state_file, json.dumps(self.state, ensure_ascii=False))
+
+    def href_for(self, uid):
+        return self.client.path + uid + ".ics"
+
+    def sync(self, local_tasks, day, outbox=()):
+        result = CalDAVSyncResult()
+        requests_before = self.client.requests
+        # Задачи, пришедшие с сервера, сохраняют чужой UID: соответствие id -> UID берётся из кэша
+        uid_of = {item["id"]: uid for uid, item in self.state["items"].items() if item.get("id")}
+        local = {}
+        for t in local_tasks:
+            if t.get("id") and "timer_start" not in t:
+                local[uid_of.get(t["id"]) or caldav_uid(t["id"])] = dict(t)
+        # Очередь изменений добавляет задачи прошлых дней, которых нет в списке, и явные удаления
+        item_days = dict.fromkeys(local, day)
+        deleted = set()
+        for entry in outbox:
+            uid = uid_of.get(entry["id"]) or caldav_uid(entry["id"])
+            if entry["op"] == "delete":
+                if uid not in local:
+                    deleted.add(uid)
+            elif uid not in local and entry.get("task"):
+                local[uid] = dict(entry["task"], id=entry["id"])
+                item_days[uid] = task_day(local[uid]) or day
+        bodies = {uid: task_to_vtodo(t, uid) for uid, t in local.items()}
+        hashes = {uid: content_hash(body) for uid, body in bodies.items()}
+        result.uid_of = {t["id"]: uid for uid, t in local.items()}
+        result.base_hashes = {t["id"]: hashes[uid] for uid, t in local.items()}
+        # Состояние сохраняется и при сетевой ошибке, чтобы уже принятые сервером правки не ушли повторно
+        try:
+            self.pull(local, bodies, hashes, day, result)
+            self.push(local, bodies, hashes, day, result, item_days, deleted)
+        finally:
+            self.save_state()
+        result.requests = self.client.requests - requests_before
+        return result
+
+    # ─── Получение изменений ──────────────────────────────────────
+
+    def pull(self, local, bodies, hashes, day, result):
+        changed, removed = self.remote_changes(result)
+        items = self.state["items"]
+        href_index = {item["href"]: uid for uid, item in items.items()}
+        hrefs = list(changed)
+        for i in range(0, len(hrefs), CALDAV_MULTIGET_BATCH):
+            for href, etag, calendar_data in self.multiget(hrefs[i:i + CALDAV_MULTIGET_BATCH]):
+                result.fetched += 1
+                for _, props in iter_ical_components(calendar_data.splitlines(), ("VTODO",)):
+                    self.apply_remote(props, href, etag, local, bodies, hashes, day, result)
+        for href in removed:
+            uid = href_index.get(href)
+            if uid is None:
+                continue
+            item = items.pop(uid)
+            # Удалённая на сервере задача остаётся локально, если её успели изменить: уйдёт как новая
+            if uid in local and hashes[uid] == item.get("hash"):
+                result.removed.append(local.pop(uid)["id"])
+
+    def apply_remote(self, props, href, etag, local, bodies, hashes, day, result):
+        uid = props.get("UID")
+        if not uid:
+            return
+        items = self.state["items"]
+        item = items.get(uid)
+        remote_task = vtodo_to_task(props)
+        if uid in local:
+            if item is not None and hashes[uid] != item.get("hash"):
+                # Изменено и здесь, и на сервере: локальная версия перезапишет серверную по новому ETag
+                result.conflicts += 1
+                items[uid] = dict(item, href=href, etag=etag)
+                return
+            local[uid].update(remote_task)
+            result.updated.append(remote_task)
+        elif task_day(remote_task) == day:
+            local[uid] = remote_task
+            result.imported.append(remote_task)
+        else:
+            items[uid] = {"href": href, "etag": etag, "hash": None, "day": task_day(remote_task), "id": remote_task["id"]}
+            return
+        result.uid_of[remote_task["id"]] = uid
+        bodies[uid] = task_to_vtodo(local[uid], uid)
+        hashes[uid] = content_hash(bodies[uid])
+        items[uid] = {"href": href, "etag": etag, "hash": hashes[uid], "day": day, "id": remote_task["id"]}
+
+    def remote_changes(self, result):
+        if self.state.get("sync_token") is not False:
+            changes = self.sync_collection()
+            if changes is not None:
+                result.method = "sync-collection"
+                return changes
+            self.state["sync_token"] = False
+        result.method = "ctag/etag"
+        return self.etag_changes()
+
+    def sync_collection(self):
+        token = self.state.get("sync_token") or ""
+        status, _, body = self.client.xml_request("REPORT", (
+            '<?xml version="1.0" encoding="utf-8"?>'
+            '<d:sync-collection xmlns:d="DAV:">'
+            f'<d:sync-token>{xml_text(token)}</d:sync-token><d:sync-level>1</d:sync-level>'
+            '<d:prop><d:getetag/></d:prop></d:sync-collection>'), 1)
+        if status in (403, 409) and token and b"valid-sync-token" in body:
+            # Токен устарел: повторяем с нуля, ETag из кэша всё равно отсеют неизменённые элементы
+            self.state["sync_token"] = None
+            return self.sync_collection()
+        if status != 207:
+            return None
+        responses, new_token = parse_multistatus(body)
+        items = self.state["items"]
+        etags = {item["href"]: item.get("etag") for item in items.values()}
+        changed = {}
+        removed = set()
+        for href, response_status, props in responses:
+            if href.rstrip("/") == self.client.path.rstrip("/"):
+                continue
+            if " 404" in response_status:
+                removed.add(href)
+                continue
+            etag = props.get(f"{{{DAV_NS}}}getetag")
+            if etag is None or etag != etags.get(href):
+                changed[href] = etag
+        if not token:
+            removed = set(etags) - set(changed) - {href for href, _, _ in responses}
+        self.state["sync_token"] = new_token
+        return changed, removed
+
+    def etag_changes(self):
+        status, _, body = self.client.xml_request("PROPFIND", (
+            '<?xml version="1.0" encoding="utf-8"?>'
+            '<d:propfind xmlns:d="DAV:" xmlns:cs="http://calendarserver.org/ns/">'
+            '<d:prop><cs:getctag/></d:prop></d:propfind>'), 0)
+        if status != 207:
+            raise CalDAVError(f"PROPFIND {self.client.url}: HTTP {status}")
+        responses, _ = parse_multistatus(body)
+        ctag = responses[0][2].get(f"{{{CS_NS}}}getctag") if responses else None
+        if ctag is not None and ctag == self.state.get("ctag"):
+            return {}, set()
+        status, _, body = self.client.xml_request("PROPFIND", (
+            '<?xml version="1.0" encoding="utf-8"?>'
+            '<d:propfind xmlns:d="DAV:"><d:prop><d:getetag/></d:prop></d:propfind>'), 1)
+        if status != 207:
+            raise CalDAVError(f"PROPFIND {self.client.url}: HTTP {status}")
+        responses, _ = parse_multistatus(body)
+        etags = {item["href"]: item.get("etag") for item in self.state["items"].values()}
+        listed = set()
+        changed = {}
+        for href, _, props in responses:
+            etag = props.get(f"{{{DAV_NS}}}getetag")
+            if etag is None or href.rstrip("/") == self.client.path.rstrip("/"):
+                continue
+            listed.add(href)
+            if etag != etags.get(href):
+                changed[href] = etag
+        self.state["ctag"] = ctag
+        return changed, set(etags) - listed
+
+    def multiget(self, hrefs):
+        if not hrefs:
+            return
+        href_xml = "".join(f"<d:href>{xml_text(quote(href))}</d:href>" for href in hrefs)
+        with self.client.xml_open("REPORT", (
+                '<?xml version="1.0" encoding="utf-8"?>'
+                '<c:calendar-multiget xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">'
+                f'<d:prop><d:getetag/><c:calendar-data/></d:prop>{href_xml}</c:calendar-multiget>'), 1) as resp:
+            if resp.status != 207:
+                raise CalDAVError(f"REPORT calendar-multiget: HTTP {resp.status}")
+            for href, _, props in iter_multistatus(resp):
+                if f"{{{CALDAV_NS}}}calendar-data" in props:
+                    yield href, props.get(f"{{{DAV_NS}}}getetag"), props[f"{{{CALDAV_NS}}}calendar-data"]
+
+    # ─── Отправка изменений ───────────────────────────────────────
+
+    def push(self, local, bodies, hashes, day, result, item_days, deleted):
+        items = self.state["items"]
+        for uid, task in local.items():
+            item = items.get(uid)
+            if item is not None and item.get("hash") == hashes[uid]:
+                continue
+            href = item["href"] if item else self.href_for(uid)
+            headers = {"Content-Type": "text/calendar; charset=utf-8"}
+            if item is None:
+                headers["If-None-Match"] = "*"
+            elif item.get("etag"):
+                headers["If-Match"] = item["etag"]
+            status, response_headers, _ = self.client.request("PUT", href, bodies[uid], headers)
+            if status in (200, 201, 204):
+                items[uid] = {"href": href, "etag": response_headers.get("ETag"), "hash": hashes[uid],
+                              "day": item_days.get(uid, day), "id": task["id"]}
+                result.pushed += 1
+            elif status == 412:
+                # Сервер изменил элемент после нашего чтения: заберём его при следующей синхронизации
+                items[uid] = {"href": href, "etag": None, "hash": None, "day": item_days.get(uid, day), "id": task["id"]}
+                result.conflicts += 1
+            else:
+                raise CalDAVError(f"PUT {href}: HTTP {status}")
+        for uid, item in list(items.items()):
+            if uid in local or (uid not in deleted and (item.get("day") != day or item.get("hash") is None)):
+                continue
+            headers = {"If-Match": item["etag"]} if item.get("etag") else {}
+            status, _, _ = self.client.request("DELETE", item["href"], None, headers)
+            if status in (200, 204, 404):
+                del items[uid]
+                result.deleted += 1
+            elif status == 412:
+                item["etag"] = None
+                item["hash"] = None
+                result.conflicts += 1
+            else:
+                raise CalDAVError(f"DELETE {item['href']}: HTTP {status}")
+
+def xml_text(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+# Результат синхронизации применяется в потоке интерфейса; задачи, изменённые после снимка, не трогаем
+def apply_caldav_result(result):
+    changed = False
+    for remote_task in result.updated:
+        task = task_store.get(remote_task["id"])
+        if task is None or "timer_start" in task:
+            continue
+        if content_hash(task_to_vtodo(task, result.uid_of.get(remote_task["id"]))) != result.base_hashes.get(remote_task["id"]):
+            continue
+        task_store.update(remote_task["id"], remote_task)
+        changed = True
+    for remote_task in result.imported:
+        if not task_store.contains(remote_task["id"]):
+            task_store.add(Task(remote_task))
+            changed = True
+    for task_id in result.removed:
+        task = task_store.get(task_id)
+        if task is not None and "timer_start" not in task:
+            task_store.remove(task_id)
+            changed = True
+    if changed:
+        save_backup()
+    return changed
+
+# Очередь изменений для синхронизации: каждая правка завершённой задачи дописывается строкой JSON
+# в sync_outbox.jsonl и хранится, пока сервер её не примет. Для одной задачи в памяти держится
+# только последняя правка, поэтому после долгой работы без сети уходит по одному запросу на задачу.
+SYNC_OUTBOX_FILE = os.path.join(get_config_dir(), "logs", "sync_outbox.jsonl")
+SYNC_BATCH_SIZE = 200
+SYNC_KICK_DELAY_MS = 5000
+SYNC_BACKOFF_BASE_S = 30
+SYNC_BACKOFF_MAX_S = 1800
+
+class SyncOutbox:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.seq = 0
+        self.on_record = None
+
+    def load(self):
+        self.entries.clear()
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        self.put(json.loads(line))
+                    except (ValueError, KeyError) as e:
+                        print(f"Пропущена повреждённая запись очереди синхронизации: {e}")
+        except OSError as e:
+            print(f"Ошибка чтения очереди синхронизации: {e}")
+        if self.entries:
+            print(f"В очереди синхронизации {len(self.entries)} задач.")
+
+    def put(self, entry):
+        self.seq = max(self.seq, entry["seq"])
+        self.entries[entry["id"]] = entry
+
+    def record(self, op, task):
+        entry = {"seq": self.seq + 1, "op": op, "id": task["id"]}
+        if op != "delete":
+            entry["task"] = {k: task[k] for k in JOURNAL_FIELDS if k in task}
+        self.put(entry)
+        io_worker.submit(None, append_text_file, self.path, json.dumps(entry, ensure_ascii=False) + "\n")
+        if self.on_record:
+            self.on_record()
+
+    def depth(self):
+        return len(self.entries)
+
+    def batch(self, limit):
+        return sorted(self.entries.values(), key=lambda e: e["seq"])[:limit]
+
+    # Правки, сделанные во время синхронизации, получили новый seq и остаются в очереди
+    def acknowledge(self, batch):
+        for entry in batch:
+            current = self.entries.get(entry["id"])
+            if current is not None and current["seq"] == entry["seq"]:
+                del self.entries[entry["id"]]
+        if self.entries:
+            content = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in self.batch(len(self.entries)))
+            io_worker.submit("sync_outbox", write_file_atomic, self.path, content)
+        else:
+            io_worker.submit("sync_outbox", remove_files, self.path)
+
+sync_outbox = SyncOutbox(SYNC_OUTBOX_FILE)
+
+# Планировщик синхронизации: запуск по таймеру, вскоре после правки и вручную; ошибки повторяются
+# с экспоненциальной задержкой и случайным разбросом, чтобы клиенты не били в сервер одновременно
+class SyncService(QObject):
+    synced = pyqtSignal(object, bool)
+    sync_failed = pyqtSignal(object, bool)
+    status_changed = pyqtSignal()
+
+    def __init__(self, worker, outbox):
+        super().__init__()
+        self.worker = worker
+        self.outbox = outbox
+        self.engine = None
+        self.engine_settings = None
+        self.running = False
+        self.manual = False
+        self.again = False
+        self.batch = []
+        self.started_at = 0.0
+        self.failures = 0
+        self.last_error = ""
+        self.last_sync_at = None
+        self.last_latency_ms = None
+        self.next_retry_at = None
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(lambda: self.sync(manual=False))
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(lambda: self.sync(manual=False))
+        self.kick_timer = QTimer(self)
+        self.kick_timer.setSingleShot(True)
+        self.kick_timer.timeout.connect(lambda: self.sync(manual=False))
+        worker.finished.connect(self.on_finished)
+        worker.failed.connect(self.on_failed)
+        outbox.on_record = self.kick
+
+    def apply_settings(self):
+        self.timer.stop()
+        if SYNC_ENABLED and caldav_configured():
+            self.timer.start(max(1, SYNC_INTERVAL_MIN) * 60 * 1000)
+        self.status_changed.emit()
+
+    def stop(self):
+        self.timer.stop()
+        self.retry_timer.stop()
+        self.kick_timer.stop()
+        self.outbox.on_record = None
+
+    def kick(self):
+        if SYNC_ENABLED and caldav_configured() and not self.retry_timer.isActive():
+            self.kick_timer.start(SYNC_KICK_DELAY_MS)
+        self.status_changed.emit()
+
+    def sync(self, manual=False):
+        if not caldav_configured():
+            return False
+        if self.running:
+            self.manual = self.manual or manual
+            self.again = True
+            return True
+        settings = (CALDAV_URL, CALDAV_USER, CALDAV_PASSWORD)
+        if self.engine is None or self.engine_settings != settings:
+            self.engine = CalDAVSync(CalDAVClient(*settings))
+            self.engine_settings = settings
+        self.retry_timer.stop()
+        self.kick_timer.stop()
+        self.running = True
+        self.manual = manual
+        self.again = False
+        self.batch = self.outbox.batch(SYNC_BATCH_SIZE)
+        snapshot = [t.copy() for t in tasks if "timer_start" not in t]
+        self.started_at = time.perf_counter()
+        self.worker.submit("caldav", self.engine.sync, snapshot, datetime.date.today().isoformat(), self.batch)
+        self.status_changed.emit()
+        return True
+
+    def on_finished(self, name, result):
+        if name != "caldav":
+            return
+        self.running = False
+        self.last_latency_ms = (time.perf_counter() - self.started_at) * 1000
+        self.last_sync_at = time.time()
+        self.failures = 0
+        self.last_error = ""
+        self.next_retry_at = None
+        self.outbox.acknowledge(self.batch)
+        self.batch = []
+        apply_caldav_result(result)
+        print(f"Синхронизация CalDAV за {self.last_latency_ms:.0f} мс: {result.summary()}")
+        manual, self.manual = self.manual, False
+        self.synced.emit(result, manual)
+        if self.again or self.outbox.depth():
+            self.kick_timer.start(0 if self.again else 1000)
+        self.status_changed.emit()
+
+    def on_failed(self, name, error):
+        if name != "caldav":
+            return
+        self.running = False
+        self.batch = []
+        self.failures += 1
+        self.last_error = str(error)
+        delay = min(SYNC_BACKOFF_MAX_S, SYNC_BACKOFF_BASE_S * 2 ** (self.failures - 1)) * random.uniform(0.5, 1.0)
+        self.next_retry_at = time.time() + delay
+        self.retry_timer.start(int(delay * 1000))
+        print(f"Синхронизация CalDAV не удалась (попытка {self.failures}), повтор через {delay:.0f} с: {error}")
+        manual, self.manual = self.manual, False
+        self.sync_failed.emit(error, manual)
+        self.status_changed.emit()
+
+    def status_text(self):
+        if self.running:
+            state = "синхронизация…"
+        elif self.last_error:
+            state = "ошибка"
+        elif self.last_sync_at:
+            state = "✓"
+        else:
+            state = "не синхронизировано"
+        text = f"☁️ {state} · в очереди {self.outbox.depth()}"
+        if self.last_latency_ms is not None:
+            text += f" · {self.last_latency_ms:.0f} мс"
+        return text
+
+    def status_tooltip(self):
+        lines = [f"Задач в очереди: {self.outbox.depth()}"]
+        if self.last_sync_at:
+            lines.append(f"Последняя синхронизация: {datetime.datetime.fromtimestamp(self.last_sync_at).strftime('%H:%M:%S')}")
+        if self.last_latency_ms is not None:
+            lines.append(f"Длительность: {self.last_latency_ms:.0f} мс")
+        if self.last_error:
+            lines.append(f"Ошибка: {self.last_error}")
+        if self.next_retry_at:
+            lines.append(f"Повтор в {datetime.datetime.fromtimestamp(self.next_retry_at).strftime('%H:%M:%S')} (попытка {self.failures + 1})")
+        return "\n".join(lines)
+
+# ─── Экспорт в ICS ────────────────────────────────────────────────
+# Календарь лежит в файле блоками по дням в порядке дат, а рядом в <файл>.idx — хэш содержимого,
+# смещение и длина каждого блока. Повторный экспорт заново формирует только дни с изменившимся
+# хэшем: если после первого такого дня нет неизменённых блоков, файл обрезается и дописывается
+# на месте, иначе собирается во временный файл с побайтовым копированием неизменённых блоков.
+
+ICS_INDEX_VERSION = 1
+ICS_HEADER = ("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//wrktmr//wrktmr041//RU\r\n"
+              "CALSCALE:GREGORIAN\r\nX-WR-CALNAME:wrktmr\r\n").encode("utf-8")
+ICS_FOOTER = b"END:VCALENDAR\r\n"
+ICS_COPY_CHUNK = 1 << 20
+
+def ics_sorted(day_tasks):
+    return sorted(day_tasks, key=lambda t: (t.get("start_timestamp") or 0, t.get("id") or ""))
+
+def ics_day_hash(day_tasks):
+    digest = hashlib.sha1()
+    for t in day_tasks:
+        digest.update(json.dumps([t.get("id"), t.get("task"), t.get("link"), t.get("start_timestamp"),
+                                  t.get("end_timestamp"), t.get("minutes"), t.get("time_str")],
+                                 ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+def write_ics_day(f, day_tasks):
+    size = 0
+    for t in day_tasks:
+        kind = "VEVENT" if t.get("start_timestamp") and t.get("end_timestamp") else "VTODO"
+        lines = ical_component_lines(t, caldav_uid(t["id"]), kind)
+        block = ("\r\n".join(ical_fold(line) for line in lines) + "\r\n").encode("utf-8")
+        f.write(block)
+        size += len(block)
+    return size
+
+def copy_byte_range(source, target, offset, length):
+    source.seek(offset)
+    while length > 0:
+        chunk = source.read(min(length, ICS_COPY_CHUNK))
+        if not chunk:
+            raise ValueError("ICS-файл короче, чем записано в индексе")
+        target.write(chunk)
+        length -= len(chunk)
+
+def load_ics_index(path):
+    try:
+        with open(path + ".idx", "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") == ICS_INDEX_VERSION and os.path.getsize(path) == index.get("size"):
+            return index
+    except (OSError, ValueError):
+        pass
+    return None
+
+# days — список (день "ГГГГ-ММ-ДД", задачи) в порядке дат; дни без задач в файл не попадают
+def export_ics(path, days):
+    days = [(day, ics_sorted(day_tasks)) for day, day_tasks in days if day_tasks]
+    hashes = [ics_day_hash(day_tasks) for _, day_tasks in days]
+    index = load_ics_index(path)
+    old_days = index["days"] if index else []
+    keep = 0
+    while (keep < len(old_days) and keep < len(days) and old_days[keep]["day"] == days[keep][0]
+           and old_days[keep]["hash"] == hashes[keep]):
+        keep += 1
+    stats = {"path": path, "days": len(days), "kept": keep, "copied": 0, "rendered": 0, "mode": "unchanged"}
+    if index and keep == len(old_days) == len(days):
+        return stats
+    old_by_day = {d["day"]: d for d in old_days[keep:]}
+    reuse = []
+    for (day, _), day_hash in zip(days[keep:], hashes[keep:]):
+        old = old_by_day.get(day)
+        reuse.append(old if old is not None and old["hash"] == day_hash else None)
+    if index:
+        offset = old_days[keep]["offset"] if keep < len(old_days) else index["size"] - len(ICS_FOOTER)
+    else:
+        offset = len(ICS_HEADER)
+    entries = old_days[:keep]
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    source = open(path, "rb") if index and any(reuse) else None
+    try:
+        if index and source is None:
+            stats["mode"] = "append"
+            target = open(path, "r+b")
+            target.seek(offset)
+            target.truncate()
+        else:
+            stats["mode"] = "patch" if index else "full"
+            target = open(path + ".part", "wb")
+            if source is not None:
+                copy_byte_range(source, target, 0, offset)
+            else:
+                target.write(ICS_HEADER)
+                offset = len(ICS_HEADER)
+        with target:
+            for (day, day_tasks), day_hash, old in zip(days[keep:], hashes[keep:], reuse):
+                if old is not None:
+                    copy_byte_range(source, target, old["offset"], old["length"])
+                    length = old["length"]
+                    stats["copied"] += 1
+                else:
+                    length = write_ics_day(target, day_tasks)
+                    stats["rendered"] += 1
+                entries.append({"day": day, "hash": day_hash, "offset": offset, "length": length})
+                offset += length
+            target.write(ICS_FOOTER)
+    finally:
+        if source is not None:
+            source.close()
+    if stats["mode"] != "append":
+        os.replace(path + ".part", path)
+    write_file_atomic(path + ".idx", json.dumps({"version": ICS_INDEX_VERSION, "size": offset + len(ICS_FOOTER),
+                                                 "days": entries}))
+    return stats
+
+# Снимок для экспорта собирается в потоке интерфейса: прошлые дни из истории, сегодняшний из хранилища
+def collect_ics_days(window_days):
+    today = datetime.date.today()
+    days = {}
+    if window_days > 1:
+        date_from = today - datetime.timedelta(days=window_days - 1)
+        for t in iter_tasks(date_from, today - datetime.timedelta(days=1)):
+            days.setdefault(t["day"], []).append(t)
+    today_tasks = [t.copy() for t in tasks if "timer_start" not in t]
+    if today_tasks:
+        days[today.strftime("%Y-%m-%d")] = today_tasks
+    return sorted(days.items())
+
+def ics_stats_text(stats):
+    modes = {"unchanged": "без изменений", "append": "дописан", "patch": "обновлён", "full": "создан заново"}
+    return (f"{stats['path']}: {modes.get(stats['mode'], stats['mode'])}, дней {stats['days']}, "
+            f"сформировано {stats['rendered']}, скопировано {stats['copied']}, без изменений {stats['kept']}")
+
+# ─── Импорт из ICS ────────────────────────────────────────────────
+# Файл читается в фоне построчно; задачи сводятся в индекс UID -> задача (повтор UID заменяет
+# прежнюю версию), id задачи выводится из UID так же, как при CalDAV. Слияние идёт в потоке
+# интерфейса: сегодняшние задачи сверяются с хранилищем по id и добавляются одной пачкой
+# с одним save_backup, прошлые дни дописываются в свои логи по одной записи на день
+
+def read_ics_tasks(path):
+    today = datetime.date.today().isoformat()
+    by_uid = {}
+    components = 0
+    without_uid = 0
+    with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+        for _, props in iter_ical_components(f):
+            components += 1
+            uid = props.get("UID", "").strip()
+            if not uid:
+                without_uid += 1
+                continue
+            by_uid[uid] = vtodo_to_task(props)
+    days = {}
+    for remote_task in by_uid.values():
+        days.setdefault(task_day(remote_task) or today, []).append(Task(remote_task))
+    return {"path": path, "days": days, "components": components, "without_uid": without_uid,
+            "duplicates": components - without_uid - len(by_uid)}
+
+# Слияние, а не снимок: выполняется в фоновом потоке без ключа, чтобы два импорта одного дня
+# не объединились в одно задание, и читает лог дня уже на момент записи
+def merge_day_log(day, day_tasks):
+    date = datetime.date.fromisoformat(day)
+    log_file = os.path.join(get_config_dir(), "logs", str(date.year), f"{date.month:02d}", f"{date.day:02d}", f"{day}.txt")
+    source_file = next(iter_log_day_files(date, date), (None, None))[1]
+    existing = []
+    if source_file:
+        existing = replay_journal(source_file) if source_file.endswith(".journal") else parse_backup_file(source_file)
+    merged = {t["id"]: t for t in existing}
+    for t in day_tasks:
+        merged[t["id"]] = t
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    write_file_atomic(log_file, "".join(backup_line(t) for t in merged.values()))
+
+def import_past_days(days):
+    if STORAGE_BACKEND == "sqlite":
+        conn = get_sqlite_connection()
+        positions = dict(conn.execute(
+            f"SELECT day, MAX(position) + 1 FROM tasks WHERE day IN ({', '.join('?' * len(days))}) GROUP BY day",
+            list(days)).fetchall())
+        rows = [sqlite_task_row(t, day, positions.get(day, 0) + pos)
+                for day, day_tasks in days.items() for pos, t in enumerate(day_tasks)]
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return
+    for day, day_tasks in days.items():
+        io_worker.submit(None, merge_day_log, day, day_tasks)
+
+def apply_ics_import(result):
+    today = datetime.date.today().isoformat()
+    days = dict(result["days"])
+    added, updated = [], []
+    stats = {"added": 0, "updated": 0, "unchanged": 0, "active": 0, "past_days": 0, "past_tasks": 0}
+    for remote_task in days.pop(today, []):
+        task = task_store.get(remote_task["id"])
+        if task is None:
+            added.append(remote_task)
+            continue
+        if "timer_start" in task:
+            stats["active"] += 1
+            continue
+        changes = {k: remote_task[k] for k in JOURNAL_FIELDS if k in remote_task and task.get(k) != remote_task[k]}
+        if changes:
+            updated.append((remote_task["id"], changes))
+        else:
+            stats["unchanged"] += 1
+    if added or updated:
+        task_store.merge(added, updated)
+        save_backup()
+    stats["added"] = len(added)
+    stats["updated"] = len(updated)
+    if days:
+        import_past_days(days)
+        stats["past_days"] = len(days)
+        stats["past_tasks"] = sum(len(day_tasks) for day_tasks in days.values())
+    return stats
+
+def ics_import_text(result, stats):
+    lines = [
+        f"Файл: {result['path']}",
+        f"Компонентов: {result['components']}, повторов UID: {result['duplicates']}, без UID: {result['without_uid']}",
+        f"Сегодня: добавлено {stats['added']}, обновлено {stats['updated']}, без изменений {stats['unchanged']}"
+    ]
+    if stats["active"]:
+        lines.append(f"Пропущено активных задач: {stats['active']}")
+    if stats["past_days"]:
+        lines.append(f"В историю: {stats['past_tasks']} задач за {stats['past_days']} дн.")
+    return "\n".join(lines)
+
+# ─── Подписка на календарь ────────────────────────────────────────
+# Локальный HTTP-сервер на asyncio отдаёт историю из дневных логов как ICS-ленту для подписки (webcal):
+#   http://127.0.0.1:<порт>/wrktmr.ics[?days=N | ?from=ГГГГ-ММ-ДД&to=ГГГГ-ММ-ДД]
+# ETag ленты — хэш от хэшей содержимого файлов дней, файл перехэшируется только при смене mtime
+# или размера. Совпавший If-None-Match получает 304 без сборки тела; собранные ленты и блоки дней
+# кэшируются, так что переписанный автосохранением без изменений лог не меняет ни ETag, ни тело
+
+FEED_PATHS = ("/", "/wrktmr.ics")
+FEED_MAX_DAYS = 3660
+FEED_CACHE_SIZE = 16
+FEED_DAY_CACHE_SIZE = 512
+FEED_IDLE_TIMEOUT_S = 30
+FEED_MAX_HEADER = 16384
+
+def accepts_gzip(accept_encoding):
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        q = params.strip().lower()
+        if q.startswith("q="):
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+# If-None-Match сравнивается слабо (RFC 9110), "*" совпадает с любой лентой
+def etag_matches(if_none_match, etag):
+    for item in if_none_match.split(","):
+        item = item.strip()
+        if item == "*" or (item[2:] if item.startswith("W/") else item) == etag:
+            return True
+    return False
+
+class ICSFeedServer:
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.port = None
+        self.days = ICS_DAYS
+        # путь -> (mtime_ns, размер, sha1 содержимого, блок дня или None); трогается только из потока сервера
+        self.day_cache = OrderedDict()
+        # (с, по) -> [etag, тело, тело gzip или None]
+        self.feeds = OrderedDict()
+        self.stats = {"requests": 0, "not_modified": 0, "cached": 0, "rendered": 0, "days_rendered": 0}
+
+    def url(self):
+        return f"http://127.0.0.1:{self.port}/wrktmr.ics"
+
+    def start(self, port, days):
+        self.stop()
+        self.days = days
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                server = loop.run_until_complete(asyncio.start_server(self.handle, "127.0.0.1", port, limit=FEED_MAX_HEADER))
+            except OSError as e:
+                errors.append(e)
+                loop.close()
+                ready.set()
+                return
+            self.port = server.sockets[0].getsockname()[1]
+            self.loop = loop
+            ready.set()
+            try:
+                loop.run_forever()
+            finally:
+                server.close()
+                pending = asyncio.all_tasks(loop)
+                for task in pending:
+                    task.cancel()
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                loop.close()
+
+        self.thread = threading.Thread(target=run, name="wrktmr-feed", daemon=True)
+        self.thread.start()
+        ready.wait()
+        if errors:
+            self.thread.join()
+            self.thread = None
+            return errors[0]
+        print(f"Лента календаря: {self.url()}")
+        return None
+
+    def stop(self):
+        if self.thread is None:
             return
-        remaining_lines = []
-        removed = False
-        with open(active_tasks_file, "r", encoding="utf-8") as f:
-            for line in f:
-                parts = line.strip().split(" | ")
-                if len(parts) < 4:
-                    remaining_lines.append(line.strip())
-                    continue
-                saved_id = parts[0]
-                if saved_id != task_id:
-                    remaining_lines.append(line.strip())
-                else:
-                    removed = True
-        with open(active_tasks_file, "w", encoding="utf-8") as f:
-            for line in remaining_lines:
-                f.write(line + "\n")
-        if not remaining_lines:
-            os.remove(active_tasks_file)
-        if removed:
-            print(f"Активная задача {task_id} удалена из временного файла.")
-    except Exception as e:
-        print(f"Ошибка удаления активной задачи: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.thread = None
+        self.loop = None
+        s = self.stats
+        print(f"Лента календаря остановлена: запросов {s['requests']}, не изменилось {s['not_modified']}, "
+              f"из кэша {s['cached']}, собрано {s['rendered']}, дней сформировано {s['days_rendered']}")
 
-def group_tasks():
-    grouped = {}
-    for t in tasks:
-        link_key = t["link"].strip().lower() if t.get("link") else None
-        if link_key:
-            if link_key not in grouped:
-                grouped[link_key] = {
-                    "task": t["task"],
-                    "link": t["link"],
-                    "minutes": 0.0,
-                    "hours_hundredths": 0.0,
-                    "count": 0,
-                    "key": link_key
-                }
-            grouped[link_key]["minutes"] += t["minutes"]
-            grouped[link_key]["hours_hundredths"] += t["hours_hundredths"]
-            grouped[link_key]["count"] += 1
-        name_key = t["task"].strip().lower()
-        if name_key not in grouped:
-            grouped[name_key] = {
-                "task": t["task"],
-                "link": t["link"],
-                "minutes": 0.0,
-                "hours_hundredths": 0.0,
-                "count": 0,
-                "key": name_key
-            }
-        grouped[name_key]["minutes"] += t["minutes"]
-        grouped[name_key]["hours_hundredths"] += t["hours_hundredths"]
-        grouped[name_key]["count"] += 1
-    return [g for g in grouped.values() if g["count"] > 1]
+    def feed_range(self, query):
+        today = datetime.date.today()
+        if "from" in query or "to" in query:
+            date_to = datetime.date.fromisoformat(query["to"][0]) if "to" in query else today
+            date_from = datetime.date.fromisoformat(query["from"][0]) if "from" in query else date_to - datetime.timedelta(days=self.days - 1)
+            if date_from > date_to:
+                date_from, date_to = date_to, date_from
+            if (date_to - date_from).days >= FEED_MAX_DAYS:
+                raise ValueError(f"период длиннее {FEED_MAX_DAYS} дней")
+            return date_from, date_to
+        days = int(query["days"][0]) if "days" in query else self.days
+        if not 1 <= days <= FEED_MAX_DAYS:
+            raise ValueError(f"days должно быть от 1 до {FEED_MAX_DAYS}")
+        return today - datetime.timedelta(days=days - 1), today
 
-def parse_time_range(time_str):
-    try:
-        start_str, end_str = time_str.split("-")
-        h1, m1 = map(int, start_str.split(":"))
-        h2, m2 = map(int, end_str.split(":"))
-        start_minutes = h1 * 60 + m1
-        end_minutes = h2 * 60 + m2
-        if end_minutes < start_minutes:
-            end_minutes += 24 * 60
-        diff = end_minutes - start_minutes
-        return diff
-    except:
-        return 0.0
+    def day_entry(self, path):
+        st = os.stat(path)
+        cached = self.day_cache.get(path)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            self.day_cache.move_to_end(path)
+            return cached
+        with open(path, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        block = cached[3] if cached and cached[2] == digest else None
+        entry = (st.st_mtime_ns, st.st_size, digest, block)
+        self.day_cache[path] = entry
+        self.day_cache.move_to_end(path)
+        while len(self.day_cache) > FEED_DAY_CACHE_SIZE:
+            self.day_cache.popitem(last=False)
+        return entry
 
-def extract_markdown_links(text):
-    pattern = r'\[([^\]]+)\]\(([^)]+)\)'
-    matches = re.findall(pattern, text)
-    if matches:
-        display_text = matches[0][0]
-        url = matches[0][1]
-        clean_text = re.sub(pattern, display_text, text, count=1)
-        return clean_text.strip(), url.strip()
-    return text.strip(), ""
+    def day_block(self, path, entry):
+        if entry[3] is not None:
+            return entry[3]
+        day_tasks = replay_journal(path) if path.endswith(".journal") else parse_backup_file(path)
+        buffer = io.BytesIO()
+        write_ics_day(buffer, ics_sorted(day_tasks))
+        self.stats["days_rendered"] += 1
+        block = buffer.getvalue()
+        if path in self.day_cache:
+            self.day_cache[path] = entry[:3] + (block,)
+        return block
 
-def save_csv():
-    global SAVE_DIR
-    today = datetime.date.today().strftime("%Y-%m-%d")
-    file_name = os.path.join(SAVE_DIR, f"{today}.csv")
-    total_minutes = 0.0
-    total_hours_hundredths = 0.0
-    rows = [["Задача", "Ссылка (домен)", "Время (мин:сек)", "Время (часы в сотых)", "Период выполнения"]]
-    for t in tasks:
-        domain = parse_domain(t['link']) if t['link'] else ""
-        period_str = format_time_period(t.get('start_timestamp'), t.get('end_timestamp'))
-        rows.append([t['task'], domain, t['time_str'], str(t['hours_hundredths']), period_str])
-        total_minutes += t['minutes']
-        total_hours_hundredths += t['hours_hundredths']
-    rows.append([])
-    rows.append(["ИТОГО", "", f"{round(total_minutes, 2)} мин", f"{round(total_hours_hundredths, 2)} ч", ""])
-    grouped = group_tasks()
-    if grouped:
-        rows.append([])
-        rows.append(["СВОДКА (объединено по совпадению ссылки или названия)"])
-        for gt in grouped:
-            rows.append([gt["task"], parse_domain(gt["link"]) if gt["link"] else "",
-                         f"{round(gt['minutes'], 2)} мин", f"{round(gt['hours_hundredths'], 2)} ч", ""])
+    def feed_etag(self, date_from, date_to):
+        days = []
+        digest = hashlib.sha1(f"{date_from}:{date_to}".encode("ascii"))
+        for day, path in iter_log_day_files(date_from, date_to):
+            try:
+                entry = self.day_entry(path)
+            except OSError:
+                continue
+            days.append((path, entry))
+            digest.update(f"{day}:{entry[2]}".encode("ascii"))
+        return '"' + digest.hexdigest() + '"', days
+
+    def feed(self, date_from, date_to, etag, days):
+        key = (date_from, date_to)
+        cached = self.feeds.get(key)
+        if cached and cached[0] == etag:
+            self.feeds.move_to_end(key)
+            self.stats["cached"] += 1
+            return cached
+        body = ICS_HEADER + b"".join(self.day_block(path, entry) for path, entry in days) + ICS_FOOTER
+        self.stats["rendered"] += 1
+        feed = [etag, body, None]
+        self.feeds[key] = feed
+        while len(self.feeds) > FEED_CACHE_SIZE:
+            self.feeds.popitem(last=False)
+        return feed
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), FEED_IDLE_TIMEOUT_S)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+                    break
+                keep_alive = self.respond(head, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        # При остановке сервера ожидающие соединения отменяются — это штатное завершение
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def send(self, writer, status, headers, body=b"", head_only=False, keep_alive=True):
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+        for name, value in headers.items():
+            lines.append(f"{name}: {value}")
+        if status != 304:
+            lines.append(f"Content-Length: {len(body)}")
+        if not keep_alive:
+            lines.append("Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if body and not head_only:
+            writer.write(body)
+
+    def respond(self, head, writer):
+        lines = head.decode("latin-1").split("\r\n")
+        self.stats["requests"] += 1
+        request_line = lines[0].split()
+        if len(request_line) != 3:
+            self.send(writer, 400, {"Content-Type": "text/plain; charset=utf-8"}, "Неверный запрос".encode("utf-8"), keep_alive=False)
+            return False
+        method, target, version = request_line
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        # Тело у GET не ожидается; если клиент его прислал, соединение закрывается, чтобы не читать его как запрос
+        keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                      and "content-length" not in headers and "transfer-encoding" not in headers)
+        text = {"Content-Type": "text/plain; charset=utf-8"}
+        if method not in ("GET", "HEAD"):
+            self.send(writer, 405, dict(text, Allow="GET, HEAD"), "Поддерживаются только GET и HEAD".encode("utf-8"), keep_alive=keep_alive)
+            return keep_alive
+        url = urlparse(target)
+        if url.path not in FEED_PATHS:
+            self.send(writer, 404, text, "Лента доступна по /wrktmr.ics".encode("utf-8"), method == "HEAD", keep_alive)
+            return keep_alive
+        try:
+            date_from, date_to = self.feed_range(parse_qs(url.query))
+        except (ValueError, IndexError) as e:
+            self.send(writer, 400, text, f"Неверный период: {e}".encode("utf-8"), method == "HEAD", keep_alive)
+            return keep_alive
+        etag, days = self.feed_etag(date_from, date_to)
+        use_gzip = accepts_gzip(headers.get("accept-encoding", ""))
+        # Сжатое и несжатое тело — разные представления, поэтому и сильные ETag у них разные
+        tag = etag[:-1] + '-gz"' if use_gzip else etag
+        response_headers = {"ETag": tag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag_matches(headers.get("if-none-match", ""), tag):
+            self.stats["not_modified"] += 1
+            self.send(writer, 304, response_headers, keep_alive=keep_alive)
+            return keep_alive
+        feed = self.feed(date_from, date_to, etag, days)
+        body = feed[1]
+        if use_gzip:
+            if feed[2] is None:
+                feed[2] = gzip.compress(feed[1], compresslevel=6, mtime=0)
+            body = feed[2]
+            response_headers["Content-Encoding"] = "gzip"
+        response_headers["Content-Type"] = "text/calendar; charset=utf-8"
+        self.send(writer, 200, response_headers, body, method == "HEAD", keep_alive)
+        return keep_alive
+
+ics_feed_server = ICSFeedServer()
+
+def run_ics_feed_cli(argv):
+    port = int(argv[0]) if argv and argv[0].isdigit() else FEED_PORT
+    # Ctrl+C здесь только останавливает сервер: общий обработчик сохранил бы пустой список задач
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    error = ics_feed_server.start(port, ICS_DAYS)
+    if error:
+        print(f"Не удалось запустить ленту календаря на порту {port}: {error}")
+        return 1
     try:
-        with open(file_name, 'w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.writer(f)
-            writer.writerows(rows)
-        print(f"CSV-отчёт сохранён: {file_name}")
-        return file_name
-    except Exception as e:
-        print(f"Ошибка при сохранении CSV: {e}")
-        return None
+        while ics_feed_server.thread.is_alive():
+            ics_feed_server.thread.join(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ics_feed_server.stop()
+    return 0
 
-# ─── Синхронизация ────────────────────────────────────────────────
+# ─── Виджеты задач ────────────────────────────────────────────────
 
 class TaskItemWidget(QFrame):
-    def __init__(self, task_data, index, parent=None):
+    def __init__(self, task_data, index, parent=None, window=None):
         super().__init__(parent)
         self.task_data = task_data
         self.index = index
-        self.parent_window = parent
+        self.parent_window = window or parent
         self.timer_label = None
-        self.timer = None
+        self.ticker = getattr(self.parent_window, "ticker", None)
+        self.time_style = None
         self.confirmation_visible = False
         self.setup_ui()
         if "timer_start" in self.task_data:
@@ -552,7 +3326,6 @@ class TaskItemWidget(QFrame):
             left_layout.addWidget(link_label)
         self.time_display = QLabel()
         self.update_time_display()
-        self.time_display.setStyleSheet("font-size: 11px; color: #aaa;")
         left_layout.addWidget(self.time_display)
         main_layout.addLayout(left_layout)
         button_layout = QVBoxLayout()
@@ -709,39 +3482,37 @@ class TaskItemWidget(QFrame):
     def open_link(self, url):
         QDesktopServices.openUrl(QUrl(url))
 
+    def set_time_style(self, style):
+        if style != self.time_style:
+            self.time_style = style
+            self.time_display.setStyleSheet(style)
+
     def update_time_display(self):
+        time_text, color = task_time_text(self.task_data)
+        self.set_time_style(f"font-size: 11px; color: {color};")
         if "timer_start" in self.task_data:
-            paused_total = self.task_data.get("paused_total", 0.0)
-            if self.task_data.get("is_paused", False):
-                elapsed = self.task_data.get("paused_elapsed", 0.0)
-                time_range_str = format_time_range(self.task_data['start_timestamp'], is_paused=True)
-                self.time_display.setStyleSheet("font-size: 11px; color: #ffd600;")
-            else:
-                elapsed = time.time() - self.task_data['timer_start'] - paused_total
-                time_range_str = format_time_range(self.task_data['start_timestamp'])
-                self.time_display.setStyleSheet("font-size: 11px; color: #69f0ae;")
-            minutes = int(elapsed // 60)
-            hours_hundredths = round(elapsed / 3600, 2)
             frames = ["⠇", "⠋", "⠙", "⠸", "⠴", "⠦"]  # анимация
             if not hasattr(self, '_anim_index'):
                 self._anim_index = 0
             else:
                 self._anim_index = (self._anim_index + 1) % len(frames)  # <-- % len(frames) для 10 кадров
             anim_char = frames[self._anim_index]  # <-- Переименуй anim_chars в frames, если хочешь
-            self.time_display.setText(f"{minutes} мин ({hours_hundredths} ч) {time_range_str} {anim_char}")
-        else:
-            minutes = int(self.task_data['minutes'])
-            hours_hundredths = self.task_data['hours_hundredths']
-            start_ts = self.task_data.get('start_timestamp')
-            end_ts = self.task_data.get('end_timestamp')
-            time_range_str = format_time_range(start_ts, end_ts) if start_ts else ""
-            self.time_display.setStyleSheet("font-size: 11px; color: #aaa;")
-            self.time_display.setText(f"{minutes} мин ({hours_hundredths} ч) {time_range_str}")
+            time_text = f"{time_text} {anim_char}"
+        self.time_display.setText(time_text)
 
     def start_live_timer(self):
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_time_display)
-        self.timer.start(1000)
+        if self.ticker:
+            self.ticker.subscribe(self)
+
+    def stop_live_timer(self):
+        if self.ticker:
+            self.ticker.unsubscribe(self)
+
+    def wants_tick(self):
+        return not self.task_data.get("is_paused", False) and not self.visibleRegion().isEmpty()
+
+    def on_tick(self):
+        self.update_time_display()
 
     def toggle_pause(self):
         if "timer_start" not in self.task_data:
@@ -809,6 +3580,7 @@ class TaskItemWidget(QFrame):
     
         save_active_tasks()
         self.update_time_display()
+        task_store.update(self.task_data.get("id"))
 
     def show_confirmation(self):
         self.confirmation_visible = True
@@ -830,7 +3602,10 @@ class TaskItemWidget(QFrame):
     def finish_task(self):
         if "timer_start" not in self.task_data:
             return
-        remove_active_task(self.index)
+        index = task_store.index_of(self.task_data.get("id"))
+        if index < 0:
+            return
+        remove_active_task(index)
         timer_start = self.task_data['timer_start']
         paused_total = self.task_data.get("paused_total", 0.0)
         if "pause_history" in self.task_data:
@@ -847,26 +3622,25 @@ class TaskItemWidget(QFrame):
         minutes = elapsed / 60
         hours_hundredths = round(minutes / 60, 2)
         time_str = "<1 минуты" if minutes < 1 else f"{int(minutes)}:{int((minutes%1)*60):02d}"
-        tasks[self.index].update({
+        tasks[index].update({
             "minutes": round(minutes, 2),
             "hours_hundredths": hours_hundredths,
             "time_str": time_str,
             "end_timestamp": time.time()
         })
-        del tasks[self.index]["timer_start"]
-        if "is_paused" in tasks[self.index]:
-            del tasks[self.index]["is_paused"]
-        if "paused_total" in tasks[self.index]:
-            del tasks[self.index]["paused_total"]
-        if "pause_history" in tasks[self.index]:
-            del tasks[self.index]["pause_history"]
-        if self.timer:
-            self.timer.stop()
-        save_backup()
-        self.parent_window.load_tasks_to_ui()
+        del tasks[index]["timer_start"]
+        if "is_paused" in tasks[index]:
+            del tasks[index]["is_paused"]
+        if "paused_total" in tasks[index]:
+            del tasks[index]["paused_total"]
+        if "pause_history" in tasks[index]:
+            del tasks[index]["pause_history"]
+        self.stop_live_timer()
+        record_task_change("add", tasks[index])
+        task_store.update(tasks[index]["id"])
 
     def edit_task(self):
-        self.parent_window.edit_task(self.index)
+        self.parent_window.edit_task(task_store.index_of(self.task_data.get("id")))
 
     def initiate_delete(self):
         self.edit_btn.setVisible(False)
@@ -875,7 +3649,7 @@ class TaskItemWidget(QFrame):
         self.cancel_delete_btn.setVisible(True)
 
     def confirm_delete_task(self):
-        self.parent_window.delete_task_internal(self.index)
+        self.parent_window.delete_task_internal(task_store.index_of(self.task_data.get("id")))
 
     def hide_delete_confirmation(self):
         self.confirm_delete_btn.setVisible(False)
@@ -883,6 +3657,212 @@ class TaskItemWidget(QFrame):
         self.edit_btn.setVisible(True)
         self.delete_btn.setVisible(True)
 
+# ─── Виртуальный список задач ─────────────────────────────────────
+
+TASK_ROLE = Qt.ItemDataRole.UserRole
+TASK_INDEX_ROLE = Qt.ItemDataRole.UserRole + 1
+
+class TaskListModel(QAbstractListModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+
+    def refresh(self):
+        self.beginResetModel()
+        self.rows = [task for task in tasks if "timer_start" not in task]
+        self.rows += [task for task in tasks if "timer_start" in task]
+        self.endResetModel()
+
+    def row_of(self, task_id):
+        for row, task in enumerate(self.rows):
+            if task.get("id") == task_id:
+                return row
+        return -1
+
+    def insert_task(self, task_id):
+        task = task_store.get(task_id)
+        position = task_store.display_position(task_id)
+        if task is None or position < 0:
+            return
+        self.beginInsertRows(QModelIndex(), position, position)
+        self.rows.insert(position, task)
+        self.endInsertRows()
+
+    def remove_task(self, task_id):
+        row = self.row_of(task_id)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.rows[row]
+        self.endRemoveRows()
+
+    def on_task_event(self, event, task_id):
+        if event == "reset":
+            self.refresh()
+        elif event == "inserted":
+            self.insert_task(task_id)
+        elif event == "removed":
+            self.remove_task(task_id)
+        elif event == "updated":
+            row = self.row_of(task_id)
+            task = task_store.get(task_id)
+            if row >= 0 and task is not None and task_store.display_position(task_id) == row:
+                self.rows[row] = task
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+            else:
+                self.remove_task(task_id)
+                self.insert_task(task_id)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def task_at(self, row):
+        return self.rows[row]
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.rows):
+            return None
+        task = self.task_at(index.row())
+        if role == Qt.ItemDataRole.DisplayRole:
+            return task["task"]
+        if role == TASK_ROLE:
+            return task
+        if role == TASK_INDEX_ROLE:
+            return task_store.index_of(task.get("id"))
+        return None
+
+class TaskItemDelegate(QStyledItemDelegate):
+    def __init__(self, main_window):
+        super().__init__(main_window)
+        self.main_window = main_window
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), 90)
+
+    def paint(self, painter, option, index):
+        task = index.data(TASK_ROLE)
+        if task is None:
+            return
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        frame_rect = option.rect.adjusted(4, 4, -4, -4)
+        painter.setPen(QColor("#444"))
+        painter.setBrush(QColor("#33414e") if option.state & QStyle.StateFlag.State_Selected else QColor("#2a2a2a"))
+        painter.drawRoundedRect(QRectF(frame_rect), 6, 6)
+        text_rect = frame_rect.adjusted(8, 6, -8, -6)
+        title_font = QFont(option.font)
+        title_font.setPixelSize(13)
+        small_font = QFont(option.font)
+        small_font.setPixelSize(11)
+        title_metrics = QFontMetrics(title_font)
+        small_metrics = QFontMetrics(small_font)
+        title, _ = extract_markdown_links(task["task"])
+        y = text_rect.top()
+        painter.setFont(title_font)
+        painter.setPen(QColor("#dcdcdc"))
+        painter.drawText(QRect(text_rect.left(), y, text_rect.width(), title_metrics.height()),
+                         Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                         title_metrics.elidedText(title, Qt.TextElideMode.ElideRight, text_rect.width()))
+        y += title_metrics.height() + 3
+        painter.setFont(small_font)
+        if task.get("link"):
+            painter.setPen(QColor("#64b5f6"))
+            painter.drawText(QRect(text_rect.left(), y, text_rect.width(), small_metrics.height()),
+                             Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                             small_metrics.elidedText(f"🌐 {parse_domain(task['link'])}", Qt.TextElideMode.ElideRight, text_rect.width()))
+            y += small_metrics.height() + 3
+        time_text, color = task_time_text(task)
+        painter.setPen(QColor(color))
+        painter.drawText(QRect(text_rect.left(), y, text_rect.width(), small_metrics.height()),
+                         Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                         small_metrics.elidedText(time_text, Qt.TextElideMode.ElideRight, text_rect.width()))
+        painter.restore()
+
+    def createEditor(self, parent, option, index):
+        return TaskItemWidget(index.data(TASK_ROLE), index.data(TASK_INDEX_ROLE), parent, window=self.main_window)
+
+    def setEditorData(self, editor, index):
+        pass
+
+    def setModelData(self, editor, model, index):
+        pass
+
+    def updateEditorGeometry(self, editor, option, index):
+        editor.setGeometry(option.rect)
+
+    def destroyEditor(self, editor, index):
+        editor.stop_live_timer()
+        super().destroyEditor(editor, index)
+
+# Виджет-редактор создаётся только для строки под курсором и для выбранной строки,
+# остальные строки рисует TaskItemDelegate
+class TaskListView(QListView):
+    def __init__(self, main_window):
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.hover_index = QPersistentModelIndex()
+        self.setMouseTracking(True)
+        self.setUniformItemSizes(True)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.entered.connect(self.on_entered)
+
+    def forget_editors(self):
+        self.hover_index = QPersistentModelIndex()
+
+    def dataChanged(self, top_left, bottom_right, roles=()):
+        super().dataChanged(top_left, bottom_right, roles)
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            index = self.model().index(row)
+            if self.isPersistentEditorOpen(index):
+                self.closePersistentEditor(index)
+                self.openPersistentEditor(index)
+
+    def on_entered(self, index):
+        if self.hover_index.isValid() and QModelIndex(self.hover_index) == index:
+            return
+        self.close_hover_editor()
+        self.hover_index = QPersistentModelIndex(index)
+        self.openPersistentEditor(index)
+
+    def close_hover_editor(self):
+        if self.hover_index.isValid():
+            index = QModelIndex(self.hover_index)
+            if index != self.currentIndex():
+                self.closePersistentEditor(index)
+        self.hover_index = QPersistentModelIndex()
+
+    def currentChanged(self, current, previous):
+        super().currentChanged(current, previous)
+        if previous.isValid() and previous != QModelIndex(self.hover_index):
+            self.closePersistentEditor(previous)
+        if current.isValid():
+            self.openPersistentEditor(current)
+
+    def leaveEvent(self, event):
+        self.close_hover_editor()
+        super().leaveEvent(event)
+
+    def wants_tick(self):
+        return self.isVisible() and self.model() is not None
+
+    def on_tick(self):
+        model = self.model()
+        top = self.indexAt(QPoint(0, 0)).row()
+        if top < 0:
+            return
+        bottom = self.indexAt(QPoint(0, self.viewport().height() - 1)).row()
+        if bottom < 0:
+            bottom = model.rowCount() - 1
+        for row in range(top, bottom + 1):
+            task = model.task_at(row)
+            if "timer_start" in task and not task.get("is_paused", False):
+                self.viewport().update(self.visualRect(model.index(row)))
+
 def finish_active_task(task_index):
     if task_index < 0 or task_index >= len(tasks):
         return None
@@ -918,6 +3898,62 @@ def finish_active_task(task_index):
     finished_task.pop("pause_history", None)
     return finished_task
 
+class PeriodStatsDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("📅 Статистика за период")
+        self.resize(520, 520)
+        self.setup_ui()
+        self.refresh()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        form = QFormLayout()
+        today = QDate.currentDate()
+        self.date_from_edit = QDateEdit(today.addDays(-6))
+        self.date_from_edit.setCalendarPopup(True)
+        self.date_from_edit.setDisplayFormat("yyyy-MM-dd")
+        self.date_to_edit = QDateEdit(today)
+        self.date_to_edit.setCalendarPopup(True)
+        self.date_to_edit.setDisplayFormat("yyyy-MM-dd")
+        self.name_filter_input = QLineEdit()
+        self.name_filter_input.setPlaceholderText("Часть названия (необязательно)")
+        self.name_filter_input.returnPressed.connect(self.refresh)
+        self.link_filter_input = QLineEdit()
+        self.link_filter_input.setPlaceholderText("Часть ссылки (необязательно)")
+        self.link_filter_input.returnPressed.connect(self.refresh)
+        form.addRow("С:", self.date_from_edit)
+        form.addRow("По:", self.date_to_edit)
+        form.addRow("Задача:", self.name_filter_input)
+        form.addRow("Ссылка:", self.link_filter_input)
+        layout.addLayout(form)
+        refresh_btn = QPushButton("🔄 Показать")
+        refresh_btn.clicked.connect(self.refresh)
+        layout.addWidget(refresh_btn)
+        self.result_view = QTextEdit()
+        self.result_view.setReadOnly(True)
+        layout.addWidget(self.result_view)
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def refresh(self):
+        date_from = self.date_from_edit.date().toPyDate()
+        date_to = self.date_to_edit.date().toPyDate()
+        if date_from > date_to:
+            date_from, date_to = date_to, date_from
+        filters = {"name": self.name_filter_input.text(), "link": self.link_filter_input.text()}
+        try:
+            summary = summarize_history(date_from, date_to, filters)
+            lines = history_summary_lines(summary, date_from, date_to)
+            if summary["count"]:
+                lines.append("")
+                lines.extend(analytics_lines(history_analytics(date_from, date_to, filters)))
+            self.result_view.setPlainText("\n".join(lines))
+        except Exception as e:
+            self.result_view.setPlainText(f"Не удалось прочитать историю: {e}")
+
 class EditTaskDialog(QDialog):
     def __init__(self, task_data, parent=None):
         super().__init__(parent)
@@ -1053,11 +4089,90 @@ class SettingsDialog(QDialog):
         self.task_font_spin.setValue(app_config['USER'].getint('task_font_size', fallback=13))
         self.task_font_spin.setSuffix(" px")
         general_form.addRow("Размер шрифта задач:", self.task_font_spin)
+        self.journal_mode_cb = QCheckBox("Журнал изменений вместо полной перезаписи лога")
+        self.journal_mode_cb.setChecked(app_config['USER'].getboolean('journal_mode', fallback=False))
+        self.journal_mode_cb.setToolTip("Каждое изменение дописывается в конец журнала, полный лог перезаписывается периодически")
+        general_form.addRow(self.journal_mode_cb)
+        self.storage_backend_combo = QComboBox()
+        self.storage_backend_combo.addItem("Текстовые файлы", "text")
+        self.storage_backend_combo.addItem("SQLite", "sqlite")
+        self.storage_backend_combo.setCurrentIndex(max(0, self.storage_backend_combo.findData(app_config['USER'].get('storage_backend', 'text'))))
+        self.storage_backend_combo.setToolTip("SQLite хранит всю историю в одной базе с индексами для быстрых отчётов")
+        general_form.addRow("Хранилище задач:", self.storage_backend_combo)
+        self.task_list_mode_combo = QComboBox()
+        self.task_list_mode_combo.addItem("Виджеты", "widgets")
+        self.task_list_mode_combo.addItem("Виртуальный список", "model")
+        self.task_list_mode_combo.setCurrentIndex(max(0, self.task_list_mode_combo.findData(app_config['USER'].get('task_list_mode', 'widgets'))))
+        self.task_list_mode_combo.setToolTip("Виртуальный список рисует строки без отдельных виджетов — быстрее при тысячах задач")
+        general_form.addRow("Список задач:", self.task_list_mode_combo)
         general_group.setLayout(general_form)
         general_layout.addWidget(general_group)
         general_layout.addStretch()
         tabs.addTab(general_tab, "🎨 Основные")
 
+        # ─── Вкладка "Синхронизация" ─────────────────────────────
+        sync_tab = QWidget()
+        sync_layout = QVBoxLayout(sync_tab)
+        sync_common_group = QGroupBox("Синхронизация")
+        sync_common_form = QFormLayout()
+        self.sync_provider_combo = QComboBox()
+        self.sync_provider_combo.addItem("CalDAV", "caldav")
+        self.sync_provider_combo.addItem("ICS-файл", "ics")
+        self.sync_provider_combo.setCurrentIndex(max(0, self.sync_provider_combo.findData(app_config['SYNC'].get('provider', 'caldav'))))
+        sync_common_form.addRow("Провайдер:", self.sync_provider_combo)
+        self.sync_enabled_cb = QCheckBox("Синхронизировать автоматически")
+        self.sync_enabled_cb.setChecked(app_config['SYNC'].getboolean('enabled', fallback=False))
+        sync_common_form.addRow(self.sync_enabled_cb)
+        self.sync_interval_spin = QSpinBox()
+        self.sync_interval_spin.setRange(1, 1440)
+        self.sync_interval_spin.setValue(app_config['SYNC'].getint('interval_min', fallback=15))
+        self.sync_interval_spin.setSuffix(" мин")
+        sync_common_form.addRow("Интервал:", self.sync_interval_spin)
+        sync_common_group.setLayout(sync_common_form)
+        sync_layout.addWidget(sync_common_group)
+        sync_group = QGroupBox("CalDAV (Nextcloud, iCloud, Yahoo, Zimbra)")
+        sync_form = QFormLayout()
+        self.caldav_url_input = QLineEdit(app_config['SYNC'].get('caldav_url', ''))
+        self.caldav_url_input.setPlaceholderText("https://cloud.example.ru/remote.php/dav/calendars/user/tasks/")
+        self.caldav_url_input.setToolTip("Полный адрес календаря (коллекции) с задачами")
+        sync_form.addRow("Календарь:", self.caldav_url_input)
+        self.caldav_user_input = QLineEdit(app_config['SYNC'].get('caldav_user', ''))
+        sync_form.addRow("Пользователь:", self.caldav_user_input)
+        self.caldav_password_input = QLineEdit(app_config['SYNC'].get('caldav_password', ''))
+        self.caldav_password_input.setEchoMode(QLineEdit.EchoMode.Password)
+        self.caldav_password_input.setToolTip("Для iCloud и Nextcloud с двухфакторной защитой нужен пароль приложения")
+        sync_form.addRow("Пароль:", self.caldav_password_input)
+        sync_group.setLayout(sync_form)
+        sync_layout.addWidget(sync_group)
+        ics_group = QGroupBox("ICS (Outlook, Google Calendar, Thunderbird)")
+        ics_form = QFormLayout()
+        self.ics_path_input = QLineEdit(app_config['SYNC'].get('ics_path', ''))
+        self.ics_path_btn = QPushButton("Обзор...")
+        self.ics_path_btn.clicked.connect(self.browse_ics_path)
+        ics_path_row = QHBoxLayout()
+        ics_path_row.addWidget(self.ics_path_input)
+        ics_path_row.addWidget(self.ics_path_btn)
+        ics_form.addRow("Файл календаря:", ics_path_row)
+        self.ics_days_spin = QSpinBox()
+        self.ics_days_spin.setRange(1, 366)
+        self.ics_days_spin.setValue(app_config['SYNC'].getint('ics_days', fallback=30))
+        self.ics_days_spin.setSuffix(" дн.")
+        self.ics_days_spin.setToolTip("Сколько последних дней держать в календаре")
+        ics_form.addRow("Период:", self.ics_days_spin)
+        self.feed_enabled_cb = QCheckBox("Раздавать календарь для подписки (webcal)")
+        self.feed_enabled_cb.setChecked(app_config['SYNC'].getboolean('feed_enabled', fallback=False))
+        self.feed_enabled_cb.setToolTip("Лента собирается из дневных логов, с хранилищем SQLite недоступна")
+        ics_form.addRow(self.feed_enabled_cb)
+        self.feed_port_spin = QSpinBox()
+        self.feed_port_spin.setRange(1024, 65535)
+        self.feed_port_spin.setValue(app_config['SYNC'].getint('feed_port', fallback=8765))
+        self.feed_port_spin.setToolTip("Адрес ленты: webcal://127.0.0.1:<порт>/wrktmr.ics")
+        ics_form.addRow("Порт:", self.feed_port_spin)
+        ics_group.setLayout(ics_form)
+        sync_layout.addWidget(ics_group)
+        sync_layout.addStretch()
+        tabs.addTab(sync_tab, "☁️ Синхронизация")
+
         layout.addWidget(tabs)
         buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
         buttons.accepted.connect(self.accept)
@@ -1075,6 +4190,12 @@ class SettingsDialog(QDialog):
         if folder:
             self.log_dir_input.setText(folder)
 
+    def browse_ics_path(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Файл календаря", self.ics_path_input.text() or os.path.join(SAVE_DIR, "wrktmr.ics"),
+                                                   "iCalendar (*.ics);;All Files (*)")
+        if file_path:
+            self.ics_path_input.setText(file_path)
+
     def get_data(self):
         return {
             "save_dir": self.save_dir_input.text(),
@@ -1082,7 +4203,20 @@ class SettingsDialog(QDialog):
             "show_hints": self.show_hints_cb.isChecked(),
             "always_on_top": self.always_on_top_cb.isChecked(),
             "auto_save_interval": self.auto_save_interval_spin.value(),
-            "task_font_size": self.task_font_spin.value()
+            "task_font_size": self.task_font_spin.value(),
+            "journal_mode": self.journal_mode_cb.isChecked(),
+            "storage_backend": self.storage_backend_combo.currentData(),
+            "task_list_mode": self.task_list_mode_combo.currentData(),
+            "sync_provider": self.sync_provider_combo.currentData(),
+            "sync_enabled": self.sync_enabled_cb.isChecked(),
+            "caldav_url": self.caldav_url_input.text().strip(),
+            "caldav_user": self.caldav_user_input.text().strip(),
+            "caldav_password": self.caldav_password_input.text(),
+            "sync_interval_min": self.sync_interval_spin.value(),
+            "ics_path": self.ics_path_input.text().strip(),
+            "ics_days": self.ics_days_spin.value(),
+            "feed_enabled": self.feed_enabled_cb.isChecked(),
+            "feed_port": self.feed_port_spin.value()
         }
 
 class MainWindow(QMainWindow):
@@ -1101,13 +4235,39 @@ class MainWindow(QMainWindow):
             QApplication.instance().setWindowIcon(icon) 
         else:
             print(f"[DEBUG] Иконка не найдена по пути: {icon_path}")
-        self.tasks_widgets = []
+        self.tasks_widgets = {}
+        self.io_failures = set()
+        io_worker.finished.connect(self.on_io_finished)
+        io_worker.failed.connect(self.on_io_failed)
+        io_worker.start()
+        sync_outbox.load()
+        self.sync_service = SyncService(sync_worker, sync_outbox)
+        self.sync_service.synced.connect(self.on_sync_finished)
+        self.sync_service.sync_failed.connect(self.on_sync_failed)
+        sync_worker.start()
+        QApplication.instance().aboutToQuit.connect(settings_manager.flush)
+        QApplication.instance().aboutToQuit.connect(sync_worker.stop)
+        QApplication.instance().aboutToQuit.connect(io_worker.stop)
+        self.ticker = SharedTicker(self)
+        self.ticker.subscribe(self)
+        self.checkpoint_service = CheckpointService(task_store, AUTO_SAVE_INTERVAL)
         load_active_tasks()
+        startup_profiler.mark("load_active_tasks")
         load_backup()
+        startup_profiler.mark("load_backup")
         self.init_ui()
         self.apply_theme()
         self.load_tasks_to_ui()
         self.start_active_save_timer()
+        self.sync_service.status_changed.connect(self.update_sync_status)
+        self.ics_manual = False
+        self.ics_timer = QTimer(self)
+        self.ics_timer.timeout.connect(lambda: self.export_ics(manual=False))
+        self.apply_sync_settings()
+        feed_error = self.apply_feed_settings()
+        if feed_error:
+            print(f"Не удалось запустить ленту календаря на порту {FEED_PORT}: {feed_error}")
+        startup_profiler.mark("build_ui")
         self.show()
         if ALWAYS_ON_TOP:
             self.setWindowFlag(Qt.WindowType.WindowStaysOnTopHint, True)
@@ -1116,6 +4276,12 @@ class MainWindow(QMainWindow):
         set_dark_title_bar_qt(self)
         self.update_datetime()
 
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if startup_profiler.enabled and not startup_profiler.reported:
+            startup_profiler.mark("first_paint")
+            startup_profiler.report()
+
     def update_datetime(self):
         now = datetime.datetime.now()
         days = {
@@ -1129,35 +4295,29 @@ class MainWindow(QMainWindow):
         }
         day_name = days[now.weekday()]
         self.datetime_label.setText(now.strftime("%d.%m.%Y %H:%M:%S") + " " + day_name)
-        QTimer.singleShot(1000, self.update_datetime)
 
-    def moveEvent(self, event):
-        self.save_window_state()
-        super().moveEvent(event)
+    def on_tick(self):
+        self.update_datetime()
 
-    def resizeEvent(self, event):
-        self.save_window_state()
-        super().resizeEvent(event)
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.isMinimized():
+            self.ticker.start()
 
-    def save_window_state(self):
-        try:
-            app_config['USER']['window_x'] = str(self.x())
-            app_config['USER']['window_y'] = str(self.y())
-            app_config['USER']['window_width'] = str(self.width())
-            app_config['USER']['window_height'] = str(self.height())
-            save_settings(app_config)
-        except Exception as e:
-            print(f"[ERROR_save_window_state] {e}")
+    def hideEvent(self, event):
+        self.ticker.stop()
+        super().hideEvent(event)
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.Type.WindowStateChange:
+            if self.isMinimized():
+                self.ticker.stop()
+            elif self.isVisible():
+                self.ticker.start()
+        super().changeEvent(event)
 
     def start_active_save_timer(self):
-        global active_save_timer
-        if active_save_timer:
-            return
-        interval_ms = AUTO_SAVE_INTERVAL * 1000
-        def save_loop():
-            save_active_tasks()
-            active_save_timer = QTimer.singleShot(interval_ms, save_loop)
-        save_loop()
+        self.checkpoint_service.start()
 
     def init_ui(self):
         central_widget = QWidget()
@@ -1168,6 +4328,9 @@ class MainWindow(QMainWindow):
         self.datetime_label.setStyleSheet("font-size: 12px; color: #888;")
         top_layout.addWidget(self.datetime_label)
         top_layout.addStretch()
+        self.sync_status_label = QLabel()
+        self.sync_status_label.setStyleSheet("font-size: 11px; color: #888;")
+        top_layout.addWidget(self.sync_status_label)
         log_folder_btn = QPushButton("📂")
         log_folder_btn.setFixedHeight(26)
         log_folder_btn.clicked.connect(self.open_log_folder)
@@ -1183,6 +4346,16 @@ class MainWindow(QMainWindow):
         sync_btn.clicked.connect(self.save_csv_gui)
         sync_btn.setToolTip("Сохранить отчёт в CSV")
         top_layout.addWidget(sync_btn)
+        caldav_btn = QPushButton("☁️")
+        caldav_btn.setFixedHeight(26)
+        caldav_btn.clicked.connect(lambda: self.sync_now(manual=True))
+        caldav_btn.setToolTip("Синхронизация (ICS / CalDAV)")
+        top_layout.addWidget(caldav_btn)
+        import_ics_btn = QPushButton("📥")
+        import_ics_btn.setFixedHeight(26)
+        import_ics_btn.clicked.connect(self.import_ics_gui)
+        import_ics_btn.setToolTip("Импортировать задачи из ICS")
+        top_layout.addWidget(import_ics_btn)
         clear_logs_btn = QPushButton("🗑️")
         clear_logs_btn.setFixedHeight(26)
         clear_logs_btn.clicked.connect(self.clear_all_logs)
@@ -1199,6 +4372,15 @@ class MainWindow(QMainWindow):
         self.tasks_layout.setSpacing(5)
         scroll_area.setWidget(self.tasks_container)
         main_layout.addWidget(scroll_area)
+        self.scroll_area = scroll_area
+        self.task_model = TaskListModel(self)
+        self.task_list_view = TaskListView(self)
+        self.task_list_view.setModel(self.task_model)
+        self.task_list_view.setItemDelegate(TaskItemDelegate(self))
+        self.task_model.modelAboutToBeReset.connect(self.task_list_view.forget_editors)
+        main_layout.addWidget(self.task_list_view)
+        self.apply_task_list_mode()
+        task_store.subscribe(self.on_task_event)
         input_form = QFrame()
         input_form.setFrameShape(QFrame.Shape.StyledPanel)
         form_layout = QVBoxLayout(input_form)
@@ -1224,6 +4406,9 @@ class MainWindow(QMainWindow):
         stats_btn = QPushButton("📊 Статистика")
         stats_btn.setToolTip("Показать статистику за сегодня")
         stats_btn.clicked.connect(self.show_stats)
+        period_stats_btn = QPushButton("📅")
+        period_stats_btn.setToolTip("Статистика за период")
+        period_stats_btn.clicked.connect(self.show_period_stats)
         save_btn = QPushButton("💾 Сохранить в Excel")
         save_btn.setToolTip("Сохранить отчёт в Excel-файл")
         save_btn.clicked.connect(self.save_csv_gui)
@@ -1232,6 +4417,7 @@ class MainWindow(QMainWindow):
         quit_btn.clicked.connect(self.quit_app)
         btn_layout.addWidget(add_btn)
         btn_layout.addWidget(stats_btn)
+        btn_layout.addWidget(period_stats_btn)
         btn_layout.addWidget(save_btn)
         btn_layout.addWidget(quit_btn)
         form_layout.addLayout(btn_layout)
@@ -1320,30 +4506,66 @@ class MainWindow(QMainWindow):
             self.resizeEvent = old_resize_event
 
     def reload_all_task_widgets(self):
-        for i in reversed(range(self.tasks_layout.count() - 1)):
-            widget = self.tasks_layout.itemAt(i).widget()
-            if widget:
-                widget.deleteLater()
         self.load_tasks_to_ui()
 
+    def apply_task_list_mode(self):
+        virtual = TASK_LIST_MODE == "model"
+        self.scroll_area.setVisible(not virtual)
+        self.task_list_view.setVisible(virtual)
+        if virtual:
+            self.ticker.subscribe(self.task_list_view)
+        else:
+            self.ticker.unsubscribe(self.task_list_view)
+
+    def remove_task_widget(self, widget):
+        self.ticker.unsubscribe(widget)
+        self.tasks_layout.removeWidget(widget)
+        widget.deleteLater()
+
+    def insert_task_widget(self, task_id):
+        index = task_store.index_of(task_id)
+        position = task_store.display_position(task_id)
+        if index < 0 or position < 0:
+            return
+        task_widget = TaskItemWidget(tasks[index], index, self)
+        self.tasks_layout.insertWidget(position, task_widget)
+        self.tasks_widgets[task_id] = task_widget
+
+    def on_task_event(self, event, task_id):
+        if TASK_LIST_MODE == "model":
+            self.task_model.on_task_event(event, task_id)
+            if event == "inserted":
+                QTimer.singleShot(50, self.task_list_view.scrollToBottom)
+            return
+        if event == "reset":
+            self.load_tasks_to_ui()
+            return
+        old_widget = self.tasks_widgets.pop(task_id, None)
+        if old_widget:
+            self.remove_task_widget(old_widget)
+        if event in ("inserted", "updated"):
+            self.insert_task_widget(task_id)
+        if event == "inserted":
+            scroll_bar = self.scroll_area.verticalScrollBar()
+            QTimer.singleShot(50, lambda: scroll_bar.setValue(scroll_bar.maximum()))
+
     def load_tasks_to_ui(self):
         for i in reversed(range(self.tasks_layout.count() - 1)):
             widget = self.tasks_layout.itemAt(i).widget()
             if widget:
-                widget.deleteLater()
+                self.remove_task_widget(widget)
         self.tasks_widgets.clear()
+        if TASK_LIST_MODE == "model":
+            self.task_model.refresh()
+            QTimer.singleShot(50, self.task_list_view.scrollToBottom)
+            return
         completed_tasks = [(idx, task) for idx, task in enumerate(tasks) if "timer_start" not in task]
         active_tasks = [(idx, task) for idx, task in enumerate(tasks) if "timer_start" in task]
-        for idx, task in completed_tasks:
-            task_widget = TaskItemWidget(task, idx, self)
-            insert_pos = max(0, self.tasks_layout.count() - 1)
-            self.tasks_layout.insertWidget(insert_pos, task_widget)
-            self.tasks_widgets.append(task_widget)
-        for idx, task in active_tasks:
+        for idx, task in completed_tasks + active_tasks:
             task_widget = TaskItemWidget(task, idx, self)
             insert_pos = max(0, self.tasks_layout.count() - 1)
             self.tasks_layout.insertWidget(insert_pos, task_widget)
-            self.tasks_widgets.append(task_widget)
+            self.tasks_widgets[task.get("id")] = task_widget
         scroll_area = self.findChild(QScrollArea)
         if scroll_area:
             scroll_bar = scroll_area.verticalScrollBar()
@@ -1427,7 +4649,7 @@ class MainWindow(QMainWindow):
             display_time_str = "<1 минуты" if minutes < 1 else f"{int(minutes)}:{int((minutes%1)*60):02d}"
             if "-" in time_str:
                 display_time_str = time_str
-            tasks.append({
+            new_task = {
                 "id": str(uuid.uuid4()),
                 "task": task_text,
                 "link": link,
@@ -1436,9 +4658,9 @@ class MainWindow(QMainWindow):
                 "hours_hundredths": hours_hundredths,
                 "start_timestamp": start_timestamp,
                 "end_timestamp": end_timestamp
-            })
+            }
         else:
-            tasks.append({
+            new_task = {
                 "id": str(uuid.uuid4()),
                 "task": task_text,
                 "link": link,
@@ -1449,17 +4671,9 @@ class MainWindow(QMainWindow):
                 "minutes": 0.0,
                 "hours_hundredths": 0.0,
                 "time_str": "0:00"
-            })
-        save_backup()
-        new_index = len(tasks) - 1
-        task_widget = TaskItemWidget(tasks[new_index], new_index, self)
-        insert_pos = max(0, self.tasks_layout.count() - 1)
-        self.tasks_layout.insertWidget(insert_pos, task_widget)
-        self.tasks_widgets.append(task_widget)
-        scroll_area = self.findChild(QScrollArea)
-        if scroll_area:
-            scroll_bar = scroll_area.verticalScrollBar()
-            QTimer.singleShot(50, lambda: scroll_bar.setValue(scroll_bar.maximum()))
+            }
+        new_task = task_store.add(new_task)
+        record_task_change("add", new_task)
         self.task_input.clear()
         self.link_input.clear()
         self.time_input.clear()
@@ -1477,48 +4691,29 @@ class MainWindow(QMainWindow):
                 tasks[index]["id"] = old_id
                 if "timer_start" in tasks[index]:
                     tasks[index]["timer_start"] = tasks[index]["start_timestamp"]
-                save_backup()
-                self.load_tasks_to_ui()
+                record_task_change("update", tasks[index])
+                task_store.update(old_id)
 
     def delete_task_internal(self, index):
         if index < 0 or index >= len(tasks):
             return
         if "timer_start" in tasks[index]:
             remove_active_task(index)
-        tasks.pop(index)
-        save_backup()
-        self.load_tasks_to_ui()
+        removed_task = task_store.remove(tasks[index].get("id"))
+        record_task_change("delete", removed_task)
 
     def show_stats(self):
-        total_tasks = len(tasks)
-        total_minutes = round(sum(t.get('minutes', 0) for t in tasks), 2)
-        total_hours = round(sum(t.get('hours_hundredths', 0) for t in tasks), 2)
-        active_tasks_count = 0
-        paused_tasks_count = 0
-        active_tasks_time = 0.0
-        paused_tasks_time = 0.0
-        for t in tasks:
-            if "timer_start" in t:
-                if t.get("is_paused", False):
-                    paused_tasks_count += 1
-                    paused_total = t.get("paused_total", 0.0)
-                    elapsed = time.time() - t["timer_start"] - paused_total
-                    paused_tasks_time += elapsed / 60
-                else:
-                    active_tasks_count += 1
-                    paused_total = t.get("paused_total", 0.0)
-                    elapsed = time.time() - t["timer_start"] - paused_total
-                    active_tasks_time += elapsed / 60
-        link_minutes = {}
-        for t in tasks:
-            if t.get('link'):
-                d = parse_domain(t['link'])
-                link_minutes[d] = link_minutes.get(d, 0) + t.get('minutes', 0)
-        top_links = sorted(link_minutes.items(), key=lambda x: x[1], reverse=True)[:3]
-        task_minutes = {}
-        for t in tasks:
-            task_minutes[t['task']] = task_minutes.get(t['task'], 0) + t.get('minutes', 0)
-        top_tasks = sorted(task_minutes.items(), key=lambda x: x[1], reverse=True)[:3]
+        stats = task_store.stats
+        now = time.time()
+        total_tasks = stats.count
+        total_minutes = round(stats.minutes, 2)
+        total_hours = round(stats.hours_hundredths, 2)
+        active_tasks_count = stats.running_count("active")
+        paused_tasks_count = stats.running_count("paused")
+        active_tasks_time = stats.running_minutes("active", now)
+        paused_tasks_time = stats.running_minutes("paused", now)
+        top_links = stats.by_domain.top(3)
+        top_tasks = stats.by_name.top(3)
         stats_parts = []
         stats_parts.append("<b>📊 ОБЩАЯ СТАТИСТИКА</b>")
         stats_parts.append(f"  Всего задач: <b>{total_tasks}</b>")
@@ -1547,8 +4742,10 @@ class MainWindow(QMainWindow):
         msg_box.setText(stats_text)
         msg_box.exec()
 
+    def show_period_stats(self):
+        PeriodStatsDialog(self).exec()
+
     def save_csv_gui(self):
-        global SAVE_DIR
         file_path, _ = QFileDialog.getSaveFileName(
             self,
             "Сохранить отчет",
@@ -1556,56 +4753,115 @@ class MainWindow(QMainWindow):
             "CSV Files (*.csv);;All Files (*)"
         )
         if file_path:
-            try:
-                import csv
-                with open(file_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(["Задача", "Ссылка (домен)", "Время (мин:сек)", "Время (часы в сотых)", "Период выполнения"])
-                    total_minutes = 0.0
-                    total_hours_hundredths = 0.0
-                    for t in tasks:
-                        domain = parse_domain(t['link']) if t['link'] else ""
-                        writer.writerow([
-                            t['task'],
-                            domain,
-                            t['time_str'],
-                            t['hours_hundredths'],
-                            format_time_period(t.get('start_timestamp'), t.get('end_timestamp'))
-                        ])
-                        total_minutes += t['minutes']
-                        total_hours_hundredths += t['hours_hundredths']
-                    writer.writerow([])
-                    writer.writerow(["ИТОГО", "", f"{round(total_minutes, 2)} мин", f"{round(total_hours_hundredths, 2)} ч", ""])
-                    grouped = group_tasks()
-                    if grouped:
-                        writer.writerow([])
-                        writer.writerow(["СВОДКА (объединено по совпадению ссылки или названия)"])
-                        for gt in grouped:
-                            writer.writerow([
-                                gt["task"],
-                                parse_domain(gt["link"]) if gt["link"] else "",
-                                f"{round(gt['minutes'], 2)} мин",
-                                f"{round(gt['hours_hundredths'], 2)} ч",
-                                ""
-                            ])
-                new_save_dir = os.path.dirname(file_path)
-                if new_save_dir != SAVE_DIR:
-                    SAVE_DIR = new_save_dir
-                    app_config['USER']['save_dir'] = SAVE_DIR
-                    save_settings(app_config)
-                reply = QMessageBox.question(self, "Успех", f"Файл успешно сохранён: {file_path}\nОткрыть папку с файлом?",
-                                            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
-                if reply == QMessageBox.StandardButton.Yes:
-                    if sys.platform == "win32":
-                        os.startfile(os.path.dirname(file_path))
-                    elif sys.platform == "darwin":
-                        os.system(f'open "{os.path.dirname(file_path)}"')
-                    else:
-                        os.system(f'xdg-open "{os.path.dirname(file_path)}"')
-            except PermissionError:
+            io_worker.submit(f"csv:{file_path}", write_csv_file, file_path, csv_report_rows())
+
+    def on_io_finished(self, name, result):
+        global SAVE_DIR
+        self.io_failures.discard(name)
+        if name.startswith("import:"):
+            stats = apply_ics_import(result)
+            print(f"Импорт ICS: {stats}")
+            QMessageBox.information(self, "Импорт ICS", ics_import_text(result, stats))
+            return
+        if name.startswith("ics:"):
+            print(f"Экспорт ICS: {ics_stats_text(result)}")
+            if self.ics_manual:
+                self.ics_manual = False
+                QMessageBox.information(self, "Экспорт ICS", f"Календарь сохранён:\n{ics_stats_text(result)}")
+            return
+        if not name.startswith("csv:"):
+            return
+        new_save_dir = os.path.dirname(result)
+        if new_save_dir != SAVE_DIR:
+            SAVE_DIR = new_save_dir
+            app_config['USER']['save_dir'] = SAVE_DIR
+            settings_manager.mark_dirty()
+        reply = QMessageBox.question(self, "Успех", f"Файл успешно сохранён: {result}\nОткрыть папку с файлом?",
+                                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes:
+            if sys.platform == "win32":
+                os.startfile(new_save_dir)
+            elif sys.platform == "darwin":
+                os.system(f'open "{new_save_dir}"')
+            else:
+                os.system(f'xdg-open "{new_save_dir}"')
+
+    # Об ошибке фоновой записи сообщаем один раз, пока запись того же файла снова не пройдёт успешно
+    def on_io_failed(self, name, error):
+        if name.startswith("csv:"):
+            if isinstance(error, PermissionError):
                 QMessageBox.critical(self, "Ошибка", "Файл занят другим процессом. Пожалуйста, закройте файл и попробуйте снова.")
-            except Exception as e:
-                QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл: {str(e)}")
+            else:
+                QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл: {str(error)}")
+            return
+        if name.startswith("import:"):
+            QMessageBox.critical(self, "Импорт ICS", f"Не удалось прочитать календарь:\n{str(error)}")
+            return
+        if name.startswith("ics:") and self.ics_manual:
+            self.ics_manual = False
+            QMessageBox.critical(self, "Экспорт ICS", f"Не удалось сохранить календарь:\n{str(error)}")
+            return
+        if name in self.io_failures:
+            return
+        self.io_failures.add(name)
+        QMessageBox.warning(self, "Ошибка записи", f"Не удалось записать данные на диск ({name}):\n{str(error)}")
+
+    def apply_sync_settings(self):
+        self.sync_service.apply_settings()
+        self.ics_timer.stop()
+        if SYNC_ENABLED and SYNC_PROVIDER == "ics" and ICS_PATH:
+            self.ics_timer.start(max(1, SYNC_INTERVAL_MIN) * 60 * 1000)
+
+    def import_ics_gui(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Импорт из ICS", ICS_PATH or SAVE_DIR,
+                                                   "iCalendar (*.ics);;All Files (*)")
+        if file_path:
+            io_worker.submit(f"import:{file_path}", read_ics_tasks, file_path)
+
+    def apply_feed_settings(self):
+        if not FEED_ENABLED or STORAGE_BACKEND == "sqlite":
+            ics_feed_server.stop()
+            return None
+        ics_feed_server.days = ICS_DAYS
+        if ics_feed_server.thread is not None and ics_feed_server.port == FEED_PORT:
+            return None
+        return ics_feed_server.start(FEED_PORT, ICS_DAYS)
+
+    def export_ics(self, manual=True):
+        global ICS_PATH
+        if not ICS_PATH:
+            if not manual:
+                return
+            file_path, _ = QFileDialog.getSaveFileName(self, "Экспорт в ICS", os.path.join(SAVE_DIR, "wrktmr.ics"),
+                                                       "iCalendar (*.ics);;All Files (*)")
+            if not file_path:
+                return
+            ICS_PATH = file_path
+            app_config['SYNC']['ics_path'] = ICS_PATH
+            settings_manager.mark_dirty()
+        self.ics_manual = self.ics_manual or manual
+        io_worker.submit(f"ics:{ICS_PATH}", export_ics, ICS_PATH, collect_ics_days(ICS_DAYS))
+
+    def sync_now(self, manual=True):
+        if SYNC_PROVIDER == "ics":
+            self.export_ics(manual)
+            return
+        if not self.sync_service.sync(manual) and manual:
+            QMessageBox.information(self, "Синхронизация", "Укажите адрес календаря CalDAV в настройках (⚙ → ☁️ Синхронизация).")
+
+    def update_sync_status(self):
+        self.sync_status_label.setVisible(caldav_configured())
+        self.sync_status_label.setText(self.sync_service.status_text())
+        self.sync_status_label.setToolTip(self.sync_service.status_tooltip() if SHOW_HINTS else "")
+
+    def on_sync_finished(self, result, manual):
+        if manual:
+            QMessageBox.information(self, "Синхронизация", f"Синхронизация завершена:\n{result.summary()}")
+
+    def on_sync_failed(self, error, manual):
+        if manual:
+            QMessageBox.critical(self, "Синхронизация", f"Не удалось синхронизировать задачи:\n{str(error)}\n"
+                                 f"Изменения сохранены в очереди и будут отправлены при следующей попытке.")
 
     def open_log_folder(self):
         if os.path.exists(LOG_DIR):
@@ -1631,12 +4887,54 @@ class MainWindow(QMainWindow):
             app_config['USER']['always_on_top'] = str(settings_data["always_on_top"]).lower()
             app_config['USER']['auto_save_interval'] = str(settings_data["auto_save_interval"])
             app_config['USER']['task_font_size'] = str(settings_data["task_font_size"])
-            save_settings(app_config)
-            global SHOW_HINTS, ALWAYS_ON_TOP, AUTO_SAVE_INTERVAL, TASK_FONT_SIZE
+            app_config['USER']['journal_mode'] = str(settings_data["journal_mode"]).lower()
+            app_config['USER']['storage_backend'] = settings_data["storage_backend"]
+            app_config['USER']['task_list_mode'] = settings_data["task_list_mode"]
+            app_config['SYNC']['provider'] = settings_data["sync_provider"]
+            app_config['SYNC']['enabled'] = str(settings_data["sync_enabled"]).lower()
+            app_config['SYNC']['caldav_url'] = settings_data["caldav_url"]
+            app_config['SYNC']['caldav_user'] = settings_data["caldav_user"]
+            app_config['SYNC']['caldav_password'] = settings_data["caldav_password"]
+            app_config['SYNC']['interval_min'] = str(settings_data["sync_interval_min"])
+            app_config['SYNC']['ics_path'] = settings_data["ics_path"]
+            app_config['SYNC']['ics_days'] = str(settings_data["ics_days"])
+            app_config['SYNC']['feed_enabled'] = str(settings_data["feed_enabled"]).lower()
+            app_config['SYNC']['feed_port'] = str(settings_data["feed_port"])
+            settings_manager.mark_dirty()
+            global SHOW_HINTS, ALWAYS_ON_TOP, AUTO_SAVE_INTERVAL, TASK_FONT_SIZE, JOURNAL_MODE, STORAGE_BACKEND, TASK_LIST_MODE
+            global SYNC_PROVIDER, SYNC_ENABLED, CALDAV_URL, CALDAV_USER, CALDAV_PASSWORD, SYNC_INTERVAL_MIN, ICS_PATH, ICS_DAYS, FEED_ENABLED, FEED_PORT
+            SYNC_PROVIDER = settings_data["sync_provider"]
+            SYNC_ENABLED = settings_data["sync_enabled"]
+            CALDAV_URL = settings_data["caldav_url"]
+            CALDAV_USER = settings_data["caldav_user"]
+            CALDAV_PASSWORD = settings_data["caldav_password"]
+            SYNC_INTERVAL_MIN = settings_data["sync_interval_min"]
+            ICS_PATH = settings_data["ics_path"]
+            ICS_DAYS = settings_data["ics_days"]
+            FEED_ENABLED = settings_data["feed_enabled"]
+            FEED_PORT = settings_data["feed_port"]
+            self.apply_sync_settings()
             SHOW_HINTS = settings_data["show_hints"]
             ALWAYS_ON_TOP = settings_data["always_on_top"]
             AUTO_SAVE_INTERVAL = settings_data["auto_save_interval"]
+            self.checkpoint_service.set_interval(AUTO_SAVE_INTERVAL)
             TASK_FONT_SIZE = settings_data["task_font_size"]
+            if JOURNAL_MODE != settings_data["journal_mode"]:
+                JOURNAL_MODE = settings_data["journal_mode"]
+                save_backup()
+                if not JOURNAL_MODE:
+                    remove_journal_file()
+            if STORAGE_BACKEND != settings_data["storage_backend"]:
+                STORAGE_BACKEND = settings_data["storage_backend"]
+                if STORAGE_BACKEND == "sqlite":
+                    sqlite_import_text_logs()
+                save_backup()
+                save_active_tasks()
+            feed_error = self.apply_feed_settings()
+            if feed_error:
+                QMessageBox.warning(self, "Лента календаря", f"Не удалось запустить ленту на порту {FEED_PORT}:\n{feed_error}")
+            TASK_LIST_MODE = settings_data["task_list_mode"]
+            self.apply_task_list_mode()
             self.apply_hints()
             self.reload_all_task_widgets()
             self.hide()
@@ -1654,17 +4952,17 @@ class MainWindow(QMainWindow):
         if reply != QMessageBox.StandardButton.Yes:
             return
         try:
+            io_worker.flush()
             if os.path.exists(LOG_DIR):
                 for file in os.listdir(LOG_DIR):
-                    if file.endswith(".txt"):
+                    if file.endswith(".txt") or file.endswith(".journal"):
                         os.remove(os.path.join(LOG_DIR, file))
             if os.path.exists(SAVE_DIR):
                 for file in os.listdir(SAVE_DIR):
                     if file.startswith(datetime.date.today().strftime("%Y-%m-%d")):
                         os.remove(os.path.join(SAVE_DIR, file))
-            tasks.clear()
+            task_store.clear()
             save_backup()
-            self.load_tasks_to_ui()
             QMessageBox.information(self, "Очистка", "Все логи и задачи удалены.")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось очистить логи:\n{str(e)}")
@@ -1680,20 +4978,21 @@ class MainWindow(QMainWindow):
             self.finish_all_active_tasks()
             self.save_csv_gui()
             save_backup()
-            if os.path.exists(active_tasks_file):
-                try:
-                    os.remove(active_tasks_file)
-                except Exception as e:
-                    print(Не удалось удалить временный файл: {e}")
+            try:
+                remove_active_tasks_files()
+            except Exception as e:
+                print(f"Не удалось удалить временный файл: {e}")
+            # Дожидаемся записи отчёта, чтобы успеть показать результат до выхода
+            io_worker.flush()
+            QApplication.processEvents()
             QApplication.quit()
         elif reply == QMessageBox.StandardButton.No:
             self.finish_all_active_tasks()
             save_backup()
-            if os.path.exists(active_tasks_file):
-                try:
-                    os.remove(active_tasks_file)
-                except Exception as e:
-                    print(Не удалось удалить временный файл: {e}")
+            try:
+                remove_active_tasks_files()
+            except Exception as e:
+                print(f"Не удалось удалить временный файл: {e}")
             QApplication.quit()
         else:
             pass
@@ -1705,18 +5004,26 @@ class MainWindow(QMainWindow):
             finished_task = finish_active_task(index)
             if finished_task:
                 remove_active_task(index)
-                tasks[index] = finished_task
-        self.load_tasks_to_ui()
+                task_store.replace(finished_task["id"], finished_task)
 
     def on_window_destroyed(self):
+        task_store.unsubscribe(self.on_task_event)
+        io_worker.finished.disconnect(self.on_io_finished)
+        io_worker.failed.disconnect(self.on_io_failed)
+        self.sync_service.synced.disconnect(self.on_sync_finished)
+        self.sync_service.sync_failed.disconnect(self.on_sync_failed)
+        self.sync_service.stop()
+        sync_worker.stop()
+        ics_feed_server.stop()
+        self.checkpoint_service.stop()
         self.finish_all_active_tasks()
-        save_settings(app_config)
+        settings_manager.flush()
         save_backup()
-        if os.path.exists(active_tasks_file):
-            try:
-                os.remove(active_tasks_file)
-            except Exception as e:
-                print(Не удалось удалить временный файл при закрытии: {e}")
+        try:
+            remove_active_tasks_files()
+        except Exception as e:
+            print(f"Не удалось удалить временный файл при закрытии: {e}")
+        io_worker.stop()
 
     def moveEvent(self, event):
         self.save_window_state()
@@ -1732,14 +5039,17 @@ class MainWindow(QMainWindow):
             app_config['USER']['window_y'] = str(self.y() + 61)
             app_config['USER']['window_width'] = str(self.width())
             app_config['USER']['window_height'] = str(self.height())
-            save_settings(app_config)
+            settings_manager.mark_dirty()
         except Exception as e:
-            import traceback
-            with open("error_log.txt", "a", encoding='utf-8') as logf:
-                logf.write(f"[ERROR_save_window_state] {e}\n{traceback.format_exc()}\n")
+            print(f"[ERROR_save_window_state] {e}")
 
 if __name__ == "__main__":
+    if "--history" in sys.argv:
+        sys.exit(run_history_cli(sys.argv[sys.argv.index("--history") + 1:]))
+    if "--ics-feed" in sys.argv:
+        sys.exit(run_ics_feed_cli(sys.argv[sys.argv.index("--ics-feed") + 1:]))
     app = QApplication(sys.argv)
+    startup_profiler.mark("qapplication")
     window = MainWindow()
     window.show()
     sys.exit(app.exec())